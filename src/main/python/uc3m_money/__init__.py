@@ -1,12 +1,50 @@
-"""UC3M LOGISTICS MODULE WITH ALL THE FEATURES REQUIRED FOR ACCESS CONTROL"""
-
-from src.main.python.uc3m_money.transfer_request import TransferRequest
-from src.main.python.uc3m_money.account_manager import AccountManager
-from src.main.python.uc3m_money.account_management_exception import AccountManagementException
-from src.main.python.uc3m_money.account_deposit import AccountDeposit
-from src.main.python.uc3m_money.account_management_config import (JSON_FILES_PATH,
-                                        JSON_FILES_DEPOSITS,
-                                        TRANSFERS_STORE_FILE,
-                                        DEPOSITS_STORE_FILE,
-                                        TRANSACTIONS_STORE_FILE,
-                                        BALANCES_STORE_FILE)
+"""UC3M LOGISTICS MODULE WITH ALL THE FEATURES REQUIRED FOR ACCESS CONTROL
+
+The public names are loaded lazily on first access (PEP 562), so importing
+the package does not pull in the manager, the stores or the attributes.
+Every module is imported through the canonical uc3m_money path only.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from uc3m_money.transfer_request import TransferRequest
+    from uc3m_money.account_manager import AccountManager
+    from uc3m_money.account_management_exception import AccountManagementException
+    from uc3m_money.account_deposit import AccountDeposit
+    from uc3m_money.account_management_config import (JSON_FILES_PATH,
+                                                      JSON_FILES_DEPOSITS,
+                                                      TRANSFERS_STORE_FILE,
+                                                      DEPOSITS_STORE_FILE,
+                                                      TRANSACTIONS_STORE_FILE,
+                                                      BALANCES_STORE_FILE)
+
+_LAZY_ATTRIBUTES = {
+    "TransferRequest": ".transfer_request",
+    "AccountManager": ".account_manager",
+    "AccountManagementException": ".account_management_exception",
+    "AccountDeposit": ".account_deposit",
+    "JSON_FILES_PATH": ".account_management_config",
+    "JSON_FILES_DEPOSITS": ".account_management_config",
+    "TRANSFERS_STORE_FILE": ".account_management_config",
+    "DEPOSITS_STORE_FILE": ".account_management_config",
+    "TRANSACTIONS_STORE_FILE": ".account_management_config",
+    "BALANCES_STORE_FILE": ".account_management_config",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    """imports the module defining a public name the first time it is used"""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """lists the lazy public names together with the loaded ones"""
+    return sorted(set(globals()) | set(__all__))
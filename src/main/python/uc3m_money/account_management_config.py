@@ -6,3 +6,28 @@ TRANSFERS_STORE_FILE = JSON_FILES_PATH + "transfers_store.json"
 DEPOSITS_STORE_FILE = JSON_FILES_PATH + "deposits_store.json"
 TRANSACTIONS_STORE_FILE = JSON_FILES_PATH + "transactions.json"
 BALANCES_STORE_FILE = JSON_FILES_PATH + "balances.json"
+TRANSFERS_PARTITIONS_PATH = JSON_FILES_PATH + "transfers_partitions/"
+TRANSFERS_BLOOM_BITS = 1 << 18
+TRANSFERS_BLOOM_HASHES = 7
+DEPOSIT_FILES_CACHE_FILE = JSON_FILES_PATH + "deposit_files_cache.json"
+DEPOSIT_FILES_CACHE_RETENTION = 7 * 24 * 3600
+DEPOSIT_WATCHER_CHECKPOINT_FILE = JSON_FILES_PATH + "deposit_watcher_checkpoint.json"
+DEPOSIT_WATCHER_MAX_FILES = 100
+DEPOSIT_WATCHER_POLL_INTERVAL = 5.0
+BALANCE_WORKERS = os.cpu_count() or 1
+BALANCE_MIN_SHARD_BYTES = 1 << 20
+BALANCE_INDEX_FILE = JSON_FILES_PATH + "balance_index.json"
+IBAN_LOCK_STRIPES = 64
+POSTING_CHECKPOINT_FILE = JSON_FILES_PATH + "posting_checkpoint.json"
+STORE_ARCHIVE_DIR = "archive"
+STORE_ARCHIVE_PATH = JSON_FILES_PATH + STORE_ARCHIVE_DIR + "/"
+TRANSFER_IMPORT_CHUNK_ROWS = 1000
+QUERY_PAGE_LIMIT = 100
+TRANSFER_QUEUE_CAPACITY = 1000
+TRANSFER_QUEUE_WORKERS = 2
+TRANSFER_QUEUE_BATCH_SIZE = 100
+SETTLEMENT_REPORTS_PATH = JSON_FILES_PATH + "settlements/"
+PARSED_FILE_CACHE_BYTES = 64 << 20
+CHANGE_FEED_PATH = JSON_FILES_PATH + "change_feed/"
+CHANGE_FEED_SEGMENT_RECORDS = 10000
+CHANGE_FEED_RETENTION_SECONDS = 7 * 24 * 3600
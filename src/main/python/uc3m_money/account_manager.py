@@ -1,31 +1,128 @@
 """Account manager module """
 import re
 import json
+import math
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from uc3m_money.data.attr.iban_code import IbanCode
-from src.main.python.uc3m_money.account_management_exception import AccountManagementException
-from src.main.python.uc3m_money.account_management_config import (TRANSFERS_STORE_FILE,
-                                        DEPOSITS_STORE_FILE,
-                                        TRANSACTIONS_STORE_FILE,
-                                        BALANCES_STORE_FILE)
-
-from src.main.python.uc3m_money.transfer_request import TransferRequest
-from src.main.python.uc3m_money.account_deposit import AccountDeposit
-
-
-class AccountManager:
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.account_management_config import (TRANSACTIONS_STORE_FILE,
+                                                  BALANCES_STORE_FILE)
+
+from uc3m_money.transfer_request import TransferRequest
+from uc3m_money.account_deposit import AccountDeposit
+from uc3m_money.store.json_store import JsonStore
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+from uc3m_money.store.partitioned_transfers_json_store import PartitionedTransfersJsonStore
+from uc3m_money.store.deposit_json_store import DepositJsonStore
+from uc3m_money.store.balances_json_store import BalanceJsonStore
+from uc3m_money.store.transactions_shard_scanner import TransactionsShardScanner
+from uc3m_money.store.balance_prefix_index import BalancePrefixIndex
+from uc3m_money.store.store_locks import STORE_LOCKS
+from uc3m_money.store.scheduled_transfers_index import bucket_day
+from uc3m_money.posting_engine import PostingEngine
+from uc3m_money.settlement_engine import SettlementEngine
+from uc3m_money.metrics.metrics_registry import METRICS
+from uc3m_money.data.transfer_date_validator import TRANSFER_DATE_VALIDATOR
+from uc3m_money.data.transfer_batch_validator import TransferBatchValidator
+
+
+class AccountManager:  # pylint: disable=too-many-public-methods,too-many-instance-attributes
     """Class for providing the methods for managing the orders"""
     def __init__(self):
         pass
 
     _instance = None
+    _instance_lock = threading.Lock()
+
+    _transfers_store = None
+    _deposit_file_cache = None
+    _deposits_store = None
+    _balance_workers = None
+    _balance_index = None
+    _store_rotation = None
+    _available_balance_cache = None
+    _store_router = None
+    _routing = threading.local()
 
     def __new__(cls, *args, **kwargs):
         """Singleton class, allows for only one instance"""
         if cls._instance is None:
-            cls._instance = super(AccountManager, cls).__new__(cls)
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = super(AccountManager, cls).__new__(cls)
         return cls._instance
 
+    def use_transfers_store(self, transfers_store):
+        """sets the store where the transfers are saved, e.g. a
+        PartitionedTransfersJsonStore; None restores the default file"""
+        self._transfers_store = transfers_store
+
+    def use_store_backend(self, store_backend):
+        """keeps every store file, transactions and balances included, in
+        store_backend (e.g. a fresh MemoryBackend per test or simulation);
+        None restores the files on disk"""
+        with self._instance_lock:
+            JsonStore.use_backend(store_backend)
+            self._transfers_store = None
+            self._deposits_store = None
+
+    @staticmethod
+    def use_change_feed(change_feed):
+        """records every transfer, deposit and balance appended in
+        change_feed (a ChangeFeed); None stops recording them"""
+        JsonStore.use_change_feed(change_feed)
+
+    def use_store_router(self, store_router):
+        """sets the StoreRouter giving every tenant or bank its own store
+        files; None restores the default files"""
+        if store_router is not None and self._available_balance_cache is not None:
+            raise AccountManagementException(
+                "Store router not supported with the available balance cache")
+        self._store_router = store_router
+
+    @contextmanager
+    def tenant(self, tenant):
+        """routes the operations of this thread to the shard of a tenant"""
+        previous = getattr(self._routing, "tenant", None)
+        self._routing.tenant = tenant
+        try:
+            yield self
+        finally:
+            self._routing.tenant = previous
+
+    def store_shard(self, iban=None):
+        """returns the shard of the current tenant or, without tenant, of
+        the bank of iban; None when no router is set"""
+        if self._store_router is None:
+            return None
+        return self._store_router.shard(getattr(self._routing, "tenant", None), iban)
+
+    def whole_shards(self):
+        """returns the shards of the operations over every account of a
+        store (posting, settlement, scheduling): the one of the current
+        tenant, the default one when no bank has its own shard, or else
+        the default one and every bank shard. None when no router is set"""
+        tenant = getattr(self._routing, "tenant", None)
+        if self._store_router is None:
+            return None
+        if tenant is None and self._store_router.split_by_bank:
+            return self._store_router.bank_shards
+        return [self._store_router.shard(tenant)]
+
+    def _bank_shard_owns(self, shard):
+        """predicate of the IBANs whose bank is routed to shard"""
+        return lambda iban: self._store_router.shard(iban=iban) is shard
+
+    @staticmethod
+    def group_by_store(items, store_of):
+        """splits items into (store, items) batches, one per store, in order"""
+        batches = {}
+        for item in items:
+            batches.setdefault(store_of(item), []).append(item)
+        return list(batches.items())
+
     @staticmethod
     def validate_iban(modified_iban: str):
         """
@@ -45,30 +142,66 @@ class AccountManager:
         there are other ways to check this"""
         concept_format = re.compile(r"^(?=^.{10,30}$)([a-zA-Z]+(\s[a-zA-Z]+)+)$")
 
-        valid_concept = concept_format.fullmatch(concept)
+        valid_concept = isinstance(concept, str) and concept_format.fullmatch(concept)
         if not valid_concept:
             raise AccountManagementException("Invalid concept format")
 
     def validate_transfer_date(self, transfer_date):
         """validates the arrival date format  using regex"""
-        date_format = re.compile(r"^(([0-2]\d|3[0-1])\/(0\d|1[0-2])\/\d\d\d\d)$")
-        valid_date = date_format.fullmatch(transfer_date)
-        if not valid_date:
-            raise AccountManagementException("Invalid date format")
-
-        try:
-            string_to_date = datetime.strptime(transfer_date, "%d/%m/%Y").date()
-        except ValueError as ex:
-            raise AccountManagementException("Invalid date format") from ex
+        return TRANSFER_DATE_VALIDATOR.validate(transfer_date)
 
-        if string_to_date < datetime.now(timezone.utc).date():
-            raise AccountManagementException("Transfer date must be today or later.")
+    # pylint: disable=too-many-arguments
+    def build_transfer_request(self, from_iban: str,
+                               to_iban: str,
+                               concept: str,
+                               transfer_type: str,
+                               date: str,
+                               amount: float) -> TransferRequest:
+        """validates the transfer info and returns the
+        transfer request, without storing it"""
+        with METRICS.span("transfer_request.validation"):
+            self.validate_iban(from_iban)
+            self.validate_iban(to_iban)
+            self.validate_concept(concept)
+            regex_transfer = re.compile(r"(ORDINARY|INMEDIATE|URGENT)")
+            valid_transfer = isinstance(transfer_type, str) and \
+                regex_transfer.fullmatch(transfer_type)
+            if not valid_transfer:
+                raise AccountManagementException("Invalid transfer type")
+            self.validate_transfer_date(date)
+
+            try:
+                float_amount = float(amount)
+            except (TypeError, ValueError) as exc:
+                raise AccountManagementException("Invalid transfer amount") from exc
+
+            float_to_string = str(float_amount)
+            if '.' in float_to_string:
+                decimal_places = len(float_to_string.split('.')[1])
+                if decimal_places > 2:
+                    raise AccountManagementException("Invalid transfer amount")
+
+            if float_amount < 10 or float_amount > 10000:
+                raise AccountManagementException("Invalid transfer amount")
 
-        if string_to_date.year < 2025 or string_to_date.year > 2050:
-            raise AccountManagementException("Invalid date format")
-        return transfer_date
+            return TransferRequest(from_iban=from_iban,
+                                   to_iban=to_iban,
+                                   transfer_concept=concept,
+                                   transfer_type=transfer_type,
+                                   transfer_date=date,
+                                   transfer_amount=amount)
+
+    def transfers_store(self, iban=None):
+        """returns the store where the transfers (from iban) are saved"""
+        shard = self.store_shard(iban)
+        if shard is not None:
+            return shard.transfers_store()
+        if self._transfers_store is None:
+            with self._instance_lock:
+                if self._transfers_store is None:
+                    self._transfers_store = TransfersJsonStore()
+        return self._transfers_store
 
-    # pylint: disable=too-many-arguments
     def transfer_request(self, from_iban: str,
                          to_iban: str,
                          concept: str,
@@ -77,85 +210,263 @@ class AccountManager:
                          amount: float) -> str:
         """first method: receives transfer info and
         stores it into a file"""
-        self.validate_iban(from_iban)
-        self.validate_iban(to_iban)
-        self.validate_concept(concept)
-        regex_transfer = re.compile(r"(ORDINARY|INMEDIATE|URGENT)")
-        valid_transfer = regex_transfer.fullmatch(transfer_type)
-        if not valid_transfer:
-            raise AccountManagementException("Invalid transfer type")
-        self.validate_transfer_date(date)
-
+        with METRICS.trace("transfer_request"):
+            transfer_request = self.build_transfer_request(from_iban, to_iban, concept,
+                                                           transfer_type, date, amount)
+            self.reserve_funds(transfer_request)
+            try:
+                transfers_store = self.transfers_store(transfer_request.from_iban)
+                transfer_json = transfers_store.add_item(transfer_request)
+            except Exception:
+                self.settle_funds(transfer_request, False)
+                raise
+            self.settle_funds(transfer_request, True)
+            self.rotate_store(transfers_store)
+            return transfer_json["transfer_code"]
+
+    def transfer_requests(self, requests):
+        """validates a batch of transfers (dicts with the transfer_request
+        arguments) and stores the valid ones with a single write per store.
+        Returns, in order, the transfer code or the exception of each one
+        (the error of its store when that store cannot be written)"""
+        results = []
+        transfer_list = []
+        with METRICS.span("transfer_request.validation"):
+            errors = TransferBatchValidator().validate_rows(requests)
+        for request, error in zip(requests, errors):
+            if error is None:
+                transfer = TransferRequest(from_iban=request["from_iban"],
+                                           to_iban=request["to_iban"],
+                                           transfer_concept=request["concept"],
+                                           transfer_type=request["transfer_type"],
+                                           transfer_date=request["date"],
+                                           transfer_amount=request["amount"])
+                try:
+                    self.reserve_funds(transfer)
+                except AccountManagementException as ex:
+                    results.append(ex)
+                    continue
+                transfer_list.append(transfer)
+                results.append(transfer)
+            else:
+                results.append(AccountManagementException(error))
+        stored = self.store_transfers(transfer_list)
+        for index, transfer in enumerate(results):
+            if isinstance(transfer, TransferRequest):
+                stored_transfer = stored[id(transfer)]
+                accepted = not isinstance(stored_transfer, AccountManagementException)
+                self.settle_funds(transfer, accepted)
+                results[index] = stored_transfer["transfer_code"] if accepted else stored_transfer
+        return results
+
+    def store_transfers(self, transfer_list):
+        """stores validated transfers with one write per store; returns
+        {id(transfer): stored transfer (as JSON) or exception}. A transfer
+        whose store cannot be opened or written gets the error of its store"""
+        stored = {}
+        stores = {}
         try:
-            float_amount = float(amount)
-        except ValueError as exc:
-            raise AccountManagementException("Invalid transfer amount") from exc
-
-        float_to_string = str(float_amount)
-        if '.' in float_to_string:
-            decimal_places = len(float_to_string.split('.')[1])
-            if decimal_places > 2:
-                raise AccountManagementException("Invalid transfer amount")
-
-        if float_amount < 10 or float_amount > 10000:
-            raise AccountManagementException("Invalid transfer amount")
-
-        transfer_request = TransferRequest(from_iban=from_iban,
-                                           to_iban=to_iban,
-                                           transfer_concept=concept,
-                                           transfer_type=transfer_type,
-                                           transfer_date=date,
-                                           transfer_amount=amount)
-
-        try:
-            with open(TRANSFERS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
-                transfer_list = json.load(file)
-        except FileNotFoundError:
-            transfer_list = []
-        except json.JSONDecodeError as ex:
-            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
-
-        for list_index in transfer_list:
-            if (list_index["from_iban"] == transfer_request.from_iban and
-                    list_index["to_iban"] == transfer_request.to_iban and
-                    list_index["transfer_date"] == transfer_request.transfer_date):
-                if(list_index["transfer_amount"] == transfer_request.transfer_amount and
-                        list_index["transfer_concept"] == transfer_request.transfer_concept and
-                        list_index["transfer_type"] == transfer_request.transfer_type):
-                        raise AccountManagementException("Duplicated transfer in transfer list")
-
-        transfer_list.append(transfer_request.to_json())
-
-        try:
-            with open(TRANSFERS_STORE_FILE, "w", encoding="utf-8", newline="") as file:
-                json.dump(transfer_list, file, indent=2)
-        except FileNotFoundError as ex:
-            raise AccountManagementException("Wrong file  or file path") from ex
-        except json.JSONDecodeError as ex:
-            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
-
-        return transfer_request.transfer_code
+            for transfer in transfer_list:
+                try:
+                    stores[id(transfer)] = self.transfers_store(transfer.from_iban)
+                except AccountManagementException as ex:
+                    stored[id(transfer)] = ex
+            for transfers_store, transfers in self.group_by_store(
+                    [transfer for transfer in transfer_list if id(transfer) in stores],
+                    lambda transfer: stores[id(transfer)]):
+                try:
+                    stored_transfers = transfers_store.add_items(transfers)
+                except AccountManagementException as ex:
+                    stored.update((id(transfer), ex) for transfer in transfers)
+                    continue
+                stored.update(zip(map(id, transfers), stored_transfers))
+                self.rotate_store(transfers_store)
+        except Exception:
+            for transfer in transfer_list:
+                self.settle_funds(transfer, isinstance(stored.get(id(transfer)), dict))
+            raise
+        return stored
+
+    def use_available_balance_cache(self, available_balance_cache):
+        """sets the cache of available balances (an AvailableBalanceCache)
+        that rejects the transfers the sender cannot afford; None disables
+        the sufficient-funds check"""
+        if available_balance_cache is not None and self._store_router is not None:
+            raise AccountManagementException(
+                "Store router not supported with the available balance cache")
+        self._available_balance_cache = available_balance_cache
+
+    def reserve_funds(self, transfer):
+        """reserves the amount of a validated transfer in the available
+        balance of its sender when the sufficient-funds check is enabled"""
+        if self._available_balance_cache is not None:
+            self._available_balance_cache.reserve(transfer.from_iban,
+                                                  transfer.transfer_amount)
+
+    def settle_funds(self, transfer, stored):
+        """commits (stored) or releases the reservation of a transfer"""
+        cache = self._available_balance_cache
+        if cache is None:
+            return
+        if stored:
+            cache.commit(transfer.from_iban, transfer.to_iban, transfer.transfer_amount)
+        else:
+            cache.release(transfer.from_iban, transfer.transfer_amount)
+
+    def credit_funds(self, deposits):
+        """adds stored deposits to the available balances, if enabled"""
+        if self._available_balance_cache is not None:
+            for deposit in deposits:
+                self._available_balance_cache.credit(deposit.to_iban, deposit.deposit_amount)
+
+    def use_deposit_file_cache(self, deposit_file_cache):
+        """sets the cache of processed deposit files (a DepositFileCache);
+        None disables it, so every file is processed again"""
+        self._deposit_file_cache = deposit_file_cache
 
     def deposit_into_account(self, input_file: str) -> str:
         """manages the deposits received for accounts"""
         try:
-            with open(input_file, "r", encoding="utf-8", newline="") as file:
-                input_dictionary = json.load(file)
+            with open(input_file, "rb") as file:
+                input_content = file.read()
         except FileNotFoundError as ex:
             raise AccountManagementException("Error: file input not found") from ex
+
+        deposit_file_cache = self._deposit_file_cache
+        if deposit_file_cache is None:
+            deposit_obj = self.deposit_from_content(input_content)
+            deposits_store = self.deposits_store(deposit_obj.to_iban)
+            deposits_store.add_item(deposit_obj)
+            self.credit_funds([deposit_obj])
+            self.rotate_store(deposits_store)
+            return deposit_obj.deposit_signature
+
+        content_hash = deposit_file_cache.content_hash(input_content)
+        with deposit_file_cache.file_lock():
+            known_signature = deposit_file_cache.find_signature(content_hash)
+            if known_signature is not None:
+                return known_signature
+            deposit_obj = self.deposit_from_content(input_content)
+            deposits_store = self.deposits_store(deposit_obj.to_iban)
+            deposits_store.add_item(deposit_obj)
+            deposit_file_cache.add_signature(content_hash, deposit_obj.deposit_signature)
+        self.credit_funds([deposit_obj])
+        self.rotate_store(deposits_store)
+        return deposit_obj.deposit_signature
+
+    def use_store_rotation(self, max_bytes=None, period_seconds=None):
+        """rotates the transfers, deposits and balances files into compressed
+        segments once they reach max_bytes or their oldest record is
+        period_seconds old; without limits rotation is disabled"""
+        self._store_rotation = (max_bytes, period_seconds) \
+            if max_bytes is not None or period_seconds is not None else None
+
+    def rotate_store(self, store):
+        """rotates a store when rotation is enabled and due; returns the new segment"""
+        if self._store_rotation is None:
+            return None
+        archive = store.archive(*self._store_rotation)
+        return archive.rotate_if_due() if archive is not None else None
+
+    def deposits_store(self, iban=None):
+        """returns the store where the deposits (to iban) are saved"""
+        shard = self.store_shard(iban)
+        if shard is not None:
+            return shard.deposits_store()
+        if self._deposits_store is None:
+            with self._instance_lock:
+                if self._deposits_store is None:
+                    self._deposits_store = DepositJsonStore()
+        return self._deposits_store
+
+    def deposits_into_account(self, input_dictionaries):
+        """validates a batch of deposits (dicts with IBAN and AMOUNT) and
+        stores the valid ones with a single write per store. Returns, in
+        order, the deposit signature or the exception of each one (the
+        error of its store when that store cannot be written)"""
+        results = []
+        deposit_list = []
+        for input_dictionary in input_dictionaries:
+            try:
+                deposit_obj = self.deposit_from_dictionary(input_dictionary)
+            except AccountManagementException as ex:
+                results.append(ex)
+            else:
+                deposit_list.append(deposit_obj)
+                results.append(deposit_obj)
+        errors = {}
+        stores = {}
+        for deposit in deposit_list:
+            try:
+                stores[id(deposit)] = self.deposits_store(deposit.to_iban)
+            except AccountManagementException as ex:
+                errors[id(deposit)] = ex
+        for _, deposits in self.group_by_store(
+                [deposit for deposit in deposit_list if id(deposit) in stores],
+                lambda deposit: stores[id(deposit)]):
+            try:
+                self.store_deposits(deposits)
+            except AccountManagementException as ex:
+                errors.update((id(deposit), ex) for deposit in deposits)
+        return [errors.get(id(result), result.deposit_signature)
+                if isinstance(result, AccountDeposit) else result for result in results]
+
+    def known_deposit_signature(self, input_content: bytes):
+        """returns the signature of a deposit file content already processed
+        when the deposit file cache is enabled, None otherwise"""
+        deposit_file_cache = self._deposit_file_cache
+        if deposit_file_cache is None:
+            return None
+        return deposit_file_cache.find_signature(deposit_file_cache.content_hash(input_content))
+
+    def store_deposits(self, deposit_list, input_contents=None):
+        """stores validated deposits with one write per store and credits
+        them; the contents of their input files, when given, are remembered
+        in the deposit file cache if it is enabled, and a content repeated
+        in the batch is stored once. Returns, in order, the signature of
+        each deposit (the one of the first deposit of a repeated content)"""
+        signatures = [deposit.deposit_signature for deposit in deposit_list]
+        deposit_file_cache = self._deposit_file_cache
+        new_contents = {}
+        if deposit_file_cache is not None and input_contents is not None:
+            for index, input_content in enumerate(input_contents):
+                content_hash = deposit_file_cache.content_hash(input_content)
+                first = new_contents.setdefault(content_hash, index)
+                signatures[index] = signatures[first]
+        stored = deposit_list if not new_contents else \
+            [deposit_list[index] for index in new_contents.values()]
+        for deposits_store, deposits in self.group_by_store(
+                stored, lambda deposit: self.deposits_store(deposit.to_iban)):
+            deposits_store.add_items(deposits)
+            self.credit_funds(deposits)
+            self.rotate_store(deposits_store)
+        if new_contents:
+            deposit_file_cache.add_signatures([(content_hash, signatures[index])
+                                               for content_hash, index in new_contents.items()])
+        return signatures
+
+    def deposit_from_content(self, input_content: bytes) -> AccountDeposit:
+        """validates the content of a deposit input file and
+        returns the deposit, without storing it"""
+        try:
+            input_dictionary = json.loads(input_content.decode("utf-8"))
         except json.JSONDecodeError as ex:
             raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        return self.deposit_from_dictionary(input_dictionary)
 
+    def deposit_from_dictionary(self, input_dictionary) -> AccountDeposit:
+        """validates the IBAN and AMOUNT of a deposit and
+        returns the deposit, without storing it"""
         # comprobar valores del fichero
         try:
             deposit_iban = input_dictionary["IBAN"]
             deposit_amount = input_dictionary["AMOUNT"]
-        except KeyError as e:
+        except (KeyError, TypeError) as e:
             raise AccountManagementException("Error - Invalid Key in JSON") from e
 
         deposit_iban = self.validate_iban(deposit_iban)
         amount_format = re.compile(r"^EUR [0-9]{4}\.[0-9]{2}")
-        valid_amount = amount_format.fullmatch(deposit_amount)
+        valid_amount = isinstance(deposit_amount, str) and amount_format.fullmatch(deposit_amount)
         if not valid_amount:
             raise AccountManagementException("Error - Invalid deposit amount")
 
@@ -163,74 +474,217 @@ class AccountManager:
         if value_amount == 0:
             raise AccountManagementException("Error - Deposit must be greater than 0")
 
-        deposit_obj = AccountDeposit(to_iban=deposit_iban,
-                                     deposit_amount=value_amount)
+        return AccountDeposit(to_iban=deposit_iban,
+                              deposit_amount=value_amount)
 
-        try:
-            with open(DEPOSITS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
-                deposit_list = json.load(file)
-        except FileNotFoundError as ex:
-            deposit_list = []
-        except json.JSONDecodeError as ex:
-            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
 
-        deposit_list.append(deposit_obj.to_json())
-
-        try:
-            with open(DEPOSITS_STORE_FILE, "w", encoding="utf-8", newline="") as file:
-                json.dump(deposit_list, file, indent=2)
-        except FileNotFoundError as ex:
-            raise AccountManagementException("Wrong file  or file path") from ex
-        except json.JSONDecodeError as ex:
-            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
-
-        return deposit_obj.deposit_signature
-
-
-    def read_transactions_file(self):
+    def posting_engines(self):
+        """
+        returns the posting engines of the files of the current shards, or
+        the one of the transfers store in use (every partition of a
+        partitioned one). With a shard per bank, every engine reads the
+        transfers of every shard and posts to its ledger the legs of the
+        IBANs of its banks, so a transfer between two banks is debited in
+        the shard of the sender and credited in the one of the receiver.
+        """
+        shards = self.whole_shards()
+        if shards is None:
+            transfers_store = self.transfers_store()
+            if isinstance(transfers_store, PartitionedTransfersJsonStore):
+                return [PostingEngine(transfers_store.partition_files())]
+            return [PostingEngine(transfers_store.file_name)]
+        if len(shards) == 1:
+            return [PostingEngine(shards[0].transfers_file, shards[0].deposits_file,
+                                  shards[0].transactions_file, shards[0].checkpoint_file)]
+        transfers_files = [shard.transfers_file for shard in shards]
+        return [PostingEngine(transfers_files, shard.deposits_file, shard.transactions_file,
+                              shard.checkpoint_file, self._bank_shard_owns(shard))
+                for shard in shards]
+
+    def post_transactions(self):
+        """posts the transfers and deposits stored since the last run as
+        rows of the transactions file; returns the summary of the run (added
+        up over the bank shards, where a transfer between two banks counts
+        once in each)"""
+        summaries = [engine.run_once() for engine in self.posting_engines()]
+        return {key: sum(summary[key] for summary in summaries) for key in summaries[0]}
+
+    def settle_day(self, date):
+        """writes and returns the settlement report of the transfers of a
+        DD/MM/YYYY transfer_date (of every bank shard together, reported in
+        the default one, when the stores are split by bank)"""
+        shards = self.whole_shards()
+        if shards is None:
+            return SettlementEngine(transfers_store=self.transfers_store()).run(date)
+        transfers_stores = [shard.transfers_store() for shard in shards]
+        return SettlementEngine(shards[0].transfers_file, shards[0].settlements_path,
+                                transfers_stores if len(shards) > 1
+                                else transfers_stores[0]).run(date)
+
+    def scheduled_transfers(self, date):
+        """returns the transfers waiting to be posted on a DD/MM/YYYY date"""
+        if TRANSFER_DATE_VALIDATOR.parse(date) is None:
+            raise AccountManagementException("Invalid date format")
+        transfers = {}
+        for engine in self.posting_engines():
+            for transfer in engine.scheduled.load().bucket(bucket_day(date)):
+                transfers.setdefault(transfer["transfer_code"], transfer)
+        return list(transfers.values())
+
+    def balance_files(self, iban=None):
+        """returns the (transactions, balances) files of the shard of an iban"""
+        shard = self.store_shard(iban)
+        if shard is None:
+            return TRANSACTIONS_STORE_FILE, BALANCES_STORE_FILE
+        return shard.transactions_file, shard.balances_file
+
+    def read_transactions_file(self, transactions_file=TRANSACTIONS_STORE_FILE):
         """loads the content of the transactions file
         and returns a list"""
-        try:
-            with open(TRANSACTIONS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
-                input_list = json.load(file)
-        except FileNotFoundError as ex:
-            raise AccountManagementException("Wrong file  or file path") from ex
-        except json.JSONDecodeError as ex:
-            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        with METRICS.span("calculate_balance.load_transactions"):
+            try:
+                input_list = JsonStore.backend().load_json(transactions_file)
+            except FileNotFoundError as ex:
+                raise AccountManagementException("Wrong file  or file path") from ex
+            except json.JSONDecodeError as ex:
+                raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
         return input_list
 
 
+    def use_balance_workers(self, workers):
+        """enables the parallel balance mode with the given number of worker
+        processes; None (or 1) restores the serial single pass"""
+        self._balance_workers = workers
+
+    def transaction_balances(self, ibans=None, transactions_file=TRANSACTIONS_STORE_FILE):
+        """returns {iban: balance} for the given ibans found in the transactions
+        (every iban when None), in parallel when balance workers are set;
+        every balance is the math.fsum of its amounts in both modes"""
+        if self._balance_workers and self._balance_workers > 1 and JsonStore.backend().on_disk:
+            with METRICS.span("calculate_balance.parallel_scan"):
+                records, balances = TransactionsShardScanner(
+                    transactions_file, self._balance_workers).balances(ibans)
+                METRICS.increment("records_scanned", records)
+            return balances
+        t_l = self.read_transactions_file(transactions_file)
+        amounts = {}
+        with METRICS.span("calculate_balance.sum"):
+            METRICS.increment("records_scanned", len(t_l))
+            for transaction in t_l:
+                if ibans is None or transaction["IBAN"] in ibans:
+                    amounts.setdefault(transaction["IBAN"], []).append(
+                        float(transaction["amount"]))
+            return {iban: math.fsum(iban_amounts) for iban, iban_amounts in amounts.items()}
+
     def calculate_balance(self, iban:str)->bool:
         """calculate the balance for a given iban"""
         iban = self.validate_iban(iban)
-        t_l = self.read_transactions_file()
-        iban_found = False
-        bal_s = 0
-        for transaction in t_l:
-            #print(transaction["IBAN"] + " - " + iban)
-            if transaction["IBAN"] == iban:
-                bal_s += float(transaction["amount"])
-                iban_found = True
-        if not iban_found:
-            raise AccountManagementException("IBAN not found")
-
-        last_balance = {"IBAN": iban,
-                        "time": datetime.timestamp(datetime.now(timezone.utc)),
-                        "BALANCE": bal_s}
-
-        try:
-            with open(BALANCES_STORE_FILE, "r", encoding="utf-8", newline="") as file:
-                balance_list = json.load(file)
-        except FileNotFoundError:
-            balance_list = []
-        except json.JSONDecodeError as ex:
-            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
-
-        balance_list.append(last_balance)
-
-        try:
-            with open(BALANCES_STORE_FILE, "w", encoding="utf-8", newline="") as file:
-                json.dump(balance_list, file, indent=2)
-        except FileNotFoundError as ex:
-            raise AccountManagementException("Wrong file  or file path") from ex
+        transactions_file, balances_file = self.balance_files(iban)
+        with STORE_LOCKS.iban_lock(iban):
+            balances = self.transaction_balances({iban}, transactions_file)
+            if iban not in balances:
+                raise AccountManagementException("IBAN not found")
+
+            last_balance = {"IBAN": iban,
+                            "time": datetime.timestamp(datetime.now(timezone.utc)),
+                            "BALANCE": balances[iban]}
+            self.append_balances([last_balance], balances_file)
         return True
+
+    def calculate_balances(self, ibans):
+        """calculates the balance of several ibans with a single pass over
+        the transactions and a single write of the balances file (per shard).
+        Returns, in order, the balance (as JSON) or the exception of each one
+        (the error of its shard when its transactions cannot be read)"""
+        results = []
+        sums = {}
+        errors = {}
+        for iban in ibans:
+            try:
+                iban = self.validate_iban(iban)
+            except AccountManagementException as ex:
+                results.append(ex)
+            else:
+                sums[iban] = None
+                results.append(iban)
+        with STORE_LOCKS.ibans_locked(sums):
+            shards = self.group_by_store(sums, self.balance_files)
+            for (transactions_file, _), shard_ibans in shards:
+                try:
+                    sums.update(self.transaction_balances(set(shard_ibans), transactions_file))
+                except AccountManagementException as ex:
+                    errors.update(dict.fromkeys(shard_ibans, ex))
+            balance_time = datetime.timestamp(datetime.now(timezone.utc))
+            for index, result in enumerate(results):
+                if isinstance(result, AccountManagementException):
+                    continue
+                if result in errors:
+                    results[index] = errors[result]
+                elif sums[result] is None:
+                    results[index] = AccountManagementException("IBAN not found")
+                else:
+                    results[index] = {"IBAN": result, "time": balance_time, "BALANCE": sums[result]}
+            for (_, balances_file), shard_ibans in shards:
+                new_balances = [{"IBAN": iban, "time": balance_time, "BALANCE": sums[iban]}
+                                for iban in shard_ibans if sums[iban] is not None]
+                if new_balances:
+                    self.append_balances(new_balances, balances_file)
+        return results
+
+    def use_balance_index(self, balance_index):
+        """sets the index used for point-in-time balances; None restores the default"""
+        self._balance_index = balance_index
+
+    def balance_index(self, iban=None):
+        """returns the point-in-time balance index (of the shard of iban
+        when a router is set), indexing the new transactions"""
+        shard = self.store_shard(iban)
+        if shard is not None:
+            balance_index = shard.balance_index()
+        else:
+            if self._balance_index is None:
+                with self._instance_lock:
+                    if self._balance_index is None:
+                        self._balance_index = BalancePrefixIndex()
+            balance_index = self._balance_index
+        with STORE_LOCKS.file_lock(balance_index.index_file), \
+                METRICS.span("balance_index.refresh"):
+            if balance_index.refresh():
+                balance_index.save()
+        return balance_index
+
+    def balance_as_of(self, iban, as_of):
+        """returns the balance of an iban as of a UTC timestamp or a DD/MM/YYYY date"""
+        iban = self.validate_iban(iban)
+        balance_index = self.balance_index(iban)
+        with STORE_LOCKS.file_lock(balance_index.index_file):
+            return balance_index.balance_as_of(iban, as_of)
+
+    def balance_history(self, iban, start=None, end=None):
+        """returns the balances of an iban computed between two UTC timestamps
+        (None for no limit), archived segments included"""
+        balances_store = BalanceJsonStore(self.balance_files(iban)[1])
+        return [balance for balance in balances_store.iter_records(start, end)
+                if balance["IBAN"] == iban]
+
+    def append_balances(self, new_balances, balances_file=BALANCES_STORE_FILE):
+        """appends balances (as JSON) to the balances file"""
+        with STORE_LOCKS.file_lock(balances_file):
+            try:
+                with JsonStore.backend().open(balances_file, "r") as file:
+                    balance_list = json.load(file)
+            except FileNotFoundError:
+                balance_list = []
+            except json.JSONDecodeError as ex:
+                raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+
+            balance_list.extend(new_balances)
+
+            try:
+                with JsonStore.backend().open(balances_file, "w") as file:
+                    json.dump(balance_list, file, indent=2)
+            except FileNotFoundError as ex:
+                raise AccountManagementException("Wrong file  or file path") from ex
+            BalanceJsonStore.publish_changes(new_balances)
+        if self._store_rotation is not None:
+            self.rotate_store(BalanceJsonStore(balances_file))
@@ -0,0 +1,140 @@
+"""
+cli.py
+
+Console entry point (uc3m-money) driving a single warm AccountManager.
+
+Every subcommand reads NDJSON requests from stdin, one JSON object per
+line, processes them in batches and writes one NDJSON result per request to
+stdout, in the same order. A throughput summary is written to stderr.
+
+    transfer  {"from_iban", "to_iban", "concept", "transfer_type", "date", "amount"}
+    deposit   {"IBAN", "AMOUNT"} or {"file": <deposit input file>}
+    balance   {"IBAN"}
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.account_manager import AccountManager
+
+DEFAULT_BATCH_SIZE = 500
+TRANSFER_FIELDS = ("from_iban", "to_iban", "concept", "transfer_type", "date", "amount")
+
+
+def _error(message):
+    """result line of a failed request"""
+    return {"ok": False, "error": message}
+
+
+def _outcome(result, key):
+    """result line of a request given its result or exception"""
+    if isinstance(result, AccountManagementException):
+        return _error(result.message)
+    if isinstance(result, dict):
+        return dict(result, ok=True)
+    return {"ok": True, key: result}
+
+
+def _process_batch(manager, command, requests):
+    """returns the result line of every request of a batch, in order"""
+    outcomes = [None] * len(requests)
+    valid_indexes = []
+    valid_requests = []
+    for index, request in enumerate(requests):
+        try:
+            if command == "transfer":
+                valid_requests.append({field: request[field] for field in TRANSFER_FIELDS})
+            elif command == "deposit" and "file" in request:
+                with open(request["file"], "rb") as file:
+                    valid_requests.append(json.loads(file.read().decode("utf-8")))
+            else:
+                valid_requests.append(request if command == "deposit" else request["IBAN"])
+            valid_indexes.append(index)
+        except (KeyError, TypeError):
+            outcomes[index] = _error("Error - Invalid Key in JSON")
+        except FileNotFoundError:
+            outcomes[index] = _error("Error: file input not found")
+        except ValueError:
+            outcomes[index] = _error("JSON Decode Error - Wrong JSON Format")
+
+    if command == "transfer":
+        results = manager.transfer_requests(valid_requests)
+        key = "transfer_code"
+    elif command == "deposit":
+        results = manager.deposits_into_account(valid_requests)
+        key = "deposit_signature"
+    else:
+        results = manager.calculate_balances(valid_requests)
+        key = "BALANCE"
+    for index, result in zip(valid_indexes, results):
+        outcomes[index] = _outcome(result, key)
+    return outcomes
+
+
+def _read_requests(lines):
+    """parses the NDJSON lines lazily, skipping blank lines"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def _batch_outcomes(manager, command, batch):
+    """returns the result line of every parsed line of a batch, in order;
+    lines that are not JSON objects fail alone"""
+    outcomes = [None] * len(batch)
+    indexes = [index for index, request in enumerate(batch) if isinstance(request, dict)]
+    for index, request in enumerate(batch):
+        if not isinstance(request, dict):
+            outcomes[index] = _error("JSON Decode Error - Wrong JSON Format")
+    processed = _process_batch(manager, command, [batch[index] for index in indexes])
+    for index, outcome in zip(indexes, processed):
+        outcomes[index] = outcome
+    return outcomes
+
+
+def run(command, batch_size, input_stream, output_stream, error_stream):
+    """processes every request of input_stream; returns (total, failed)"""
+    manager = AccountManager()
+    requests = _read_requests(input_stream)
+    total = failed = 0
+    start = time.perf_counter()
+    while True:
+        batch = list(itertools.islice(requests, batch_size))
+        if not batch:
+            break
+        outcomes = _batch_outcomes(manager, command, batch)
+        for outcome in outcomes:
+            output_stream.write(json.dumps(outcome) + "\n")
+        output_stream.flush()
+        total += len(outcomes)
+        failed += sum(1 for outcome in outcomes if not outcome["ok"])
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0.0
+    error_stream.write(f"{command}: {total} requests ({total - failed} ok, {failed} failed) "
+                       f"in {elapsed:.3f}s, {rate:.1f} requests/s\n")
+    return total, failed
+
+
+def main(argv=None):
+    """console entry point"""
+    parser = argparse.ArgumentParser(prog="uc3m-money",
+                                     description="Streams NDJSON requests to the "
+                                                 "account manager")
+    parser.add_argument("command", choices=("transfer", "deposit", "balance"))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="requests committed with a single store write")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    run(args.command, args.batch_size, sys.stdin, sys.stdout, sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
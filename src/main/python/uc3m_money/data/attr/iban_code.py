@@ -6,8 +6,8 @@ It checks the format and the control digits according to the official algorithm.
 """
 
 import re
-from src.main.python.uc3m_money.account_management_exception import AccountManagementException
-from src.main.python.uc3m_money.data.attr.attribute import Attribute
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.data.attr.attribute import Attribute
 
 
 class IbanCode(Attribute):
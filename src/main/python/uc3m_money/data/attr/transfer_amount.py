@@ -2,8 +2,8 @@
 Defines the TransferAmount attribute class for validating and storing a transfer amount.
 """
 
-from src.main.python.uc3m_money.account_management_exception import AccountManagementException
-from src.main.python.uc3m_money.data.attr.attribute import Attribute
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.data.attr.attribute import Attribute
 
 class TransferAmount(Attribute):
     """
@@ -1,7 +1,6 @@
 """Validates the transfer date"""
-from datetime import datetime, timezone
-from src.main.python.uc3m_money.account_management_exception import AccountManagementException
-from src.main.python.uc3m_money.data.attr.attribute import Attribute
+from uc3m_money.data.attr.attribute import Attribute
+from uc3m_money.data.transfer_date_validator import TRANSFER_DATE_VALIDATOR
 
 
 class TransferDate(Attribute):
@@ -22,16 +21,5 @@ class TransferDate(Attribute):
         self._attr_value = self._validate(attr_value)
 
     def _validate(self, attr_value):
-        attr_value = super()._validate(attr_value)
-
-        try:
-            my_date = datetime.strptime(attr_value, "%d/%m/%Y").date()
-        except ValueError as ex:
-            raise AccountManagementException("Invalid date format") from ex
-
-        if my_date < datetime.now(timezone.utc).date():
-            raise AccountManagementException("Transfer date must be today or later.")
-
-        if my_date.year < 2025 or my_date.year > 2050:
-            raise AccountManagementException("Invalid date format")
-        return attr_value
+        """Delegates to the shared validator, which memoizes parsed dates"""
+        return TRANSFER_DATE_VALIDATOR.validate(attr_value)
@@ -1,6 +1,6 @@
 """Validates the transfer type"""
 from uc3m_money.account_management_exception import AccountManagementException
-from src.main.python.uc3m_money.data.attr.attribute import Attribute
+from uc3m_money.data.attr.attribute import Attribute
 
 class TransferType(Attribute):
     """Class validates the transfer type"""
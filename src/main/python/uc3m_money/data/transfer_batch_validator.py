@@ -0,0 +1,106 @@
+"""
+transfer_batch_validator.py
+
+This module defines the TransferBatchValidator class, which validates a
+table of transfers column by column instead of row by row.
+
+Each rule runs once over a whole column, and only over the rows that
+passed the previous rules, in the order AccountManager.transfer_request
+checks them: from_iban, to_iban, concept, transfer_type, date and amount.
+So every row gets exactly the message the scalar validation raises, or
+None when it is valid. The IBAN control digits (mod-97) are computed
+once per distinct IBAN of the batch. A cell of the wrong type (e.g. a list
+read from JSON) gets the format error of its column.
+"""
+import re
+from uc3m_money.data.transfer_date_validator import TRANSFER_DATE_VALIDATOR
+
+IBAN_PATTERN = re.compile(r"^ES\d{22}$")
+CONCEPT_PATTERN = re.compile(r"^(?=^.{10,30}$)([a-zA-Z]+(\s[a-zA-Z]+)+)$")
+TYPE_PATTERN = re.compile(r"(ORDINARY|INMEDIATE|URGENT)")
+COLUMNS = ("from_iban", "to_iban", "concept", "transfer_type", "date", "amount")
+
+
+def iban_error(iban):
+    """returns the validation error of an IBAN or None if it is valid"""
+    iban = str(iban).replace(" ", "").upper()
+    if not IBAN_PATTERN.fullmatch(iban):
+        return "Invalid IBAN format"
+    # "ES" moved to the end is "1428"
+    if int(iban[4:] + "1428" + iban[2:4]) % 97 != 1:
+        return "Invalid IBAN control digit"
+    return None
+
+
+def amount_error(amount):
+    """returns the validation error of an amount or None if it is valid"""
+    try:
+        float_amount = float(amount)
+    except (TypeError, ValueError):
+        return "Invalid transfer amount"
+    float_to_string = str(float_amount)
+    if '.' in float_to_string and len(float_to_string.split('.')[1]) > 2:
+        return "Invalid transfer amount"
+    if float_amount < 10 or float_amount > 10000:
+        return "Invalid transfer amount"
+    return None
+
+
+class TransferBatchValidator:
+    """Validates columns of transfers with the messages of transfer_request"""
+
+    def __init__(self):
+        self._iban_errors = {}
+
+    def iban_column(self, ibans):
+        """returns the error (or None) of every IBAN, checking each distinct
+        string once; other values are checked one by one"""
+        errors = self._iban_errors
+        for iban in {iban for iban in ibans if isinstance(iban, str)}.difference(errors):
+            errors[iban] = iban_error(iban)
+        return [errors[iban] if isinstance(iban, str) else iban_error(iban) for iban in ibans]
+
+    @staticmethod
+    def pattern_column(values, pattern, message):
+        """returns message for every value that is not a string matching
+        pattern, None otherwise"""
+        fullmatch = pattern.fullmatch
+        return [None if isinstance(value, str) and fullmatch(value) else message
+                for value in values]
+
+    def column_rules(self):
+        """(column, rule over a list of values) in the order of transfer_request"""
+        return [("from_iban", self.iban_column),
+                ("to_iban", self.iban_column),
+                ("concept", lambda values: self.pattern_column(
+                    values, CONCEPT_PATTERN, "Invalid concept format")),
+                ("transfer_type", lambda values: self.pattern_column(
+                    values, TYPE_PATTERN, "Invalid transfer type")),
+                ("date", TRANSFER_DATE_VALIDATOR.validate_column),
+                ("amount", lambda values: [amount_error(value) for value in values])]
+
+    def validate_columns(self, columns):
+        """
+        Validates a dict of equally long columns keyed by the transfer_request
+        argument names. Returns, for every row, the error message or None.
+        """
+        rows = len(columns[COLUMNS[0]])
+        errors = [None] * rows
+        pending = list(range(rows))
+        for column, rule in self.column_rules():
+            if not pending:
+                break
+            values = columns[column]
+            still_pending = []
+            for row, error in zip(pending, rule([values[row] for row in pending])):
+                if error is None:
+                    still_pending.append(row)
+                else:
+                    errors[row] = error
+            pending = still_pending
+        return errors
+
+    def validate_rows(self, requests):
+        """validates a list of dicts with the transfer_request arguments"""
+        return self.validate_columns({column: [request[column] for request in requests]
+                                      for column in COLUMNS})
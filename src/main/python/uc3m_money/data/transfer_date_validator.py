@@ -0,0 +1,91 @@
+"""
+transfer_date_validator.py
+
+This module defines the TransferDateValidator class, the service used by
+TransferDate and AccountManager to validate transfer dates.
+
+Bulk batches share a handful of dates, so the regex check and the
+strptime call are done once per distinct date string and memoized. The
+current UTC date is only recomputed when the clock leaves the cached day.
+"""
+import re
+import time
+from datetime import datetime, timezone
+from uc3m_money.account_management_exception import AccountManagementException
+
+DATE_PATTERN = re.compile(r"^(([0-2]\d|3[0-1])\/(0\d|1[0-2])\/\d\d\d\d)$")
+SECONDS_PER_DAY = 86400
+
+
+class TransferDateValidator:
+    """
+    Validates transfer dates (DD/MM/YYYY, today or later, year 2025-2050)
+    with the same error messages as the TransferDate attribute.
+    """
+    def __init__(self, max_entries=4096):
+        self._max_entries = max_entries
+        self._parsed_dates = {}
+        self._today = None
+        self._day_start = 0.0
+        self._day_end = 0.0
+
+    def today(self):
+        """returns today's UTC date, refreshed only when the day rolls over"""
+        now = time.time()
+        if not self._day_start <= now < self._day_end:
+            today = datetime.now(timezone.utc).date()
+            day_start = datetime(today.year, today.month, today.day,
+                                 tzinfo=timezone.utc).timestamp()
+            self._day_start, self._day_end = day_start, day_start + SECONDS_PER_DAY
+            self._today = today
+        return self._today
+
+    def parse(self, transfer_date):
+        """returns the date for a well formed string or None, memoized"""
+        if not isinstance(transfer_date, str):
+            return None
+        try:
+            return self._parsed_dates[transfer_date]
+        except KeyError:
+            pass
+        parsed_date = None
+        if DATE_PATTERN.fullmatch(transfer_date):
+            try:
+                parsed_date = datetime.strptime(transfer_date, "%d/%m/%Y").date()
+            except ValueError:
+                parsed_date = None
+        if len(self._parsed_dates) >= self._max_entries:
+            self._parsed_dates.clear()
+        self._parsed_dates[transfer_date] = parsed_date
+        return parsed_date
+
+    def error_message(self, transfer_date, today=None):
+        """returns the validation error of a date string or None if it is valid"""
+        parsed_date = self.parse(transfer_date)
+        if parsed_date is None:
+            return "Invalid date format"
+        if parsed_date < (today or self.today()):
+            return "Transfer date must be today or later."
+        if parsed_date.year < 2025 or parsed_date.year > 2050:
+            return "Invalid date format"
+        return None
+
+    def validate(self, transfer_date):
+        """returns the date string or raises AccountManagementException"""
+        message = self.error_message(transfer_date)
+        if message is not None:
+            raise AccountManagementException(message)
+        return transfer_date
+
+    def validate_column(self, transfer_dates):
+        """returns the error message (or None) for every date of a column"""
+        today = self.today()
+        return [self.error_message(transfer_date, today) for transfer_date in transfer_dates]
+
+    def clear(self):
+        """drops every memoized date"""
+        self._parsed_dates.clear()
+        self._day_start = self._day_end = 0.0
+
+
+TRANSFER_DATE_VALIDATOR = TransferDateValidator()
@@ -0,0 +1,178 @@
+"""
+deposit_directory_watcher.py
+
+This module defines the DepositDirectoryWatcher class, a polling daemon
+that ingests the deposit files landing in a directory.
+
+Each cycle lists the directory with os.scandir, keeps the files whose
+(name, size, mtime) are not in the persisted checkpoint, validates at most
+max_files_per_cycle of them and stores the valid deposits through the
+batch deposit path of AccountManager (one commit per store, credited to
+the available balances and remembered by the deposit file cache when
+those are enabled); a file already in that cache, or with the content of
+an earlier file of the batch, keeps its signature and is not stored
+again. Files beyond that limit wait for the next cycle, so a burst of
+arrivals cannot turn into one huge rewrite of the store. No inotify or
+external service is needed.
+"""
+import json
+import logging
+import os
+import threading
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.account_management_config import (
+    JSON_FILES_DEPOSITS,
+    DEPOSIT_WATCHER_CHECKPOINT_FILE,
+    DEPOSIT_WATCHER_MAX_FILES,
+    DEPOSIT_WATCHER_POLL_INTERVAL)
+from uc3m_money.account_manager import AccountManager
+
+LOGGER = logging.getLogger("uc3m_money.deposit_watcher")
+
+
+class DepositDirectoryWatcher:
+    """Polls a directory and stores the deposits of every new file"""
+
+    def __init__(self, directory=JSON_FILES_DEPOSITS,
+                 checkpoint_file=DEPOSIT_WATCHER_CHECKPOINT_FILE,
+                 max_files_per_cycle=DEPOSIT_WATCHER_MAX_FILES,
+                 poll_interval=DEPOSIT_WATCHER_POLL_INTERVAL):
+        self._directory = directory
+        self._checkpoint_file = checkpoint_file
+        self._max_files_per_cycle = max_files_per_cycle
+        self._poll_interval = poll_interval
+        self._checkpoint = None
+
+    def load_checkpoint(self):
+        """loads the processed files and the batch pending confirmation"""
+        try:
+            with open(self._checkpoint_file, "r", encoding="utf-8", newline="") as file:
+                self._checkpoint = json.load(file)
+        except FileNotFoundError:
+            self._checkpoint = {"files": {}, "pending": {}}
+        except json.JSONDecodeError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        return self._checkpoint
+
+    def save_checkpoint(self):
+        """replaces the checkpoint file atomically"""
+        temp_file = self._checkpoint_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8", newline="") as file:
+            json.dump(self._checkpoint, file, indent=2)
+        os.replace(temp_file, self._checkpoint_file)
+
+    def _recover_pending(self):
+        """settles a batch interrupted between the store commit and the checkpoint"""
+        pending = self._checkpoint["pending"]
+        if not pending:
+            return
+        manager = AccountManager()
+        stored_signatures = set()
+        for deposits_store in {manager.deposits_store(entry.get("to_iban"))
+                               for entry in pending.values()
+                               if "error" not in entry and "known" not in entry}:
+            deposits_store.load_list_from_file()
+            stored_signatures.update(deposit["deposit_signature"]
+                                     for deposit in deposits_store.data_list)
+        for name, entry in pending.items():
+            if ("error" in entry or "known" in entry or
+                    entry["deposit_signature"] in stored_signatures):
+                self._checkpoint["files"][name] = entry
+        self._checkpoint["pending"] = {}
+        self.save_checkpoint()
+
+    def new_files(self):
+        """returns the files not processed yet as (name, size, mtime_ns), oldest first"""
+        processed = self._checkpoint["files"]
+        found = []
+        with os.scandir(self._directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(".json"):
+                    continue
+                file_stat = entry.stat()
+                known = processed.get(entry.name)
+                if (known is None or known["size"] != file_stat.st_size or
+                        known["mtime_ns"] != file_stat.st_mtime_ns):
+                    found.append((entry.name, file_stat.st_size, file_stat.st_mtime_ns))
+        found.sort(key=lambda new_file: (new_file[2], new_file[0]))
+        return found
+
+    def _read_deposit(self, manager, name, entry):
+        """validates a deposit file and records the outcome in its checkpoint
+        entry; returns (deposit, content) when it must be stored, None when
+        it is wrong or already in the deposit file cache"""
+        try:
+            with open(os.path.join(self._directory, name), "rb") as file:
+                content = file.read()
+            known_signature = manager.known_deposit_signature(content)
+            if known_signature is not None:
+                entry["deposit_signature"] = known_signature
+                entry["known"] = True
+                return None
+            deposit = manager.deposit_from_content(content)
+        except AccountManagementException as ex:
+            entry["error"] = ex.message
+            return None
+        except (OSError, ValueError) as ex:
+            entry["error"] = str(ex)
+            return None
+        entry["to_iban"] = deposit.to_iban
+        entry["deposit_signature"] = deposit.deposit_signature
+        return deposit, content
+
+    def _store_batch(self, manager, pending, new_deposits):
+        """stores the (entry, deposit, content) of the batch once its files
+        are recorded as pending; a file with the content of an earlier one
+        takes its signature"""
+        self._checkpoint["pending"] = pending
+        self.save_checkpoint()
+        entries, deposits, contents = zip(*new_deposits)
+        signatures = manager.store_deposits(list(deposits), list(contents))
+        for entry, signature in zip(entries, signatures):
+            if signature != entry["deposit_signature"]:
+                entry["deposit_signature"] = signature
+                entry["known"] = True
+
+    def run_once(self):
+        """processes one batch of new files; returns a summary of the cycle"""
+        if self._checkpoint is None:
+            self.load_checkpoint()
+        self._recover_pending()
+        new_files = self.new_files()
+        batch = new_files[:self._max_files_per_cycle]
+        manager = AccountManager()
+        new_deposits = []
+        pending = {}
+        for name, size, mtime_ns in batch:
+            entry = {"size": size, "mtime_ns": mtime_ns}
+            new_deposit = self._read_deposit(manager, name, entry)
+            if new_deposit is not None:
+                new_deposits.append((entry,) + new_deposit)
+            pending[name] = entry
+
+        if new_deposits:
+            self._store_batch(manager, pending, new_deposits)
+        self._checkpoint["files"].update(pending)
+        self._checkpoint["pending"] = {}
+        if batch:
+            self.save_checkpoint()
+
+        rejected = sum(1 for entry in pending.values() if "error" in entry)
+        summary = {"processed": len(batch) - rejected,
+                   "rejected": rejected,
+                   "deferred": len(new_files) - len(batch)}
+        if summary["deferred"]:
+            LOGGER.warning("deposit backlog: %d files deferred to the next cycle",
+                           summary["deferred"])
+        return summary
+
+    def run(self, stop_event=None, max_cycles=None):
+        """polls the directory until stop_event is set (or max_cycles are run)"""
+        stop_event = stop_event or threading.Event()
+        cycles = 0
+        while not stop_event.is_set():
+            self.run_once()
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+            stop_event.wait(self._poll_interval)
@@ -3,10 +3,15 @@ Provides the IbanBalance class to calculate and serialize the balance for a give
 Handles reading transactions from a JSON file and raises AccountManagementException on errors.
 """
 import json
+import math
 from datetime import datetime, timezone
-from src.main.python.uc3m_money.account_management_exception import AccountManagementException
-from src.main.python.uc3m_money.data.attr.iban_code import IbanCode
-from src.main.python.uc3m_money.account_management_config import TRANSACTIONS_STORE_FILE
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.data.attr.iban_code import IbanCode
+from uc3m_money.account_management_config import TRANSACTIONS_STORE_FILE
+from uc3m_money.metrics.metrics_registry import METRICS
+from uc3m_money.store.balance_prefix_index import BalancePrefixIndex
+from uc3m_money.store.json_store import JsonStore
+from uc3m_money.store.store_locks import STORE_LOCKS
 
 
 class IbanBalance:
@@ -16,50 +21,70 @@ class IbanBalance:
     This class provides methods to calculate the balance for a specific IBAN
     by reading the transactions from a JSON file and serializing the result.
     """
-    def __init__(self, iban):
+    def __init__(self, iban, as_of=None):
         """
         Initializes the IbanBalance object, validates the IBAN,
         sets the timestamp for the balance, and calculates the balance
+        (as of a UTC timestamp or a DD/MM/YYYY date when as_of is given)
         """
         self._iban = IbanCode(iban).value
         self.__last_balance_time = datetime.timestamp(datetime.now(timezone.utc))
-        self.__balance = self.calculate_iban_balance()
+        self.__as_of = as_of
+        if as_of is None:
+            self.__balance = self.calculate_iban_balance()
+        else:
+            self.__balance = self.calculate_iban_balance_as_of(as_of)
 
     def calculate_iban_balance(self):
         """
         Calculates the current balance for the IBAN by summing up all transactions
-        associated with it.
+        associated with it (with math.fsum, as AccountManager does).
         """
 
         transactions_list = self.read_transactions_file()
-        iban_found = False
-        current_balance = 0
-        for transaction in transactions_list:
-            # print(transaction["IBAN"] + " - " + iban)
-            if transaction["IBAN"] == self._iban:
-                current_balance += float(transaction["amount"])
-                iban_found = True
-        if not iban_found:
+        amounts = []
+        with METRICS.span("iban_balance.sum"):
+            METRICS.increment("records_scanned", len(transactions_list))
+            for transaction in transactions_list:
+                # print(transaction["IBAN"] + " - " + iban)
+                if transaction["IBAN"] == self._iban:
+                    amounts.append(float(transaction["amount"]))
+        if not amounts:
             raise AccountManagementException("IBAN not found")
-        return current_balance
+        return math.fsum(amounts)
+
+    def calculate_iban_balance_as_of(self, as_of):
+        """
+        Calculates the balance of the IBAN as of a past moment with the
+        per-IBAN prefix sums of the balance index.
+        """
+        balance_index = BalancePrefixIndex()
+        with STORE_LOCKS.file_lock(balance_index.index_file):
+            with METRICS.span("balance_index.refresh"):
+                if balance_index.refresh():
+                    balance_index.save()
+            return balance_index.balance_as_of(self._iban, as_of)
 
     @staticmethod
     def read_transactions_file():
         """loads the content of the transactions file
         and returns a list"""
-        try:
-            with open(TRANSACTIONS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
-                input_list = json.load(file)
-        except FileNotFoundError as ex:
-            raise AccountManagementException("Wrong file  or file path") from ex
-        except json.JSONDecodeError as ex:
-            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        with METRICS.span("iban_balance.load_transactions"):
+            try:
+                input_list = JsonStore.backend().load_json(TRANSACTIONS_STORE_FILE)
+            except FileNotFoundError as ex:
+                raise AccountManagementException("Wrong file  or file path") from ex
+            except json.JSONDecodeError as ex:
+                raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
         return input_list
 
     def to_json(self):
         """
         Loads and parses the transactions JSON file.
         """
-        return {"IBAN": self._iban,
-                        "time": self.__last_balance_time,
-                        "BALANCE": self.__balance}
+        balance = {"IBAN": self._iban,
+                   "time": self.__last_balance_time,
+                   "BALANCE": self.__balance}
+        if self.__as_of is not None:
+            balance["AS_OF"] = self.__as_of
+        return balance
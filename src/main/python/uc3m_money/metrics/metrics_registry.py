@@ -0,0 +1,207 @@
+"""
+metrics_registry.py
+
+This module provides the MetricsRegistry class, a lightweight collector of
+spans, counters and latency histograms for the hot paths of the package
+(AccountManager, JsonStore and IbanBalance).
+
+The registry is disabled by default. While disabled, span() hands back a
+shared no-op context manager and increment()/observe() return at once, so
+the instrumented code pays only an attribute lookup and a call.
+"""
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _NullSpan:
+    """Context manager returned while the registry is disabled"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Times a block of code and reports it to the registry"""
+    __slots__ = ("_registry", "_name", "_start")
+
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._registry.record_span(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds)"""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        """adds one observation to the histogram"""
+        index = 0
+        for upper_bound in self.buckets:
+            if seconds <= upper_bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    def to_json(self):
+        """returns the histogram data in json format"""
+        return {"buckets": list(self.buckets),
+                "counts": list(self.counts),
+                "sum": self.total,
+                "count": self.count}
+
+
+#pylint: disable=too-few-public-methods
+class CallTrace:
+    """Spans recorded while serving one traced call"""
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.counters = {}
+        self.duration = 0.0
+
+    def to_json(self):
+        """returns the trace data in json format"""
+        return {"name": self.name,
+                "duration": self.duration,
+                "spans": [{"name": name, "seconds": seconds} for name, seconds in self.spans],
+                "counters": dict(self.counters)}
+
+
+class _Trace:
+    """Context manager collecting the spans of one call"""
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._trace = CallTrace(name)
+        self._previous = None
+        self._start = 0.0
+
+    def __enter__(self):
+        local = self._registry.local
+        self._previous = getattr(local, "trace", None)
+        local.trace = self._trace
+        self._start = time.perf_counter()
+        return self._trace
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._trace.duration = time.perf_counter() - self._start
+        self._registry.local.trace = self._previous
+        self._registry.record_trace(self._trace)
+        return False
+
+
+class MetricsRegistry:
+    """Collects spans, counters and latency histograms and pushes them to sinks"""
+    def __init__(self):
+        self.enabled = False
+        self.tracing = False
+        self.local = threading.local()
+        self._sinks = []
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def enable(self, sinks=None, tracing=False):
+        """starts collecting metrics and sends them to the given sinks"""
+        self._sinks = list(sinks or [])
+        self.tracing = tracing
+        self.enabled = True
+
+    def disable(self):
+        """stops collecting metrics; the collected values are kept"""
+        self.enabled = False
+        self.tracing = False
+
+    def reset(self):
+        """drops all the collected values"""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+
+    def span(self, name):
+        """returns a context manager timing the enclosed block"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def trace(self, name):
+        """returns a context manager recording every span of one call"""
+        if not self.tracing:
+            return _NULL_SPAN
+        return _Trace(self, name)
+
+    def increment(self, name, value=1):
+        """adds value to the counter name"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        trace = getattr(self.local, "trace", None)
+        if trace is not None:
+            trace.counters[name] = trace.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """adds a latency observation to the histogram name"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def record_span(self, name, seconds):
+        """stores the duration of a finished span"""
+        self.observe(name, seconds)
+        trace = getattr(self.local, "trace", None)
+        if trace is not None:
+            trace.spans.append((name, seconds))
+
+    def record_trace(self, trace):
+        """sends a finished call trace to the sinks"""
+        for sink in self._sinks:
+            sink.record_trace(trace)
+
+    def counter(self, name):
+        """returns the current value of a counter"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self):
+        """returns a copy of every counter and histogram"""
+        with self._lock:
+            return {"counters": dict(self._counters),
+                    "histograms": {name: histogram.to_json()
+                                   for name, histogram in self._histograms.items()}}
+
+    def flush(self):
+        """exports the current snapshot to every sink"""
+        snapshot = self.snapshot()
+        for sink in self._sinks:
+            sink.export(snapshot)
+        return snapshot
+
+
+METRICS = MetricsRegistry()
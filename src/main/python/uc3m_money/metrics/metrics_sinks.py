@@ -0,0 +1,89 @@
+"""
+metrics_sinks.py
+
+This module provides the sinks the MetricsRegistry can export to: an
+in-memory sink (useful in tests), a sink writing to the standard logging
+module and a sink writing the Prometheus text exposition format to a file.
+
+Every sink implements record_trace(trace) for per-call traces and
+export(snapshot) for the aggregated counters and histograms.
+"""
+import logging
+import os
+import re
+
+
+class MemorySink:
+    """Keeps every trace and snapshot in memory"""
+    def __init__(self):
+        self.traces = []
+        self.snapshots = []
+
+    def record_trace(self, trace):
+        """stores a finished call trace"""
+        self.traces.append(trace.to_json())
+
+    def export(self, snapshot):
+        """stores an exported snapshot"""
+        self.snapshots.append(snapshot)
+
+
+class LogSink:
+    """Writes traces and snapshots to a logger"""
+    def __init__(self, logger=None, level=logging.INFO):
+        self._logger = logger or logging.getLogger("uc3m_money.metrics")
+        self._level = level
+
+    def record_trace(self, trace):
+        """logs a finished call trace"""
+        self._logger.log(self._level, "trace %s %.6fs %s %s", trace.name, trace.duration,
+                         ", ".join(f"{name}={seconds:.6f}s" for name, seconds in trace.spans),
+                         trace.counters)
+
+    def export(self, snapshot):
+        """logs every counter and histogram of a snapshot"""
+        for name, value in sorted(snapshot["counters"].items()):
+            self._logger.log(self._level, "counter %s=%s", name, value)
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            self._logger.log(self._level, "histogram %s count=%d sum=%.6fs",
+                             name, histogram["count"], histogram["sum"])
+
+
+class PrometheusFileSink:
+    """Writes snapshots to a file using the Prometheus text format"""
+    def __init__(self, file_path, prefix="uc3m_money"):
+        self._file_path = file_path
+        self._prefix = prefix
+
+    def _metric_name(self, name):
+        """returns a valid Prometheus metric name"""
+        return re.sub(r"[^a-zA-Z0-9_]", "_", self._prefix + "_" + name)
+
+    def record_trace(self, trace):
+        """per-call traces are not part of the Prometheus exposition"""
+
+    def render(self, snapshot):
+        """returns the snapshot in the Prometheus text format"""
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = self._metric_name(name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            metric = self._metric_name(name) + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for upper_bound, count in zip(histogram["buckets"], histogram["counts"]):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{upper_bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{metric}_sum {histogram['sum']}")
+            lines.append(f"{metric}_count {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, snapshot):
+        """replaces the metrics file with the given snapshot"""
+        temp_file = self._file_path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8", newline="") as file:
+            file.write(self.render(snapshot))
+        os.replace(temp_file, self._file_path)
@@ -0,0 +1,242 @@
+"""
+posting_engine.py
+
+This module defines the PostingEngine class, which turns the accepted
+transfers and deposits into ledger rows of the transactions file.
+
+A transfer posts a debit on its from_iban and a credit on its to_iban; a
+deposit posts a credit on its to_iban. Rows use the existing ledger format
+{"IBAN": ..., "amount": "+0.00"} plus the UTC timestamp of the run that
+posted them ("time"), the moment point-in-time balances apply them
+from. The engine keeps a watermark per source
+store (the byte offset after the last record posted and the number of
+records posted), so each run only parses the records appended since, and
+all the rows of a run are appended with a single write of the ledger.
+The transfers may come from a list of files (e.g. the partitions of a
+partitioned store, or the transfers of every bank shard), each one with
+its own watermark. An engine told which IBANs its ledger holds only posts
+their legs, so the ledger of each bank shard gets the debits of its
+senders and the credits of its receivers, whatever shard the transfer
+was stored in.
+
+Transfers dated after today are not posted when they are read: they wait
+in a ScheduledTransfersIndex kept next to the checkpoint, bucketed by
+transfer_date. Every run posts, in the same ledger write, the buckets of
+every day up to today, so runs missed during a downtime are caught up.
+
+Before that write the rows are recorded as pending in the checkpoint. A
+run interrupted between the ledger write and the checkpoint update checks
+whether the pending rows reached the ledger, so it never posts twice.
+
+Sources are read from the backend of their store class, and the ledger,
+the checkpoint and the scheduled index are kept in the one of the
+transactions store, so a run on a MemoryBackend never touches the disk.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from uc3m_money.account_management_config import (TRANSFERS_STORE_FILE,
+                                                  DEPOSITS_STORE_FILE,
+                                                  TRANSACTIONS_STORE_FILE,
+                                                  POSTING_CHECKPOINT_FILE)
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.data.transfer_date_validator import TRANSFER_DATE_VALIDATOR
+from uc3m_money.metrics.metrics_registry import METRICS
+from uc3m_money.store.store_archive import StoreArchive
+from uc3m_money.store.scheduled_transfers_index import ScheduledTransfersIndex, bucket_day
+from uc3m_money.store.store_locks import STORE_LOCKS
+from uc3m_money.store.deposit_json_store import DepositJsonStore
+from uc3m_money.store.transaction_json_store import TransactionJsonStore
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+from uc3m_money.store.transactions_shard_scanner import read_appended_records
+
+TRANSFERS = "transfers"
+DEPOSITS = "deposits"
+
+
+def ledger_amount(amount):
+    """formats an amount as the signed string of a ledger row"""
+    return f"{amount:+.2f}"
+
+
+class PostingEngine:  # pylint: disable=too-many-instance-attributes
+    """Posts the transfers and deposits appended since the last watermark"""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, transfers_file=TRANSFERS_STORE_FILE,
+                 deposits_file=DEPOSITS_STORE_FILE,
+                 transactions_file=TRANSACTIONS_STORE_FILE,
+                 checkpoint_file=POSTING_CHECKPOINT_FILE,
+                 owns_iban=None):
+        """transfers_file may be a list of files; owns_iban, when given,
+        tells the IBANs whose legs are posted to this ledger"""
+        if isinstance(transfers_file, str):
+            self._sources = {TRANSFERS: transfers_file}
+        else:
+            checkpoint_path = os.path.dirname(os.path.abspath(checkpoint_file))
+            self._sources = {
+                TRANSFERS + "/" + os.path.relpath(os.path.abspath(file_name),
+                                                  checkpoint_path).replace(os.sep, "/"):
+                    file_name
+                for file_name in transfers_file}
+        self._owns_iban = owns_iban
+        self._sources[DEPOSITS] = deposits_file
+        self._backends = {source: TransfersJsonStore.backend() for source in self._sources}
+        self._backends[DEPOSITS] = DepositJsonStore.backend()
+        self._backend = TransactionJsonStore.backend()
+        self._transactions_file = transactions_file
+        self._checkpoint_file = checkpoint_file
+        self._checkpoint = None
+        self._scheduled = ScheduledTransfersIndex(
+            os.path.splitext(checkpoint_file)[0] + "_scheduled.json", self._backend)
+
+    def owns(self, iban):
+        """True when the legs of an IBAN are posted to this ledger"""
+        return self._owns_iban is None or self._owns_iban(iban)
+
+    @property
+    def scheduled(self):
+        """Index of the transfers waiting for their transfer_date"""
+        return self._scheduled
+
+    @staticmethod
+    def _empty_watermark():
+        """watermark of a source nothing was posted from"""
+        return {"offset": 0, "tail": "", "count": 0}
+
+    def load_checkpoint(self):
+        """loads the watermarks and the run pending confirmation"""
+        try:
+            with self._backend.open(self._checkpoint_file, "r") as file:
+                self._checkpoint = json.load(file)
+        except FileNotFoundError:
+            self._checkpoint = {source: self._empty_watermark() for source in self._sources}
+            self._checkpoint["pending"] = None
+        except json.JSONDecodeError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        return self._checkpoint
+
+    def save_checkpoint(self):
+        """replaces the checkpoint file atomically"""
+        self._backend.write(self._checkpoint_file, json.dumps(self._checkpoint, indent=2))
+
+    @staticmethod
+    def transfer_rows(transfer, posted_at):
+        """debit and credit rows of a transfer posted at a UTC timestamp
+        (its amount may be stored as a string, as transfer_request accepts it)"""
+        amount = float(transfer["transfer_amount"])
+        return [{"IBAN": transfer["from_iban"],
+                 "amount": ledger_amount(-amount),
+                 "time": posted_at},
+                {"IBAN": transfer["to_iban"],
+                 "amount": ledger_amount(amount),
+                 "time": posted_at}]
+
+    @staticmethod
+    def deposit_rows(deposit, posted_at):
+        """credit row of a deposit posted at a UTC timestamp"""
+        return [{"IBAN": deposit["to_iban"],
+                 "amount": ledger_amount(float(deposit["deposit_amount"])),
+                 "time": posted_at}]
+
+    @staticmethod
+    def split_due(transfers, today):
+        """splits transfers into (due up to today, scheduled after today);
+        today is an ISO date"""
+        due, scheduled = [], []
+        for transfer in transfers:
+            try:
+                future = bucket_day(transfer["transfer_date"]) > today
+            except (KeyError, TypeError, ValueError):
+                future = False
+            (scheduled if future else due).append(transfer)
+        return due, scheduled
+
+    def _apply_schedule(self, schedule):
+        """adds the new scheduled transfers and drops the buckets posted"""
+        if schedule["add"] or schedule["remove"]:
+            self._scheduled.add(schedule["add"])
+            self._scheduled.remove(schedule["remove"])
+            self._scheduled.save()
+
+    def _new_records(self, source):
+        """returns (records not posted yet, new watermark) of a source store"""
+        watermark = self._checkpoint.get(source) or self._empty_watermark()
+        file_name = self._sources[source]
+        backend = self._backends[source]
+        try:
+            with STORE_LOCKS.file_lock(file_name):
+                records, offset, tail, rewound = read_appended_records(
+                    file_name, watermark["offset"], watermark["tail"], backend)
+        except FileNotFoundError:
+            return [], watermark
+        except ValueError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        if rewound:
+            archive = StoreArchive(file_name) if backend.on_disk else None
+            if archive is not None and archive.archived_records():
+                records = list(archive.iter_records())
+            records = records[watermark["count"]:]
+        return records, {"offset": offset, "tail": tail,
+                         "count": watermark["count"] + len(records)}
+
+    def _recover_pending(self, ledger):
+        """settles a run interrupted between the ledger write and the checkpoint"""
+        pending = self._checkpoint["pending"]
+        if not pending:
+            return
+        rows_before = pending["rows_before"]
+        posted = ledger.data_list[rows_before:rows_before + len(pending["rows"])]
+        if posted == pending["rows"]:
+            self._checkpoint.update(pending["watermarks"])
+            self._apply_schedule(pending["schedule"])
+        self._checkpoint["pending"] = None
+        self.save_checkpoint()
+
+    def run_once(self):
+        """posts every record appended since the watermarks; returns a summary"""
+        if self._checkpoint is None:
+            self.load_checkpoint()
+        with STORE_LOCKS.file_lock(self._transactions_file):
+            ledger = TransactionJsonStore(self._transactions_file)
+            return self._post(ledger)
+
+    def _post(self, ledger):
+        """posts the new records into the loaded ledger, holding its lock"""
+        with METRICS.span("posting_engine.run"):
+            self._scheduled.load()
+            self._recover_pending(ledger)
+            new_records = {source: self._new_records(source) for source in self._sources}
+            deposits = new_records[DEPOSITS][0]
+            transfers = [transfer for source, (records, _) in new_records.items()
+                         if source != DEPOSITS for transfer in records
+                         if self.owns(transfer["from_iban"]) or self.owns(transfer["to_iban"])]
+            today = TRANSFER_DATE_VALIDATOR.today().isoformat()
+            due_days = self._scheduled.due_days(today)
+            transfers, scheduled = self.split_due(transfers, today)
+            transfers = [transfer for day in due_days
+                         for transfer in self._scheduled.bucket(day)] + transfers
+            schedule = {"add": scheduled, "remove": due_days}
+            rows = []
+            posted_at = datetime.timestamp(datetime.now(timezone.utc))
+            for transfer in transfers:
+                rows.extend(row for row in self.transfer_rows(transfer, posted_at)
+                            if self.owns(row["IBAN"]))
+            for deposit in deposits:
+                rows.extend(self.deposit_rows(deposit, posted_at))
+            watermarks = {source: watermark for source, (_, watermark) in new_records.items()}
+            if rows:
+                self._checkpoint["pending"] = {"rows_before": len(ledger.data_list),
+                                               "rows": rows,
+                                               "watermarks": watermarks,
+                                               "schedule": schedule}
+                self.save_checkpoint()
+                ledger.data_list.extend(rows)
+                ledger.save_list_to_file()
+                METRICS.increment("rows_posted", len(rows))
+            self._apply_schedule(schedule)
+            self._checkpoint.update(watermarks)
+            self._checkpoint["pending"] = None
+            self.save_checkpoint()
+        return {"transfers": len(transfers), "deposits": len(deposits),
+                "scheduled": len(scheduled), "rows": len(rows)}
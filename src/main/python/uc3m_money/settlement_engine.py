@@ -0,0 +1,143 @@
+"""
+settlement_engine.py
+
+This module defines the SettlementEngine class, which computes the end of
+day settlement of the transfers of one transfer_date.
+
+The transfers of the day are read with the find_range of the transfers
+store, so only the archived segments requested up to the end of that day
+(or, for a PartitionedTransfersJsonStore, only its month partition) are
+read, and are loaded into three columns: from_iban, to_iban and the amount in int
+cents, so totals are exact. The gross flows are grouped by directed IBAN
+pair and by directed bank pair (IBAN digits 5 to 8) in one pass over the
+columns; net positions are derived from those groups, so their cost
+depends on the number of pairs, not on the number of transfers. The
+report is written as JSON to the settlements directory.
+"""
+import json
+import os
+from array import array
+from uc3m_money.account_management_config import (TRANSFERS_STORE_FILE,
+                                                  SETTLEMENT_REPORTS_PATH)
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.data.transfer_date_validator import TRANSFER_DATE_VALIDATOR
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+
+def bank_code(iban):
+    """bank code of a Spanish IBAN (digits 5 to 8)"""
+    return iban[4:8]
+
+
+def to_amount(cents):
+    """amount of a number of cents"""
+    return cents / 100
+
+
+class SettlementEngine:
+    """Gross and net flows between accounts and banks for one day"""
+
+    def __init__(self, transfers_file=TRANSFERS_STORE_FILE,
+                 reports_path=SETTLEMENT_REPORTS_PATH, transfers_store=None):
+        """transfers_store (e.g. a PartitionedTransfersJsonStore, or a list
+        of stores settled together, like the ones of every bank shard)
+        replaces the store of transfers_file"""
+        self._transfers_file = transfers_file
+        self._reports_path = reports_path
+        self._transfers_store = transfers_store
+
+    def transfers_store(self):
+        """store the transfers are settled from"""
+        if self._transfers_store is None:
+            self._transfers_store = TransfersJsonStore(self._transfers_file)
+        return self._transfers_store
+
+    def transfers_stores(self):
+        """stores the transfers are settled from, as a list"""
+        transfers_store = self.transfers_store()
+        return transfers_store if isinstance(transfers_store, list) else [transfers_store]
+
+    def load_day(self, transfer_date):
+        """returns the columns (from_iban, to_iban, amount cents) of the
+        transfers of a DD/MM/YYYY day"""
+        if TRANSFER_DATE_VALIDATOR.parse(transfer_date) is None:
+            raise AccountManagementException("Invalid date format")
+        columns = {"from_iban": [], "to_iban": [], "amount": array("q")}
+        from_ibans = columns["from_iban"].append
+        to_ibans = columns["to_iban"].append
+        amounts = columns["amount"].append
+        for transfers_store in self.transfers_stores():
+            for transfer in transfers_store.find_range(transfer_date, transfer_date):
+                from_ibans(transfer["from_iban"])
+                to_ibans(transfer["to_iban"])
+                amounts(round(float(transfer["transfer_amount"]) * 100))
+        return columns
+
+    @staticmethod
+    def gross_flows(sources, targets, amounts):
+        """total cents of every directed (source, target) pair"""
+        flows = {}
+        for pair in zip(sources, targets, amounts):
+            key = pair[:2]
+            flows[key] = flows.get(key, 0) + pair[2]
+        return flows
+
+    @staticmethod
+    def net_flows(gross):
+        """flows between the two sides of every pair: (a, b) with a < b"""
+        pairs = {}
+        for (source, target), cents in gross.items():
+            if source == target:
+                continue
+            key = (source, target) if source < target else (target, source)
+            entry = pairs.setdefault(key, [0, 0])
+            entry[0 if source == key[0] else 1] += cents
+        return [{"a": key[0], "b": key[1],
+                 "a_to_b": to_amount(entry[0]), "b_to_a": to_amount(entry[1]),
+                 "net": to_amount(entry[0] - entry[1])}
+                for key, entry in sorted(pairs.items())]
+
+    @staticmethod
+    def positions(gross):
+        """cents sent, received and net (received - sent) of every party"""
+        sent = {}
+        received = {}
+        for (source, target), cents in gross.items():
+            sent[source] = sent.get(source, 0) + cents
+            received[target] = received.get(target, 0) + cents
+        return [{"party": party,
+                 "sent": to_amount(sent.get(party, 0)),
+                 "received": to_amount(received.get(party, 0)),
+                 "net": to_amount(received.get(party, 0) - sent.get(party, 0))}
+                for party in sorted(set(sent) | set(received))]
+
+    def settle(self, transfer_date, columns):
+        """returns the settlement report of the columns of a day"""
+        iban_gross = self.gross_flows(columns["from_iban"], columns["to_iban"],
+                                      columns["amount"])
+        bank_gross = {}
+        for (source, target), cents in iban_gross.items():
+            key = (bank_code(source), bank_code(target))
+            bank_gross[key] = bank_gross.get(key, 0) + cents
+        return {"transfer_date": transfer_date,
+                "transfers": len(columns["amount"]),
+                "gross": to_amount(sum(columns["amount"])),
+                "iban_pairs": self.net_flows(iban_gross),
+                "ibans": self.positions(iban_gross),
+                "bank_pairs": self.net_flows(bank_gross),
+                "banks": self.positions(bank_gross)}
+
+    def report_file(self, transfer_date):
+        """file of the settlement report of a DD/MM/YYYY day"""
+        day, month, year = transfer_date.split("/")
+        return os.path.join(self._reports_path, f"settlement_{year}{month}{day}.json")
+
+    def run(self, transfer_date):
+        """settles a DD/MM/YYYY day, writes its report and returns it"""
+        report = self.settle(transfer_date, self.load_day(transfer_date))
+        os.makedirs(self._reports_path, exist_ok=True)
+        report_file = self.report_file(transfer_date)
+        with open(report_file + ".tmp", "w", encoding="utf-8", newline="") as file:
+            json.dump(report, file, indent=2)
+        os.replace(report_file + ".tmp", report_file)
+        return report
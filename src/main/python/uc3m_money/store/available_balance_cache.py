@@ -0,0 +1,77 @@
+"""
+available_balance_cache.py
+
+This module defines the AvailableBalanceCache class, the in-memory
+available balance of every IBAN used by the sufficient-funds check of
+AccountManager.
+
+The cache is seeded once, on first use, from the balances of the
+transactions file and then kept up to date by the manager: an outgoing
+transfer first reserves its amount, and the reservation is either
+committed (debit of the sender, credit of the receiver) once the transfer
+is stored or released if the store rejects it. Deposits are credited once
+stored. Amounts are kept in int cents, so every check is O(1) and exact.
+"""
+import threading
+from uc3m_money.account_management_config import TRANSACTIONS_STORE_FILE
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.store.transaction_json_store import TransactionJsonStore
+
+
+def to_cents(amount):
+    """int cents of an amount (number or signed string)"""
+    return round(float(amount) * 100)
+
+
+class AvailableBalanceCache:
+    """Balances and reserved amounts of every IBAN, in cents"""
+
+    def __init__(self, transactions_file=TRANSACTIONS_STORE_FILE):
+        self._transactions_file = transactions_file
+        self._lock = threading.Lock()
+        self._balances = None
+        self._reserved = {}
+
+    def _seed(self):
+        """loads the balances of the transactions file once"""
+        if self._balances is None:
+            balances = {}
+            for transaction in TransactionJsonStore(self._transactions_file).data_list:
+                balances[transaction["IBAN"]] = balances.get(transaction["IBAN"], 0) + \
+                    to_cents(transaction["amount"])
+            self._balances = balances
+
+    def available(self, iban):
+        """balance of an iban minus its reserved amounts"""
+        with self._lock:
+            self._seed()
+            return (self._balances.get(iban, 0) - self._reserved.get(iban, 0)) / 100
+
+    def reserve(self, iban, amount):
+        """reserves an outgoing amount or raises "Insufficient funds" """
+        cents = to_cents(amount)
+        with self._lock:
+            self._seed()
+            reserved = self._reserved.get(iban, 0)
+            if self._balances.get(iban, 0) - reserved < cents:
+                raise AccountManagementException("Insufficient funds")
+            self._reserved[iban] = reserved + cents
+
+    def release(self, iban, amount):
+        """drops the reservation of a transfer that was not stored"""
+        with self._lock:
+            self._reserved[iban] -= to_cents(amount)
+
+    def commit(self, from_iban, to_iban, amount):
+        """moves the reservation of a stored transfer to both balances"""
+        cents = to_cents(amount)
+        with self._lock:
+            self._reserved[from_iban] -= cents
+            self._balances[from_iban] = self._balances.get(from_iban, 0) - cents
+            self._balances[to_iban] = self._balances.get(to_iban, 0) + cents
+
+    def credit(self, iban, amount):
+        """adds a stored deposit to the balance of an iban"""
+        with self._lock:
+            self._seed()
+            self._balances[iban] = self._balances.get(iban, 0) + to_cents(amount)
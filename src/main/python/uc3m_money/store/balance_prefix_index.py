@@ -0,0 +1,161 @@
+"""
+balance_prefix_index.py
+
+This module defines the BalancePrefixIndex class, a persisted per-IBAN
+index of the transactions file used for point-in-time balances.
+
+For every IBAN the index keeps the ledger position of each transaction,
+the time it applies from and the cumulative balance after it. That time
+is its "time" field (set by the posting engine); rows without one, like
+the ones written before rows were timestamped, apply from UNTIMED_ROW_TIME,
+the start of the history, so a balance as of a moment never depends on
+when the index was built. A historical balance is then
+a binary search plus a lookup. The index remembers the byte offset right
+after the last record it read, so a refresh only parses the transactions
+appended since; if the bytes before that offset changed, it is rebuilt.
+
+Cumulative balances are the math.fsum of the amounts so far: the index
+keeps, per IBAN, the partials of the exact sum of its amounts, so the
+current balance is the one AccountManager and IbanBalance compute.
+
+The transactions file and the index file are read and written through the
+backend of the transactions store in use; the index is loaded again when
+that backend changes.
+"""
+import json
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from uc3m_money.account_management_config import (TRANSACTIONS_STORE_FILE,
+                                                  BALANCE_INDEX_FILE)
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.data.transfer_date_validator import TRANSFER_DATE_VALIDATOR
+from uc3m_money.store.transaction_json_store import TransactionJsonStore
+from uc3m_money.store.transactions_shard_scanner import read_appended_records, add_partial
+
+UNTIMED_ROW_TIME = 0.0
+
+
+class BalancePrefixIndex:
+    """Cumulative balances of every IBAN by ledger position and time"""
+
+    def __init__(self, transactions_file=TRANSACTIONS_STORE_FILE,
+                 index_file=BALANCE_INDEX_FILE):
+        self._transactions_file = transactions_file
+        self._index_file = index_file
+        self._loaded = None
+        self._offset = 0
+        self._tail = ""
+        self._records = 0
+        self._ibans = {}
+
+    def _reset(self):
+        """forgets every indexed transaction"""
+        self._offset = 0
+        self._tail = ""
+        self._records = 0
+        self._ibans = {}
+
+    @property
+    def index_file(self):
+        """File where the index is persisted"""
+        return self._index_file
+
+    @property
+    def records(self):
+        """Number of transactions indexed"""
+        return self._records
+
+    def load(self):
+        """loads the index file; a missing or unreadable index starts empty"""
+        self._loaded = TransactionJsonStore.backend()
+        try:
+            with self._loaded.open(self._index_file, "r") as file:
+                content = json.load(file)
+            self._offset = content["offset"]
+            self._tail = content["tail"]
+            self._records = content["records"]
+            self._ibans = content["ibans"]
+            for entry in self._ibans.values():
+                if "partials" not in entry:
+                    raise KeyError("partials")
+        except (FileNotFoundError, ValueError, KeyError):
+            self._reset()
+
+    def save(self):
+        """replaces the index file atomically"""
+        content = {"offset": self._offset,
+                   "tail": self._tail,
+                   "records": self._records,
+                   "ibans": self._ibans}
+        TransactionJsonStore.backend().write(self._index_file, json.dumps(content))
+
+    def refresh(self):
+        """indexes the transactions appended since the last refresh; returns how many"""
+        backend = TransactionJsonStore.backend()
+        if self._loaded is not backend:
+            self.load()
+        try:
+            new_records, offset, tail, rewound = read_appended_records(
+                self._transactions_file, self._offset, self._tail, backend)
+        except FileNotFoundError as ex:
+            raise AccountManagementException("Wrong file  or file path") from ex
+        except ValueError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        if rewound:
+            self._reset()
+        for transaction in new_records:
+            self._add(transaction)
+        self._offset, self._tail = offset, tail
+        return len(new_records)
+
+    def _add(self, transaction):
+        """appends a transaction to the entry of its iban"""
+        entry = self._ibans.setdefault(transaction["IBAN"],
+                                       {"positions": [], "times": [], "sums": [],
+                                        "partials": []})
+        moment = float(transaction.get("time", UNTIMED_ROW_TIME))
+        if entry["times"] and moment < entry["times"][-1]:
+            moment = entry["times"][-1]
+        add_partial(entry["partials"], float(transaction["amount"]))
+        entry["positions"].append(self._records)
+        entry["times"].append(moment)
+        entry["sums"].append(math.fsum(entry["partials"]))
+        self._records += 1
+
+    def _entry(self, iban):
+        """index entry of an iban or AccountManagementException"""
+        try:
+            return self._ibans[iban]
+        except KeyError as ex:
+            raise AccountManagementException("IBAN not found") from ex
+
+    def balance_at(self, iban, moment=None):
+        """balance including the transactions applied up to moment (all when None)"""
+        entry = self._entry(iban)
+        if moment is None:
+            return entry["sums"][-1]
+        found = bisect_right(entry["times"], moment)
+        return entry["sums"][found - 1] if found else 0
+
+    def balance_at_position(self, iban, position):
+        """balance including the transactions of the first position ledger records"""
+        entry = self._entry(iban)
+        found = bisect_left(entry["positions"], position)
+        return entry["sums"][found - 1] if found else 0
+
+    def balance_as_of(self, iban, as_of):
+        """
+        balance as of a UTC timestamp, or at the end of a DD/MM/YYYY date
+        (every transaction applied before the next day starts)
+        """
+        if not isinstance(as_of, str):
+            return self.balance_at(iban, as_of)
+        as_of_date = TRANSFER_DATE_VALIDATOR.parse(as_of)
+        if as_of_date is None:
+            raise AccountManagementException("Invalid date format")
+        next_day = datetime(as_of_date.year, as_of_date.month, as_of_date.day,
+                            tzinfo=timezone.utc) + timedelta(days=1)
+        entry = self._entry(iban)
+        found = bisect_left(entry["times"], next_day.timestamp())
+        return entry["sums"][found - 1] if found else 0
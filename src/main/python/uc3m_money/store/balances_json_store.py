@@ -17,3 +17,5 @@ class BalanceJsonStore(JsonStore):
     Stores and retrieves balance data from the configured balances file.
     """
     _FILE_NAME = BALANCES_STORE_FILE
+    _TIME_FIELD = "time"
+    _FEED_NAME = "balances"
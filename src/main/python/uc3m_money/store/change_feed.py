@@ -0,0 +1,223 @@
+"""
+change_feed.py
+
+This module defines the ChangeFeed class, the local change-data-capture
+feed of the records appended to the transfers, deposits and balances
+stores.
+
+Every record appended is written as one NDJSON line {"seq", "time",
+"store", "record"} with a sequence number one higher than the previous
+one. Lines go to segment files named after their first sequence number
+and holding segment_records lines each, so the segment of any offset is
+found with a binary search on the file names and its line is reached
+without parsing the lines before it. A consumer reads the changes after
+its offset (the last sequence number it processed) in batches, and may
+save that offset in the feed under its name to resume later. Segments
+whose last change is older than the retention window are deleted, the
+active one excepted; reading from an offset already deleted raises an
+exception, so a consumer never skips changes silently.
+
+Readers do not take the lock of the writers: a last line without its
+trailing newline is a change still being written (or torn by a crash)
+and is neither read nor counted. The next append drops a torn line
+before writing, since the records it held were never acknowledged.
+
+The feed files are kept in the backend of the stores in use (or in the
+one given), so stores kept in a MemoryBackend get an in-memory feed.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from uc3m_money.account_management_config import (CHANGE_FEED_PATH,
+                                                  CHANGE_FEED_SEGMENT_RECORDS,
+                                                  CHANGE_FEED_RETENTION_SECONDS)
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.store.json_store import JsonStore
+from uc3m_money.store.store_locks import STORE_LOCKS
+
+SEGMENT_PREFIX = "changes_"
+SEGMENT_SUFFIX = ".ndjson"
+OFFSETS_FILE_NAME = "offsets.json"
+
+
+class ChangeFeed:
+    """Sequence-numbered NDJSON feed of the records appended to the stores"""
+
+    def __init__(self, feed_path=CHANGE_FEED_PATH,
+                 segment_records=CHANGE_FEED_SEGMENT_RECORDS,
+                 retention_seconds=CHANGE_FEED_RETENTION_SECONDS, backend=None):
+        self._feed_path = feed_path
+        self._backend = backend
+        self._segment_records = segment_records
+        self._retention_seconds = retention_seconds
+        self._offsets_file = os.path.join(feed_path, OFFSETS_FILE_NAME)
+        self._lock = threading.Lock()
+        self._tail = None
+
+    @property
+    def feed_path(self):
+        """Directory holding the segments and the consumer offsets"""
+        return self._feed_path
+
+    @property
+    def backend(self):
+        """Backend where the feed files are kept: the given one or, when
+        none was, the one of the stores"""
+        return self._backend or JsonStore.backend()
+
+    def _makedirs(self):
+        """creates the feed directory when its files are kept on disk"""
+        if self.backend.on_disk:
+            os.makedirs(self._feed_path, exist_ok=True)
+
+    def _file_lock(self):
+        """lock serializing the appends and deletions of the feed"""
+        return STORE_LOCKS.file_lock(self._feed_path)
+
+    def segments(self):
+        """first sequence number of every segment, oldest first"""
+        names = self.backend.list_dir(self._feed_path)
+        return sorted(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in names
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+    def segment_file(self, first_seq):
+        """file of the segment starting at a sequence number"""
+        return os.path.join(self._feed_path, f"{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}")
+
+    def _segment_lines(self, first_seq):
+        """number of complete changes in a segment, counted again only when
+        its size differs from the last segment counted"""
+        segment_file = self.segment_file(first_seq)
+        size = self.backend.size(segment_file)
+        if self._tail is not None and self._tail[:2] == (first_seq, size):
+            return self._tail[2]
+        with self.backend.open(segment_file, "rb") as file:
+            count = file.read().count(b"\n")
+        self._tail = (first_seq, size, count)
+        return count
+
+    def _drop_torn_line(self, first_seq):
+        """truncates a segment after its last complete line"""
+        segment_file = self.segment_file(first_seq)
+        with self.backend.open(segment_file, "rb") as file:
+            content = file.read()
+        if content and not content.endswith(b"\n"):
+            self.backend.write(segment_file,
+                               content[:content.rfind(b"\n") + 1].decode("utf-8"))
+
+    def last_offset(self):
+        """sequence number of the last change (0 when the feed is empty)"""
+        segments = self.segments()
+        if not segments:
+            return 0
+        return segments[-1] + self._segment_lines(segments[-1]) - 1
+
+    def first_offset(self):
+        """sequence number of the oldest change kept (1 when the feed is empty)"""
+        segments = self.segments()
+        return segments[0] if segments else 1
+
+    def append(self, store, records):
+        """records the records appended to a store; returns the last sequence number"""
+        with self._lock, self._file_lock():
+            self._makedirs()
+            segments = self.segments()
+            if segments:
+                first_seq = segments[-1]
+                self._drop_torn_line(first_seq)
+                count = self._segment_lines(first_seq)
+            else:
+                first_seq, count = 1, 0
+            seq = first_seq + count - 1
+            now = time.time()
+            records = list(records)
+            while records:
+                if count >= self._segment_records:
+                    first_seq, count = seq + 1, 0
+                batch = records[:self._segment_records - count]
+                records = records[len(batch):]
+                lines = []
+                for record in batch:
+                    seq += 1
+                    lines.append(json.dumps({"seq": seq, "time": now, "store": store,
+                                             "record": record}) + "\n")
+                self.backend.append(self.segment_file(first_seq), "".join(lines))
+                count += len(batch)
+            if seq:
+                self._tail = (first_seq, self.backend.size(self.segment_file(first_seq)), count)
+            return seq
+
+    def read(self, offset=0, limit=CHANGE_FEED_SEGMENT_RECORDS):
+        """
+        Returns {"changes", "next_offset"}: at most limit changes after offset
+        (the last sequence number already processed, 0 for the first read)
+        and the offset to read from next time.
+        """
+        if not isinstance(offset, int) or offset < 0:
+            raise AccountManagementException("Invalid offset")
+        if not isinstance(limit, int) or limit < 1:
+            raise AccountManagementException("Invalid limit")
+        segments = self.segments()
+        if segments and offset + 1 < segments[0]:
+            raise AccountManagementException("Change feed offset expired")
+        changes = []
+        position = max(bisect_right(segments, offset + 1) - 1, 0)
+        for first_seq in segments[position:]:
+            skip = offset + 1 - first_seq
+            try:
+                with self.backend.open(self.segment_file(first_seq), "r") as file:
+                    for number, line in enumerate(file):
+                        if not line.endswith("\n"):
+                            break
+                        if number >= skip:
+                            changes.append(json.loads(line))
+                            if len(changes) == limit:
+                                return {"changes": changes, "next_offset": changes[-1]["seq"]}
+            except FileNotFoundError as ex:
+                raise AccountManagementException("Change feed offset expired") from ex
+        return {"changes": changes, "next_offset": changes[-1]["seq"] if changes else offset}
+
+    def load_offsets(self):
+        """saved offset of every consumer"""
+        try:
+            with self.backend.open(self._offsets_file, "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+
+    def offset(self, consumer):
+        """saved offset of a consumer (0 when it never saved one)"""
+        return self.load_offsets().get(consumer, 0)
+
+    def commit_offset(self, consumer, offset):
+        """saves the offset a consumer has processed up to"""
+        with STORE_LOCKS.file_lock(self._offsets_file):
+            offsets = self.load_offsets()
+            offsets[consumer] = offset
+            self._makedirs()
+            self.backend.write(self._offsets_file, json.dumps(offsets, indent=2))
+
+    def tail(self, consumer, limit=CHANGE_FEED_SEGMENT_RECORDS):
+        """next batch of changes of a consumer, after its saved offset"""
+        return self.read(self.offset(consumer), limit)
+
+    def apply_retention(self, now=None):
+        """deletes the full segments whose last change is older than the
+        retention window; returns how many were deleted"""
+        if self._retention_seconds is None:
+            return 0
+        oldest = (time.time() if now is None else now) - self._retention_seconds
+        deleted = 0
+        with self._lock, self._file_lock():
+            for first_seq in self.segments()[:-1]:
+                with self.backend.open(self.segment_file(first_seq), "rb") as file:
+                    last_line = file.readlines()[-1]
+                if json.loads(last_line)["time"] >= oldest:
+                    break
+                self.backend.remove(self.segment_file(first_seq))
+                deleted += 1
+        return deleted
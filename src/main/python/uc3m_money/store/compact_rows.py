@@ -0,0 +1,121 @@
+"""
+compact_rows.py
+
+This module defines the CompactRows class, an optional compact in-memory
+form of the records of a JSON store.
+
+Each record is kept as a tuple whose first item is its RowSchema, shared by
+every record with the same keys, followed by the values in key order.
+Strings up to INTERN_MAX_LENGTH characters (IBANs, concepts, types, dates,
+ledger amounts) are interned, so repeated values are stored once, and
+amounts with exact cents are kept as int cents. A record is turned back
+into a dict only when it is accessed; those dicts are copies, so changing
+them does not change the stored record. Records are expected to be flat,
+like the records of every store of this package.
+"""
+import json
+import sys
+from collections.abc import Sequence
+
+INTERN_MAX_LENGTH = 30
+AMOUNT_KEYS = frozenset(("transfer_amount", "deposit_amount", "BALANCE"))
+
+
+#pylint: disable= too-few-public-methods
+class RowSchema:
+    """Keys of a record and the positions holding int cents"""
+    __slots__ = ("keys", "cents")
+
+    def __init__(self, keys, cents):
+        self.keys = keys
+        self.cents = cents
+
+
+def _is_row(value):
+    """True for a record in compact form"""
+    return type(value) is tuple and value and type(value[0]) is RowSchema  # pylint: disable=unidiomatic-typecheck
+
+
+class CompactRows(Sequence):
+    """List of store records kept as schema-sharing tuples"""
+
+    def __init__(self, items=()):
+        self._schemas = {}
+        self._rows = []
+        self.extend(items)
+
+    @classmethod
+    def from_json(cls, text):
+        """parses a JSON array of records straight into compact rows,
+        without building a dict per record"""
+        rows = cls()
+        rows._rows = json.loads(text, object_pairs_hook=rows._row_from_pairs)
+        return rows
+
+    def _schema(self, keys, cents):
+        """shared schema for a key tuple and its cents positions"""
+        schema = self._schemas.get((keys, cents))
+        if schema is None:
+            schema = self._schemas[(keys, cents)] = RowSchema(
+                tuple(sys.intern(key) for key in keys), cents)
+        return schema
+
+    def _row_from_pairs(self, pairs):
+        """compact row of the (key, value) pairs of a record"""
+        keys = []
+        values = []
+        cents = []
+        for position, (key, value) in enumerate(pairs, start=1):
+            keys.append(key)
+            if isinstance(value, str):
+                if len(value) <= INTERN_MAX_LENGTH:
+                    value = sys.intern(value)
+            elif type(value) is float and key in AMOUNT_KEYS:  # pylint: disable=unidiomatic-typecheck
+                value_cents = round(value * 100)
+                if value_cents / 100 == value:
+                    value = value_cents
+                    cents.append(position)
+            elif _is_row(value):
+                value = self._view(value)
+            values.append(value)
+        return (self._schema(tuple(keys), frozenset(cents)), *values)
+
+    @staticmethod
+    def _view(row):
+        """dict of a compact row"""
+        schema = row[0]
+        item = dict(zip(schema.keys, row[1:]))
+        for position in schema.cents:
+            key = schema.keys[position - 1]
+            item[key] = row[position] / 100
+        return item
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view(row) for row in self._rows[index]]
+        return self._view(self._rows[index])
+
+    def __iter__(self):
+        view = self._view
+        for row in self._rows:
+            yield view(row)
+
+    def __eq__(self, other):
+        if isinstance(other, (CompactRows, list)):
+            return len(self) == len(other) and all(
+                mine == theirs for mine, theirs in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def append(self, item):
+        """adds a record (a dict) at the end"""
+        self._rows.append(self._row_from_pairs(item.items()))
+
+    def extend(self, items):
+        """adds several records (dicts) at the end"""
+        for item in items:
+            self.append(item)
@@ -0,0 +1,98 @@
+"""
+deposit_file_cache.py
+
+This module defines the DepositFileCache class, a JSON store remembering
+the deposit input files already processed. Entries are keyed by the SHA-256
+of the file content and keep the deposit_signature that file produced, so a
+re-delivered file returns its original signature instead of creating a
+second deposit. Entries older than the retention window are dropped.
+
+The entries are indexed by content hash, so a lookup is a dict access, and
+the file is loaded again only when its backend signature changed.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from uc3m_money.account_management_config import (DEPOSIT_FILES_CACHE_FILE,
+                                                  DEPOSIT_FILES_CACHE_RETENTION)
+from uc3m_money.store.json_store import JsonStore
+
+
+class DepositFileCache(JsonStore):
+    """A JSON store class for the content hashes of processed deposit files."""
+    _FILE_NAME = DEPOSIT_FILES_CACHE_FILE
+
+    def __init__(self, file_name=None, retention_seconds=DEPOSIT_FILES_CACHE_RETENTION):
+        """Initializes the cache; retention_seconds=None keeps entries forever."""
+        self._retention_seconds = retention_seconds
+        self._entries = {}
+        self._file_signature = None
+        super().__init__(file_name)
+
+    @staticmethod
+    def content_hash(content: bytes):
+        """Return the key of a deposit input file content"""
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def _now():
+        """Current UTC timestamp"""
+        return datetime.timestamp(datetime.now(timezone.utc))
+
+    def _retained(self, entry):
+        """True when an entry is inside the retention window"""
+        return (self._retention_seconds is None or
+                entry["processed_at"] >= self._now() - self._retention_seconds)
+
+    def load_list_from_file(self):
+        """Load the cache, dropping the entries outside the retention window,
+        and index it by content hash."""
+        with self.file_lock():
+            file_signature = self._BACKEND.signature(self._FILE_NAME)
+            super().load_list_from_file()
+            self._data_list = [entry for entry in self._data_list if self._retained(entry)]
+            self._entries = {}
+            for entry in self._data_list:
+                self._index(entry)
+            self._file_signature = file_signature
+
+    def _index(self, entry):
+        """Index an entry unless its content has a retained older one"""
+        indexed = self._entries.get(entry["content_hash"])
+        if indexed is None or not self._retained(indexed):
+            self._entries[entry["content_hash"]] = entry
+
+    def _refresh(self):
+        """Load the cache again when its file changed since it was loaded"""
+        file_signature = self._BACKEND.signature(self._FILE_NAME)
+        if file_signature is None or file_signature != self._file_signature:
+            self.load_list_from_file()
+
+    def find_signature(self, content_hash):
+        """Return the deposit_signature of an already processed content or None"""
+        with self.file_lock():
+            self._refresh()
+            entry = self._entries.get(content_hash)
+        if entry is None or not self._retained(entry):
+            return None
+        return entry["deposit_signature"]
+
+    def add_signature(self, content_hash, deposit_signature):
+        """Remember the deposit_signature produced by a file content"""
+        self.add_signatures([(content_hash, deposit_signature)])
+
+    def add_signatures(self, signatures):
+        """Remember the deposit_signature produced by every
+        (content_hash, deposit_signature) pair with a single write"""
+        with self.file_lock():
+            self._refresh()
+            processed_at = self._now()
+            new_entries = [{"content_hash": content_hash,
+                            "deposit_signature": deposit_signature,
+                            "processed_at": processed_at}
+                           for content_hash, deposit_signature in signatures]
+            self._data_list.extend(new_entries)
+            self.save_list_to_file()
+            for entry in new_entries:
+                self._index(entry)
+            self._file_signature = self._BACKEND.signature(self._FILE_NAME)
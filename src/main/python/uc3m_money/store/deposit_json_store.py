@@ -7,7 +7,6 @@ JsonStore helper and configures it to use the deposits file
 specified in the application configuration.
 """
 
-from uc3m_money import AccountManagementException
 from uc3m_money.account_management_config import DEPOSITS_STORE_FILE
 from uc3m_money.store.json_store import JsonStore
 
@@ -15,3 +14,6 @@ from uc3m_money.store.json_store import JsonStore
 class DepositJsonStore(JsonStore):
     """A JSON store class specifically for deposit records."""
     _FILE_NAME = DEPOSITS_STORE_FILE
+    _TIME_FIELD = "deposit_date"
+    _IBAN_FIELDS = ("to_iban",)
+    _FEED_NAME = "deposits"
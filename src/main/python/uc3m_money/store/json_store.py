@@ -7,38 +7,167 @@ saving, and error checking for file operations.
 """
 
 import json
+import logging
 from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.metrics.metrics_registry import METRICS
+from uc3m_money.store.store_locks import STORE_LOCKS
+from uc3m_money.store.store_archive import StoreArchive
+from uc3m_money.store.compact_rows import CompactRows
+from uc3m_money.store.store_query_index import query_index
+from uc3m_money.store.store_backend import FILE_BACKEND
+
+LOGGER = logging.getLogger("uc3m_money.change_feed")
 
 
 class JsonStore:
     """A generic JSON store class for loading and saving item lists."""
     _data_list = []
     _FILE_NAME = ""
+    _TIME_FIELD = None
+    _IBAN_FIELDS = ()
+    _TYPE_FIELD = None
+    _COMPACT_ROWS = False
+    _BACKEND = FILE_BACKEND
+    _FEED_NAME = None
+    _CHANGE_FEED = None
+
+    def __init__(self, file_name=None):
+        """Initializes the JsonStore and loads existing data from file.
 
-    def __init__(self):
-        """Initializes the JsonStore and loads existing data from file."""
+        file_name replaces the class file for this instance (e.g. a partition).
+        """
+        if file_name is not None:
+            self._FILE_NAME = file_name  # pylint: disable=invalid-name
         self.load_list_from_file()
 
+    @property
+    def data_list(self):
+        """Items loaded from the file"""
+        return self._data_list
+
+    @property
+    def file_name(self):
+        """File where the items are kept"""
+        return self._FILE_NAME
+
+    def archive(self, max_bytes=None, period_seconds=None):
+        """Archive of the store file, rotated by size and/or age of its records;
+        None when the files are not kept on disk."""
+        if not self._BACKEND.on_disk:
+            return None
+        return StoreArchive(self._FILE_NAME, self._TIME_FIELD,
+                            max_bytes=max_bytes, period_seconds=period_seconds)
+
+    def iter_records(self, start=None, end=None):
+        """Yield, oldest first, the records whose time lies between start and
+        end (both included, None for no limit), archived ones included; the
+        loaded records when the files are not kept on disk."""
+        archive = self.archive()
+        if archive is not None:
+            yield from archive.iter_records(start, end)
+            return
+        self.load_list_from_file()
+        for record in list(self._data_list):
+            moment = record[self._TIME_FIELD]
+            if (start is None or moment >= start) and (end is None or moment <= end):
+                yield record
+
+    @classmethod
+    def use_compact_rows(cls, enabled=True):
+        """Keep the records loaded by this store class (and its subclasses
+        not configured on their own) as CompactRows instead of dicts."""
+        cls._COMPACT_ROWS = enabled
+
+    @classmethod
+    def use_backend(cls, backend=None):
+        """Keep the files of this store class (and its subclasses not
+        configured on their own) in backend, e.g. a MemoryBackend;
+        None restores the files on disk."""
+        cls._BACKEND = backend or FILE_BACKEND
+
+    @classmethod
+    def use_change_feed(cls, change_feed=None):
+        """Record the items appended to this store class (and its subclasses
+        not configured on their own) in change_feed, a ChangeFeed;
+        None stops recording them."""
+        cls._CHANGE_FEED = change_feed
+
+    @classmethod
+    def publish_changes(cls, items):
+        """Record items (as JSON) appended to the store in the change feed.
+
+        It runs once the store is saved, so a feed that cannot be written
+        does not fail the store operation: the error is logged and those
+        changes are missing from the feed.
+        """
+        if cls._CHANGE_FEED is not None and cls._FEED_NAME is not None and items:
+            try:
+                cls._CHANGE_FEED.append(cls._FEED_NAME, items)
+            except OSError:
+                LOGGER.exception("change feed: %d %s changes not recorded",
+                                 len(items), cls._FEED_NAME)
+
+    @classmethod
+    def backend(cls):
+        """Backend where the files of this store class are kept."""
+        return cls._BACKEND
+
+    @classmethod
+    def query(cls, file_name=None, **filters):
+        """Return a page of records in time order (see StoreQueryIndex.page for
+        the filters) reading only those records, without loading the store.
+
+        file_name selects another file than the class one (e.g. a partition).
+        """
+        return query_index(file_name or cls._FILE_NAME, cls._TIME_FIELD,
+                           cls._IBAN_FIELDS, cls._TYPE_FIELD, cls._BACKEND).page(**filters)
+
+    def file_lock(self):
+        """Lock serializing the read-modify-write of the store file."""
+        return STORE_LOCKS.file_lock(self._FILE_NAME)
+
     def save_list_to_file(self):
         """Save the data list to the specified JSON file."""
-        try:
-            with open(self._FILE_NAME, "w", encoding="utf-8", newline="") as file:
-                json.dump(self._data_list, file, indent=2)
-        except FileNotFoundError as ex:
-            raise AccountManagementException("Wrong file or file path") from ex
+        with self.file_lock(), METRICS.span("json_store.save"):
+            try:
+                with self._BACKEND.open(self._FILE_NAME, "w") as file:
+                    json.dump(self._data_list if isinstance(self._data_list, list)
+                              else list(self._data_list), file, indent=2)
+                    if METRICS.enabled:
+                        METRICS.increment("bytes_written", file.tell())
+            except FileNotFoundError as ex:
+                raise AccountManagementException("Wrong file or file path") from ex
 
     def load_list_from_file(self):
         """Load the data list from the specified JSON file."""
-        try:
-            with open(self._FILE_NAME, "r", encoding="utf-8", newline="") as file:
-                self._data_list = json.load(file)
-        except FileNotFoundError:
-            self._data_list = []
-        except json.JSONDecodeError as ex:
-            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        with self.file_lock(), METRICS.span("json_store.load"):
+            try:
+                if self._COMPACT_ROWS:
+                    with self._BACKEND.open(self._FILE_NAME, "r") as file:
+                        self._data_list = CompactRows.from_json(file.read())
+                        if METRICS.enabled:
+                            METRICS.increment("bytes_read", file.tell())
+                else:
+                    self._data_list = self._BACKEND.load_json(self._FILE_NAME)
+            except FileNotFoundError:
+                self._data_list = CompactRows() if self._COMPACT_ROWS else []
+            except json.JSONDecodeError as ex:
+                raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
 
     def add_item(self, item):
         """Add a new item (as JSON) to the list and save."""
-        self.load_list_from_file()
-        self._data_list.append(item.to_json())
-        self.save_list_to_file()
+        new_item = item.to_json()
+        with self.file_lock():
+            self.load_list_from_file()
+            self._data_list.append(new_item)
+            self.save_list_to_file()
+            self.publish_changes([new_item])
+
+    def add_items(self, items):
+        """Add several items (as JSON) to the list with a single save."""
+        new_items = [item.to_json() for item in items]
+        with self.file_lock():
+            self.load_list_from_file()
+            self._data_list.extend(new_items)
+            self.save_list_to_file()
+            self.publish_changes(new_items)
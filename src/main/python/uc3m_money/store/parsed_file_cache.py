@@ -0,0 +1,151 @@
+"""
+parsed_file_cache.py
+
+This module defines the ParsedFileCache class and PARSED_FILES, the
+process-wide cache of the JSON files parsed by the store readers.
+
+Each entry keeps the parsed content of a file together with the (inode,
+size, mtime_ns) of the file when it was read; a file is parsed again only
+when that signature changes. Entries are evicted least recently used
+first once the memory taken by the parsed contents cached, estimated with
+sys.getsizeof, reaches max_bytes. A file modified less than RACY_WINDOW_NS
+before it is read is not cached: a rewrite of the same size within the
+mtime granularity would keep its signature.
+
+Callers get a shallow copy of a cached list, so they may add or drop
+records, but the records are shared: they are kept as ReadOnlyRecord
+dicts, which raise TypeError when changed (dict(record) gives a copy that
+can be changed). Records are flat, like the records of every store.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from uc3m_money.account_management_config import PARSED_FILE_CACHE_BYTES
+from uc3m_money.metrics.metrics_registry import METRICS
+
+RACY_WINDOW_NS = 20_000_000
+
+
+def file_signature(stat):
+    """(inode, size, mtime_ns) of an os.stat result"""
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ReadOnlyRecord(dict):
+    """Record shared by the readers of a cached file"""
+
+    def _read_only(self, *args, **kwargs):
+        """every method changing the record"""
+        raise TypeError("cached records are read-only, change dict(record) instead")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        """copies and pickles are plain dicts"""
+        return dict, (dict(self),)
+
+
+def shared_content(content):
+    """returns (content with its records as ReadOnlyRecord, estimated bytes in memory)"""
+    if isinstance(content, dict):
+        content = [content]
+        single = True
+    elif isinstance(content, list):
+        single = False
+    else:
+        return content, sys.getsizeof(content)
+    size = sys.getsizeof(content)
+    records = []
+    for record in content:
+        if isinstance(record, dict):
+            record = ReadOnlyRecord(record)
+            size += sum(map(sys.getsizeof, record.values()))
+        size += sys.getsizeof(record)
+        records.append(record)
+    return (records[0] if single else records), size
+
+
+class ParsedFileCache:
+    """LRU cache of parsed JSON files validated by their signature"""
+
+    def __init__(self, max_bytes=PARSED_FILE_CACHE_BYTES):
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def load(self, file_name):
+        """parsed content of a JSON file; raises FileNotFoundError or
+        json.JSONDecodeError like reading and parsing it"""
+        key = os.path.abspath(file_name)
+        signature = file_signature(os.stat(key))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                METRICS.increment("parsed_cache_hits")
+                content = entry[1]
+                return list(content) if isinstance(content, list) else content
+            self._stats["misses"] += 1
+        METRICS.increment("parsed_cache_misses")
+        read_ns = time.time_ns()
+        with open(key, "r", encoding="utf-8", newline="") as file:
+            content = json.loads(file.read())
+            if METRICS.enabled:
+                METRICS.increment("bytes_read", file.tell())
+            signature = file_signature(os.fstat(file.fileno()))
+        if signature[2] >= read_ns - RACY_WINDOW_NS:
+            return content
+        content, size = shared_content(content)
+        self._store(key, signature, content, size)
+        return list(content) if isinstance(content, list) else content
+
+    def _store(self, key, signature, content, size):
+        """caches the content of a file, evicting the least recently used"""
+        with self._lock:
+            self._discard(key)
+            if size > self._max_bytes:
+                return
+            self._entries[key] = (signature, content, size)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                self._discard(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _discard(self, key):
+        """drops the entry of a file, if cached"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def invalidate(self, file_name):
+        """forgets a file, e.g. after it was rewritten"""
+        with self._lock:
+            self._discard(os.path.abspath(file_name))
+
+    def clear(self):
+        """forgets every file and resets the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def stats(self):
+        """hits, misses, evictions, hit_rate, entries and estimated bytes cached"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self._max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+PARSED_FILES = ParsedFileCache()
@@ -0,0 +1,234 @@
+"""
+partitioned_transfers_json_store.py
+
+This module defines the PartitionedTransfersJsonStore class, a transfers
+store that keeps one JSON segment per transfer_date month (or, optionally,
+per bank code of the sender IBAN) instead of one monolithic file.
+
+Inserts and duplicate checks only load the segment the new transfer belongs
+to, and date range queries skip the month segments outside the range.
+Paginated queries merge the pages of every partition in time order. The
+store of each partition is created once and kept. split_store() moves
+an existing monolithic transfers file into partitions, merging it with the
+transfers they already hold.
+"""
+
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.account_management_config import (TRANSFERS_PARTITIONS_PATH,
+                                                  TRANSFERS_STORE_FILE,
+                                                  QUERY_PAGE_LIMIT)
+from uc3m_money.store.store_query_index import query_index
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+PARTITION_BY_MONTH = "month"
+PARTITION_BY_BANK = "bank"
+
+
+class PartitionedTransfersJsonStore(TransfersJsonStore):
+    """
+    A transfers store split in one file per partition.
+
+    Keeps the TransfersJsonStore interface: add_item, find_range, query
+    and load_list_from_file (which loads every partition).
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, directory=TRANSFERS_PARTITIONS_PATH, scheme=PARTITION_BY_MONTH):
+        """Initializes the store; partitions are only loaded when needed."""
+        if scheme not in (PARTITION_BY_MONTH, PARTITION_BY_BANK):
+            raise AccountManagementException("Invalid partition scheme")
+        self._directory = directory
+        self._scheme = scheme
+        self._data_list = []
+        self._lock = threading.Lock()
+        self._partitions = {}
+
+    @property
+    def scheme(self):
+        """Partitioning scheme: month or bank"""
+        return self._scheme
+
+    def partition_key(self, transfer):
+        """Return the partition a transfer (as JSON) belongs to."""
+        if self._scheme == PARTITION_BY_BANK:
+            return transfer["from_iban"][4:8]
+        transfer_date = transfer["transfer_date"]
+        return transfer_date[6:10] + "_" + transfer_date[3:5]
+
+    def partition_file(self, key):
+        """Return the file storing the given partition."""
+        return os.path.join(self._directory, "transfers_" + key + ".json")
+
+    def partition_keys(self):
+        """Return the existing partitions, sorted."""
+        return sorted(name[len("transfers_"):-len(".json")]
+                      for name in self._BACKEND.list_dir(self._directory)
+                      if name.startswith("transfers_") and name.endswith(".json"))
+
+    def partition_files(self):
+        """Return the files of the existing partitions, sorted."""
+        return [self.partition_file(key) for key in self.partition_keys()]
+
+    def partition_store(self, key):
+        """Return the TransfersJsonStore of a single partition."""
+        partition_store = self._partitions.get(key)
+        if partition_store is None:
+            with self._lock:
+                partition_store = self._partitions.get(key)
+                if partition_store is None:
+                    if self._BACKEND.on_disk:
+                        os.makedirs(self._directory, exist_ok=True)
+                    partition_store = TransfersJsonStore(file_name=self.partition_file(key))
+                    self._partitions[key] = partition_store
+        return partition_store
+
+    def load_list_from_file(self):
+        """Load the transfers of every partition."""
+        self._data_list = []
+        for key in self.partition_keys():
+            partition_store = self.partition_store(key)
+            partition_store.load_list_from_file()
+            self._data_list.extend(partition_store.data_list)
+
+    def _item_partition_key(self, item):
+        """Return the partition a TransferRequest belongs to."""
+        return self.partition_key({"from_iban": item.from_iban,
+                                   "transfer_date": item.transfer_date})
+
+    def add_item(self, item):
+        """
+        Add a new transfer to its partition, checking for duplicates
+        only against the transfers of that partition.
+        """
+        return self.partition_store(self._item_partition_key(item)).add_item(item)
+
+    def add_items(self, items):
+        """
+        Add several transfers with one write per partition touched.
+
+        Returns, in order, the stored transfer (as JSON) or the
+        AccountManagementException of each item.
+        """
+        results = [None] * len(items)
+        partitions = {}
+        for index, item in enumerate(items):
+            partitions.setdefault(self._item_partition_key(item), []).append(index)
+        for key, indexes in partitions.items():
+            stored = self.partition_store(key).add_items([items[index] for index in indexes])
+            for index, result in zip(indexes, stored):
+                results[index] = result
+        return results
+
+    def archive(self, max_bytes=None, period_seconds=None):  # pylint: disable=unused-argument
+        """Partitions are already bounded by month or bank code; they are not rotated."""
+        return None
+
+    def find_range(self, start_date, end_date):
+        """
+        Return the transfers dated between start_date and end_date (DD/MM/YYYY),
+        loading only the month partitions that overlap the range.
+        """
+        keys = self.partition_keys()
+        if self._scheme == PARTITION_BY_MONTH:
+            first_day = datetime.strptime(start_date, "%d/%m/%Y")
+            last_day = datetime.strptime(end_date, "%d/%m/%Y")
+            first_key = f"{first_day.year:04d}_{first_day.month:02d}"
+            last_key = f"{last_day.year:04d}_{last_day.month:02d}"
+            keys = [key for key in keys if first_key <= key <= last_key]
+        result_list = []
+        for key in keys:
+            result_list.extend(self.partition_store(key).find_range(start_date, end_date))
+        return result_list
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """(time, partition, position) of a cursor or AccountManagementException"""
+        try:
+            moment, key, position = cursor.split("/")
+            return float(moment), key, int(position)
+        except (AttributeError, ValueError) as ex:
+            raise AccountManagementException("Invalid cursor") from ex
+
+    @staticmethod
+    def _partition_after(after, key):
+        """index entry of a partition after which a (time, partition, position)
+        cursor entry continues: entries of the cursor time come before it in
+        earlier partitions and after it in later ones"""
+        if after is None:
+            return None
+        moment, cursor_key, position = after
+        if key != cursor_key:
+            position = -1 if key > cursor_key else sys.maxsize
+        return moment, position
+
+    # a partitioned store has no single file: query is an instance method here
+    # pylint: disable=arguments-differ,arguments-renamed
+    def query(self, file_name=None, cursor=None, limit=QUERY_PAGE_LIMIT, **filters):
+        """
+        Return a page of the transfers of every partition in time order (see
+        StoreQueryIndex.page for the filters); file_name queries a single file.
+
+        Each partition returns its own page after the cursor, and the pages
+        are merged by (time, partition, position), the order of the cursor.
+        """
+        if file_name is not None:
+            return TransfersJsonStore.query(file_name, cursor=cursor, limit=limit, **filters)
+        if not isinstance(limit, int) or limit < 1:
+            raise AccountManagementException("Invalid limit")
+        after = None if cursor is None else self.decode_cursor(cursor)
+        merged = []
+        more = False
+        for key in self.partition_keys():
+            index = query_index(self.partition_file(key), self._TIME_FIELD,
+                                self._IBAN_FIELDS, self._TYPE_FIELD, self._BACKEND)
+            selected, partition_more = index.select(after=self._partition_after(after, key),
+                                                    limit=limit, **filters)
+            merged.extend(((moment, key, position), record)
+                          for (moment, position), record in selected)
+            more = more or partition_more
+        merged.sort(key=lambda pair: pair[0])
+        more = more or len(merged) > limit
+        merged = merged[:limit]
+        next_cursor = None
+        if more:
+            moment, key, position = merged[-1][0]
+            next_cursor = f"{moment!r}/{key}/{position}"
+        return {"items": [record for _, record in merged], "next_cursor": next_cursor}
+
+    def split_store(self, source_file=TRANSFERS_STORE_FILE):
+        """
+        Copy every transfer of a monolithic transfers file into its partition,
+        after the transfers the partition already holds; transfers already in
+        the partition (e.g. when a split is run again) are not copied twice.
+
+        Returns the number of transfers written to each partition.
+        """
+        try:
+            transfer_list = self._BACKEND.load_json(source_file)
+        except FileNotFoundError as ex:
+            raise AccountManagementException("Wrong file or file path") from ex
+        except json.JSONDecodeError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+
+        partitions = {}
+        for transfer in transfer_list:
+            partitions.setdefault(self.partition_key(transfer), []).append(transfer)
+        written = {}
+        for key, transfers in partitions.items():
+            partition_store = self.partition_store(key)
+            with partition_store.file_lock():
+                partition_store.load_list_from_file()
+                stored_keys = {self.duplicate_key(old_transfer)
+                               for old_transfer in partition_store.data_list}
+                new_transfers = [transfer for transfer in transfers
+                                 if self.duplicate_key(transfer) not in stored_keys]
+                if new_transfers:
+                    partition_store.data_list.extend(new_transfers)
+                    partition_store.save_list_to_file()
+            written[key] = len(new_transfers)
+        return written
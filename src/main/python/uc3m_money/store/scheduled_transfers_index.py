@@ -0,0 +1,90 @@
+"""
+scheduled_transfers_index.py
+
+This module defines the ScheduledTransfersIndex class, the persisted index
+of the transfers waiting for their transfer_date to be posted.
+
+Transfers are kept in one bucket per day (ISO YYYY-MM-DD keys, so they
+sort by date) and the sorted list of days is searched with bisect, so
+finding every transfer due up to a day costs O(log days + due) and never
+scans the transfers store. Adding a transfer already in its bucket (same
+transfer_code) does nothing, so a batch can be applied again safely.
+The index file is kept in a store backend, on disk unless told otherwise.
+"""
+import json
+from bisect import bisect_right, insort
+from datetime import datetime
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.store.store_backend import FILE_BACKEND
+
+
+def bucket_day(transfer_date):
+    """ISO day of a DD/MM/YYYY transfer date"""
+    return datetime.strptime(transfer_date, "%d/%m/%Y").date().isoformat()
+
+
+class ScheduledTransfersIndex:
+    """Transfers pending execution, bucketed by transfer_date"""
+
+    def __init__(self, index_file, backend=FILE_BACKEND):
+        self._index_file = index_file
+        self._backend = backend
+        self._buckets = {}
+        self._days = []
+        self._codes = set()
+
+    @property
+    def index_file(self):
+        """File where the index is persisted"""
+        return self._index_file
+
+    @property
+    def pending(self):
+        """Number of transfers waiting for their date"""
+        return len(self._codes)
+
+    def load(self):
+        """loads the index file; a missing file is an empty index"""
+        try:
+            with self._backend.open(self._index_file, "r") as file:
+                self._buckets = json.load(file)
+        except FileNotFoundError:
+            self._buckets = {}
+        except json.JSONDecodeError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        self._days = sorted(self._buckets)
+        self._codes = {transfer["transfer_code"]
+                       for bucket in self._buckets.values() for transfer in bucket}
+        return self
+
+    def save(self):
+        """replaces the index file atomically"""
+        self._backend.write(self._index_file, json.dumps(self._buckets, indent=2))
+
+    def add(self, transfers):
+        """adds transfers to the bucket of their transfer_date"""
+        for transfer in transfers:
+            day = bucket_day(transfer["transfer_date"])
+            bucket = self._buckets.get(day)
+            if bucket is None:
+                bucket = self._buckets[day] = []
+                insort(self._days, day)
+            if transfer["transfer_code"] not in self._codes:
+                self._codes.add(transfer["transfer_code"])
+                bucket.append(transfer)
+
+    def due_days(self, day):
+        """days up to day (ISO, included) with transfers waiting, oldest first"""
+        return self._days[:bisect_right(self._days, day)]
+
+    def bucket(self, day):
+        """transfers scheduled for a day (ISO)"""
+        return list(self._buckets.get(day, []))
+
+    def remove(self, days):
+        """drops the buckets of the days given, once their transfers are posted"""
+        for day in days:
+            bucket = self._buckets.pop(day, None)
+            if bucket is not None:
+                self._days.remove(day)
+                self._codes.difference_update(transfer["transfer_code"] for transfer in bucket)
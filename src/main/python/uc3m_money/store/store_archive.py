@@ -0,0 +1,217 @@
+"""
+store_archive.py
+
+This module defines the StoreArchive class, which keeps a JSON store file
+small by sealing its records into compressed archive segments.
+
+A rotation moves every record of the active file into a gzip segment of
+newline delimited JSON and leaves the active file empty. Rotation is due
+when the active file reaches max_bytes or when its oldest record is older
+than period_seconds. Segments are listed in an index file with the time
+range they cover, so historical queries only open the overlapping segments
+and decompress them as a stream, line by line. Unless told otherwise the
+segments and the index live in the archive directory next to the store
+file, so stores of different roots never share them.
+
+A segment is listed as not sealed until the active file has been emptied;
+a rotation interrupted in between is completed by the next one.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+from uc3m_money.account_management_config import STORE_ARCHIVE_DIR
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.store.store_locks import STORE_LOCKS
+from uc3m_money.store.transactions_shard_scanner import iter_records
+
+
+class StoreArchive:
+    """Rotates a JSON store file into gzip segments indexed by time range"""
+
+    def __init__(self, store_file, time_field="time",  # pylint: disable=too-many-arguments
+                 archive_path=None,
+                 max_bytes=None, period_seconds=None):
+        self._store_file = store_file
+        self._time_field = time_field
+        self._archive_path = archive_path or os.path.join(os.path.dirname(store_file),
+                                                          STORE_ARCHIVE_DIR)
+        self._max_bytes = max_bytes
+        self._period_seconds = period_seconds
+        self._stem = os.path.splitext(os.path.basename(store_file))[0]
+        self._index_file = os.path.join(self._archive_path, self._stem + ".index.json")
+
+    @property
+    def index_file(self):
+        """File listing the segments"""
+        return self._index_file
+
+    def load_index(self):
+        """returns the segments as {"file", "start", "end", "records", "sealed"}"""
+        try:
+            with open(self._index_file, "r", encoding="utf-8", newline="") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+
+    def _save_index(self, segments):
+        """replaces the index file atomically"""
+        temp_file = self._index_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8", newline="") as file:
+            json.dump(segments, file, indent=2)
+        os.replace(temp_file, self._index_file)
+
+    def archived_records(self):
+        """number of records moved to sealed segments"""
+        return sum(segment["records"] for segment in self.load_index() if segment["sealed"])
+
+    def _load_active(self):
+        """returns the records of the active file"""
+        try:
+            with open(self._store_file, "r", encoding="utf-8", newline="") as file:
+                return json.loads(file.read())
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+
+    def _save_active(self, records):
+        """replaces the active file atomically"""
+        temp_file = self._store_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8", newline="") as file:
+            json.dump(records, file, indent=2)
+        os.replace(temp_file, self._store_file)
+
+    def _oldest_time(self):
+        """time of the first record of the active file, parsing only that record"""
+        try:
+            with open(self._store_file, "r", encoding="utf-8", newline="") as file:
+                head = file.read(4096)
+                while True:
+                    try:
+                        for record, _ in iter_records(head, True, False):
+                            return record[self._time_field]
+                        return None
+                    except ValueError:
+                        more = file.read(4096)
+                        if not more:
+                            return None
+                        head += more
+        except FileNotFoundError:
+            return None
+
+    def rotation_due(self):
+        """True when the active file reached max_bytes or period_seconds"""
+        try:
+            size = os.path.getsize(self._store_file)
+        except FileNotFoundError:
+            return False
+        if self._max_bytes is not None and size >= self._max_bytes:
+            return True
+        if self._period_seconds is None:
+            return False
+        oldest = self._oldest_time()
+        now = datetime.timestamp(datetime.now(timezone.utc))
+        return oldest is not None and oldest <= now - self._period_seconds
+
+    def rotate_if_due(self):
+        """rotates the store when it is due; returns the new segment or None"""
+        if not self.rotation_due():
+            return None
+        return self.rotate()
+
+    def _complete_unsealed(self, segments, records):
+        """drops from the active records the ones of an interrupted rotation"""
+        for segment in segments:
+            if segment["sealed"]:
+                continue
+            with gzip.open(os.path.join(self._archive_path, segment["file"]), "rt",
+                           encoding="utf-8") as file:
+                first = json.loads(file.readline())
+            if records and records[0] == first:
+                records = records[segment["records"]:]
+            segment["sealed"] = True
+        return records
+
+    def rotate(self):
+        """moves every record of the active file into a new segment"""
+        with STORE_LOCKS.file_lock(self._store_file):
+            segments = self.load_index()
+            records = self._load_active()
+            if any(not segment["sealed"] for segment in segments):
+                records = self._complete_unsealed(segments, records)
+                self._save_active(records)
+                self._save_index(segments)
+            if not records:
+                return None
+            times = [record[self._time_field] for record in records]
+            segment = {"file": f"{self._stem}.{len(segments):06d}.ndjson.gz",
+                       "start": min(times),
+                       "end": max(times),
+                       "records": len(records),
+                       "sealed": False}
+            os.makedirs(self._archive_path, exist_ok=True)
+            segment_file = os.path.join(self._archive_path, segment["file"])
+            with gzip.open(segment_file + ".tmp", "wt", encoding="utf-8") as file:
+                for record in records:
+                    file.write(json.dumps(record) + "\n")
+            os.replace(segment_file + ".tmp", segment_file)
+            segments.append(segment)
+            self._save_index(segments)
+            self._save_active([])
+            segment["sealed"] = True
+            self._save_index(segments)
+        return segment
+
+    def segment_records(self):
+        """yields the records of every segment, the one of an interrupted
+        rotation included (its records may also be in the active file)"""
+        for segment in self.load_index():
+            try:
+                with gzip.open(os.path.join(self._archive_path, segment["file"]), "rt",
+                               encoding="utf-8") as file:
+                    for line in file:
+                        yield json.loads(line)
+            except FileNotFoundError:
+                continue
+
+    def sealed_records(self, segments=None):
+        """yields, oldest first, the records of the sealed segments (of
+        segments, as listed by load_index, when given)"""
+        for segment in self.load_index() if segments is None else segments:
+            if not segment["sealed"]:
+                continue
+            with gzip.open(os.path.join(self._archive_path, segment["file"]), "rt",
+                           encoding="utf-8") as file:
+                for line in file:
+                    yield json.loads(line)
+
+    def iter_records(self, start=None, end=None):
+        """
+        Yields, oldest first, the archived and active records whose time lies
+        between start and end (both included, None for no limit), reading
+        only the segments that overlap that range.
+        """
+        def in_range(record):
+            if start is None and end is None:
+                return True
+            moment = record[self._time_field]
+            return (start is None or moment >= start) and (end is None or moment <= end)
+
+        for segment in self.load_index():
+            if not segment["sealed"]:
+                continue
+            if (start is not None and segment["end"] < start) or \
+                    (end is not None and segment["start"] > end):
+                continue
+            with gzip.open(os.path.join(self._archive_path, segment["file"]), "rt",
+                           encoding="utf-8") as file:
+                for line in file:
+                    record = json.loads(line)
+                    if in_range(record):
+                        yield record
+        for record in self._load_active():
+            if in_range(record):
+                yield record
@@ -0,0 +1,225 @@
+"""
+store_backend.py
+
+This module defines the backends where the JSON stores keep their files:
+FileBackend, the files on disk (the default), and MemoryBackend, a set of
+in-memory files for tests and simulations.
+
+Both open a store file by name as a text file (or as bytes, "rb", for
+readers that seek to byte offsets), so the stores serialize and parse the
+same JSON text, and raise FileNotFoundError for a file that does not
+exist, whatever the backend. write replaces a whole file at once, so a
+reader never sees it half written; append adds text at the end of a file
+(the change feed segments). A MemoryBackend reads a file missing
+from memory once from disk (e.g. the transactions fixture) and keeps it;
+every write stays in memory, so the files on disk are never changed and
+each MemoryBackend instance is isolated from the others. FileBackend
+parses files through the process-wide PARSED_FILES cache.
+
+Both give every file a signature that changes whenever the file is
+written, so a reader can keep what it derived from a file until then.
+"""
+import errno
+import io
+import json
+import os
+import threading
+import time
+from uc3m_money.store.parsed_file_cache import PARSED_FILES, RACY_WINDOW_NS, file_signature
+
+
+class FileBackend:
+    """Store files on disk"""
+    on_disk = True
+
+    @staticmethod
+    def open(file_name, mode="r"):
+        """opens a store file for reading ("r", or "rb" for bytes) or replacing ("w")"""
+        if mode == "rb":
+            # pylint: disable-next=consider-using-with,unspecified-encoding
+            return open(file_name, mode)
+        if mode == "w":
+            PARSED_FILES.invalidate(file_name)
+        return open(file_name, mode, encoding="utf-8", newline="")  # pylint: disable=consider-using-with
+
+    @staticmethod
+    def write(file_name, text):
+        """replaces the text of a file atomically"""
+        temp_file = file_name + ".tmp"
+        with open(temp_file, "w", encoding="utf-8", newline="") as file:
+            file.write(text)
+        PARSED_FILES.invalidate(file_name)
+        os.replace(temp_file, file_name)
+
+    @staticmethod
+    def append(file_name, text):
+        """adds text at the end of a file, created when missing"""
+        with open(file_name, "a", encoding="utf-8", newline="") as file:
+            file.write(text)
+
+    @staticmethod
+    def size(file_name):
+        """size of a file in bytes"""
+        return os.path.getsize(file_name)
+
+    @staticmethod
+    def load_json(file_name):
+        """parsed content of a store file, parsed again only when it changed"""
+        return PARSED_FILES.load(file_name)
+
+    @staticmethod
+    def exists(file_name):
+        """True when the store file exists"""
+        return os.path.exists(file_name)
+
+    @staticmethod
+    def signature(file_name):
+        """(inode, size, mtime_ns) of a store file; None when it does not
+        exist or was modified within RACY_WINDOW_NS, since a rewrite of the
+        same size could then keep it"""
+        try:
+            signature = file_signature(os.stat(file_name))
+        except FileNotFoundError:
+            return None
+        return None if signature[2] >= time.time_ns() - RACY_WINDOW_NS else signature
+
+    @staticmethod
+    def remove(file_name):
+        """removes a store file"""
+        os.remove(file_name)
+
+    @staticmethod
+    def list_dir(directory):
+        """names of the files of a directory, sorted ([] when it does not exist)"""
+        try:
+            return sorted(os.listdir(directory))
+        except FileNotFoundError:
+            return []
+
+
+class MemoryFile(io.StringIO):
+    """Text file written to a MemoryBackend when closed"""
+
+    def __init__(self, backend, file_name):
+        super().__init__()
+        self._backend = backend
+        self._file_name = file_name
+
+    def close(self):
+        if not self.closed:
+            self._backend.write(self._file_name, self.getvalue())
+        super().close()
+
+
+class MemoryBackend:
+    """Store files kept in memory, read through from disk on first use"""
+    on_disk = False
+
+    def __init__(self, read_through=True):
+        self._read_through = read_through
+        self._lock = threading.Lock()
+        self._files = {}
+        self._versions = {}
+
+    @staticmethod
+    def _key(file_name):
+        """name under which a file is kept"""
+        return os.path.normpath(os.path.abspath(file_name))
+
+    def open(self, file_name, mode="r"):
+        """opens a store file for reading ("r", or "rb" for bytes) or replacing ("w")"""
+        if mode == "w":
+            return MemoryFile(self, file_name)
+        if mode == "rb":
+            return io.BytesIO(self.read(file_name).encode("utf-8"))
+        if mode != "r":
+            raise ValueError(f"invalid mode: {mode!r}")
+        return io.StringIO(self.read(file_name))
+
+    def load_json(self, file_name):
+        """parsed content of a store file"""
+        return json.loads(self.read(file_name))
+
+    def read(self, file_name):
+        """text of a file; FileNotFoundError when it does not exist"""
+        key = self._key(file_name)
+        with self._lock:
+            if key not in self._files:
+                self._files[key] = self._read_disk(file_name)
+            text = self._files[key]
+        if text is None:
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file_name)
+        return text
+
+    def _read_disk(self, file_name):
+        """text of a file on disk, None when missing or not read through"""
+        if not self._read_through:
+            return None
+        try:
+            with open(file_name, "r", encoding="utf-8", newline="") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, file_name, text):
+        """replaces the text of a file"""
+        key = self._key(file_name)
+        with self._lock:
+            self._files[key] = text
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def append(self, file_name, text):
+        """adds text at the end of a file, created when missing"""
+        with self._lock:
+            key = self._key(file_name)
+            if key not in self._files:
+                self._files[key] = self._read_disk(file_name)
+            self._files[key] = (self._files[key] or "") + text
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def size(self, file_name):
+        """size of a file in bytes (UTF-8)"""
+        return len(self.read(file_name).encode("utf-8"))
+
+    def exists(self, file_name):
+        """True when the file exists"""
+        try:
+            self.read(file_name)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def signature(self, file_name):
+        """number of writes of a file kept in memory; None when it does not exist"""
+        if not self.exists(file_name):
+            return None
+        with self._lock:
+            return self._versions.get(self._key(file_name), 0)
+
+    def remove(self, file_name):
+        """removes a file; FileNotFoundError when it does not exist"""
+        self.read(file_name)
+        self.write(file_name, None)
+
+    def list_dir(self, directory):
+        """names of the files of a directory, sorted: the ones kept in
+        memory and, when reading through, the ones on disk not removed"""
+        names = set(FileBackend.list_dir(directory)) if self._read_through else set()
+        directory_key = self._key(directory)
+        with self._lock:
+            for key, text in self._files.items():
+                if os.path.dirname(key) == directory_key:
+                    if text is None:
+                        names.discard(os.path.basename(key))
+                    else:
+                        names.add(os.path.basename(key))
+        return sorted(names)
+
+    @property
+    def files(self):
+        """Names of the files kept in memory"""
+        with self._lock:
+            return sorted(key for key, text in self._files.items() if text is not None)
+
+
+FILE_BACKEND = FileBackend()
@@ -0,0 +1,61 @@
+"""
+store_locks.py
+
+This module defines the StoreLocks class, the registry of the locks that
+make the read-modify-write of the store files safe across threads.
+
+There is one re-entrant lock per store file (by absolute path), so writers
+of different stores or partitions never wait for each other, and a fixed
+set of lock stripes for the per-IBAN balance state, picked by a stable hash
+of the IBAN. Validation and hashing run outside these locks; only the
+load-check-save commit section of a store is serialized. IBAN locks are
+always taken before file locks, never while holding one.
+"""
+import os
+import threading
+import zlib
+from contextlib import ExitStack, contextmanager
+from uc3m_money.account_management_config import IBAN_LOCK_STRIPES
+
+
+class StoreLocks:
+    """Per-store-file locks and IBAN-striped locks"""
+
+    def __init__(self, iban_stripes=IBAN_LOCK_STRIPES):
+        self._registry_lock = threading.Lock()
+        self._file_locks = {}
+        self._iban_locks = [threading.RLock() for _ in range(iban_stripes)]
+
+    def file_lock(self, file_name):
+        """returns the lock guarding a store file"""
+        key = os.path.abspath(file_name)
+        lock = self._file_locks.get(key)
+        if lock is None:
+            with self._registry_lock:
+                lock = self._file_locks.setdefault(key, threading.RLock())
+        return lock
+
+    def iban_stripe(self, iban):
+        """returns the index of the lock stripe of an iban"""
+        return zlib.crc32(iban.encode()) % len(self._iban_locks)
+
+    def iban_lock(self, iban):
+        """returns the lock guarding the balance state of an iban"""
+        return self._iban_locks[self.iban_stripe(iban)]
+
+    def iban_locks(self, ibans):
+        """returns the locks of several ibans, without repetitions and in
+        stripe order, so acquiring them in sequence cannot deadlock"""
+        return [self._iban_locks[stripe]
+                for stripe in sorted({self.iban_stripe(iban) for iban in ibans})]
+
+    @contextmanager
+    def ibans_locked(self, ibans):
+        """holds the locks of several ibans while the block runs"""
+        with ExitStack() as stack:
+            for lock in self.iban_locks(ibans):
+                stack.enter_context(lock)
+            yield
+
+
+STORE_LOCKS = StoreLocks()
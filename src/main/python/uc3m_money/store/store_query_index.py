@@ -0,0 +1,230 @@
+"""
+store_query_index.py
+
+This module defines the StoreQueryIndex class, the sorted indexes behind
+the paginated queries of the transfers and deposits stores.
+
+For every record of a store file the index keeps its time and the byte
+offset where it ends, and it keeps sorted (time, position) lists for the
+whole file, for every IBAN (either side), for every transfer type and for
+every IBAN and type pair. A page is a binary search on the list matching
+the filters plus one read per record returned, so it costs O(page + log n)
+and the store is never loaded. The index lives in memory, one per store
+file and backend; each query first reads only the records appended since
+the previous one, and rebuilds the index when the file was rewritten.
+
+Records already rotated into the sealed segments of the store archive are
+indexed too, kept in memory since segments are never rewritten: they take
+the first positions, in segment order, so a rotation keeps the position
+(and the cursors) of the records it moves. The index is seeded again
+whenever the list of sealed segments changes. Files that are not kept on
+disk have no archive.
+"""
+import json
+import os
+import threading
+import weakref
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from uc3m_money.account_management_config import QUERY_PAGE_LIMIT
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.data.transfer_date_validator import TRANSFER_DATE_VALIDATOR
+from uc3m_money.store.store_archive import StoreArchive
+from uc3m_money.store.store_backend import FILE_BACKEND
+from uc3m_money.store.store_locks import STORE_LOCKS
+from uc3m_money.store.transactions_shard_scanner import read_appended_spans
+
+ALL_RECORDS = ("all",)
+_REGISTRY_LOCK = threading.Lock()
+_INDEXES = weakref.WeakKeyDictionary()
+
+
+def query_index(store_file, time_field, iban_fields=(), type_field=None,
+                backend=FILE_BACKEND):
+    """returns the shared index of a store file of backend, created on first use"""
+    key = os.path.abspath(store_file)
+    with _REGISTRY_LOCK:
+        indexes = _INDEXES.setdefault(backend, {})
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = StoreQueryIndex(store_file, time_field,
+                                                   iban_fields, type_field, backend)
+    return index
+
+
+class StoreQueryIndex:  # pylint: disable=too-many-instance-attributes
+    """Sorted (time, position) indexes of a JSON store file"""
+
+    def __init__(self, store_file, time_field,  # pylint: disable=too-many-arguments
+                 iban_fields=(), type_field=None, backend=FILE_BACKEND):
+        self._store_file = store_file
+        self._time_field = time_field
+        self._iban_fields = iban_fields
+        self._type_field = type_field
+        self._backend = backend
+        self._archive = StoreArchive(store_file, time_field) if backend.on_disk else None
+        self._segments = None
+        self._archived = []
+        self._watermark = (0, "")
+        self._ends = []
+        self._lists = {}
+
+    def _reset(self):
+        """forgets every indexed record"""
+        self._segments = None
+        self._archived = []
+        self._watermark = (0, "")
+        self._ends = []
+        self._lists = {}
+
+    @property
+    def records(self):
+        """Number of records indexed"""
+        return len(self._archived) + len(self._ends)
+
+    def _seed(self):
+        """indexes the sealed segments again when their list changed;
+        returns how many records were indexed"""
+        if self._archive is None:
+            return 0
+        segments = [segment for segment in self._archive.load_index() if segment["sealed"]]
+        names = [segment["file"] for segment in segments]
+        if names == self._segments:
+            return 0
+        self._reset()
+        try:
+            for record in self._archive.sealed_records(segments):
+                self._add(record)
+        except (OSError, ValueError) as ex:
+            self._reset()
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        self._segments = names
+        return len(self._archived)
+
+    def refresh(self):
+        """indexes the records archived or appended since the last refresh;
+        returns how many"""
+        seeded = self._seed()
+        try:
+            spans, offset, tail, rewound = read_appended_spans(self._store_file,
+                                                               *self._watermark, self._backend)
+        except FileNotFoundError:
+            spans, offset, tail, rewound = [], 0, "", bool(self._ends)
+        except ValueError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        if rewound:
+            # the active file was rewritten: index the segments and the file again
+            self._reset()
+            return self.refresh()
+        for record, end in spans:
+            self._add(record, end)
+        self._watermark = (offset, tail)
+        return seeded + len(spans)
+
+    def _keys(self, record):
+        """index lists a record belongs to"""
+        ibans = {record[field] for field in self._iban_fields}
+        keys = [ALL_RECORDS] + [("iban", iban) for iban in ibans]
+        if self._type_field is not None:
+            record_type = record[self._type_field]
+            keys.append(("type", record_type))
+            keys.extend(("iban_type", iban, record_type) for iban in ibans)
+        return keys
+
+    def _add(self, record, end=None):
+        """adds a record ending at byte offset end of the active file (or an
+        archived one, end None) to its index lists"""
+        entry = (record[self._time_field], self.records)
+        if end is None:
+            self._archived.append(record)
+        else:
+            self._ends.append(end)
+        for key in self._keys(record):
+            insort(self._lists.setdefault(key, []), entry)
+
+    def _read(self, file, position):
+        """reads the record at a position from the open store file"""
+        if position < len(self._archived):
+            return self._archived[position]
+        position -= len(self._archived)
+        start = self._ends[position - 1] if position else 0
+        file.seek(start)
+        text = file.read(self._ends[position] - start).decode("utf-8")
+        return json.loads(text.lstrip(" \t\n\r[,"))
+
+    @staticmethod
+    def _bound(moment, end):
+        """index entry bounding a timestamp or a DD/MM/YYYY date (whole day)"""
+        if not isinstance(moment, str):
+            return (moment, float("inf")) if end else (moment, -1)
+        moment_date = TRANSFER_DATE_VALIDATOR.parse(moment)
+        if moment_date is None:
+            raise AccountManagementException("Invalid date format")
+        day_start = datetime(moment_date.year, moment_date.month, moment_date.day,
+                             tzinfo=timezone.utc)
+        if end:
+            day_start += timedelta(days=1)
+        return day_start.timestamp(), -1
+
+    @staticmethod
+    def encode_cursor(entry):
+        """opaque cursor pointing right after an index entry"""
+        return f"{entry[0]!r}/{entry[1]}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """index entry of a cursor or AccountManagementException"""
+        try:
+            moment, position = cursor.split("/")
+            return float(moment), int(position)
+        except (AttributeError, ValueError) as ex:
+            raise AccountManagementException("Invalid cursor") from ex
+
+    # pylint: disable=too-many-arguments
+    def select(self, iban=None, start=None, end=None, transfer_type=None,
+               after=None, limit=QUERY_PAGE_LIMIT):
+        """
+        Returns ([(entry, record)], more): at most limit records in time order
+        matching the filters (see page) with their index entries, after the
+        entry after (None for the first ones), and whether more follow.
+        """
+        if not isinstance(limit, int) or limit < 1:
+            raise AccountManagementException("Invalid limit")
+        if iban is not None and transfer_type is not None:
+            key = ("iban_type", iban, transfer_type)
+        elif iban is not None:
+            key = ("iban", iban)
+        elif transfer_type is not None:
+            key = ("type", transfer_type)
+        else:
+            key = ALL_RECORDS
+        with STORE_LOCKS.file_lock(self._store_file):
+            self.refresh()
+            entries = self._lists.get(key, [])
+            first = 0 if start is None else bisect_left(entries, self._bound(start, False))
+            if after is not None:
+                first = max(first, bisect_right(entries, after))
+            last = len(entries) if end is None else bisect_left(entries, self._bound(end, True))
+            selected = entries[first:min(last, first + limit)]
+            if not selected:
+                return [], False
+            if all(position < len(self._archived) for _, position in selected):
+                items = [self._read(None, position) for _, position in selected]
+            else:
+                with self._backend.open(self._store_file, "rb") as file:
+                    items = [self._read(file, position) for _, position in selected]
+        return list(zip(selected, items)), first + limit < last
+
+    # pylint: disable=too-many-arguments
+    def page(self, iban=None, start=None, end=None, transfer_type=None,
+             cursor=None, limit=QUERY_PAGE_LIMIT):
+        """
+        Returns {"items", "next_cursor"}: at most limit records in time order
+        matching the filters, after the cursor of the previous page (None
+        for the first one). start and end are UTC timestamps or DD/MM/YYYY
+        dates, both included. next_cursor is None on the last page.
+        """
+        after = None if cursor is None else self.decode_cursor(cursor)
+        selected, more = self.select(iban, start, end, transfer_type, after, limit)
+        next_cursor = self.encode_cursor(selected[-1][0]) if more else None
+        return {"items": [record for _, record in selected], "next_cursor": next_cursor}
@@ -0,0 +1,171 @@
+"""
+store_router.py
+
+This module defines the StoreRouter class, which maps a tenant or the bank
+code of an IBAN to the root directory of its own shard of store files.
+
+Every shard root holds its own transfers, deposits, transactions and
+balances files, posting checkpoint, balance index and settlement reports,
+named as the default ones of account_management_config.
+A tenant route wins over a bank route; bank routes match a prefix of the
+bank code (IBAN digits 5 to 8), the longest one first, and anything not
+routed goes to the default root. Routes are added at runtime, one by one
+or from a JSON file, so no module has to be edited to move a shard.
+Operations over every account (posting, settlement, scheduling) use the
+shard of the current tenant or, without tenant, the default shard and
+every bank shard together.
+"""
+import json
+import os
+import re
+import threading
+from uc3m_money.account_management_config import (JSON_FILES_PATH,
+                                                  TRANSFERS_STORE_FILE,
+                                                  DEPOSITS_STORE_FILE,
+                                                  TRANSACTIONS_STORE_FILE,
+                                                  BALANCES_STORE_FILE,
+                                                  POSTING_CHECKPOINT_FILE,
+                                                  BALANCE_INDEX_FILE,
+                                                  SETTLEMENT_REPORTS_PATH)
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+from uc3m_money.store.deposit_json_store import DepositJsonStore
+from uc3m_money.store.balance_prefix_index import BalancePrefixIndex
+
+BANK_PREFIX_PATTERN = re.compile(r"[0-9]{1,4}")
+
+
+class StoreShard:  # pylint: disable=too-many-instance-attributes
+    """Root directory of a shard, its store files and its stores"""
+
+    def __init__(self, root):
+        self.root = root
+        self.transfers_file = os.path.join(root, os.path.basename(TRANSFERS_STORE_FILE))
+        self.deposits_file = os.path.join(root, os.path.basename(DEPOSITS_STORE_FILE))
+        self.transactions_file = os.path.join(root, os.path.basename(TRANSACTIONS_STORE_FILE))
+        self.balances_file = os.path.join(root, os.path.basename(BALANCES_STORE_FILE))
+        self.checkpoint_file = os.path.join(root, os.path.basename(POSTING_CHECKPOINT_FILE))
+        self.balance_index_file = os.path.join(root, os.path.basename(BALANCE_INDEX_FILE))
+        self.settlements_path = os.path.join(
+            root, os.path.basename(os.path.normpath(SETTLEMENT_REPORTS_PATH)))
+        self._lock = threading.Lock()
+        self._transfers_store = None
+        self._deposits_store = None
+        self._balance_index = None
+
+    def transfers_store(self):
+        """returns the store of the transfers of the shard"""
+        if self._transfers_store is None:
+            with self._lock:
+                if self._transfers_store is None:
+                    self._transfers_store = TransfersJsonStore(self.transfers_file)
+        return self._transfers_store
+
+    def deposits_store(self):
+        """returns the store of the deposits of the shard"""
+        if self._deposits_store is None:
+            with self._lock:
+                if self._deposits_store is None:
+                    self._deposits_store = DepositJsonStore(self.deposits_file)
+        return self._deposits_store
+
+    def balance_index(self):
+        """returns the point-in-time balance index of the transactions of the shard"""
+        if self._balance_index is None:
+            with self._lock:
+                if self._balance_index is None:
+                    self._balance_index = BalancePrefixIndex(self.transactions_file,
+                                                             self.balance_index_file)
+        return self._balance_index
+
+
+class StoreRouter:
+    """Shards of store files by tenant and by IBAN bank code prefix"""
+
+    def __init__(self, default_root=JSON_FILES_PATH):
+        self._lock = threading.Lock()
+        self._shards = {}
+        self._tenants = {}
+        self._banks = {}
+        self._default = self._shard(default_root)
+
+    @classmethod
+    def from_file(cls, routes_file):
+        """
+        Router of a JSON routes file:
+        {"default": root, "tenants": {tenant: root}, "banks": {prefix: root}}
+        where every key is optional.
+        """
+        try:
+            with open(routes_file, "r", encoding="utf-8", newline="") as file:
+                routes = json.load(file)
+        except FileNotFoundError as ex:
+            raise AccountManagementException("Wrong file  or file path") from ex
+        except json.JSONDecodeError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        try:
+            router = cls(routes.get("default", JSON_FILES_PATH))
+            for tenant, root in routes.get("tenants", {}).items():
+                router.add_tenant(tenant, root)
+            for prefix, root in routes.get("banks", {}).items():
+                router.add_bank(prefix, root)
+        except AttributeError as ex:
+            raise AccountManagementException("Error - Invalid Key in JSON") from ex
+        return router
+
+    def _shard(self, root):
+        """shard of a root directory, shared by every route to it"""
+        root = os.path.normpath(root)
+        with self._lock:
+            shard = self._shards.get(root)
+            if shard is None:
+                os.makedirs(root, exist_ok=True)
+                shard = self._shards[root] = StoreShard(root)
+        return shard
+
+    @property
+    def shards(self):
+        """Every shard of the router, the default one included"""
+        return list(self._shards.values())
+
+    @property
+    def bank_shards(self):
+        """The default shard and the shards of the banks, without repeats"""
+        shards = [self._default]
+        for shard in self._banks.values():
+            if shard not in shards:
+                shards.append(shard)
+        return shards
+
+    @property
+    def split_by_bank(self):
+        """True when some bank has its own shard"""
+        return bool(self._banks)
+
+    def add_tenant(self, tenant, root):
+        """routes the stores of a tenant to a root directory"""
+        if not isinstance(tenant, str) or not tenant:
+            raise AccountManagementException("Invalid tenant")
+        self._tenants[tenant] = self._shard(root)
+
+    def add_bank(self, prefix, root):
+        """routes the IBANs whose bank code starts with prefix to a root directory"""
+        if not isinstance(prefix, str) or not BANK_PREFIX_PATTERN.fullmatch(prefix):
+            raise AccountManagementException("Invalid bank code prefix")
+        self._banks[prefix] = self._shard(root)
+
+    def shard(self, tenant=None, iban=None):
+        """shard of a tenant or, without tenant, of the bank of an iban
+        (spaces and case are ignored, as in IBAN validation)"""
+        if tenant is not None:
+            shard = self._tenants.get(tenant)
+            if shard is None:
+                raise AccountManagementException("Unknown tenant")
+            return shard
+        if iban is not None:
+            bank_code = str(iban).replace(" ", "").upper()[4:8]
+            for length in range(len(bank_code), 0, -1):
+                shard = self._banks.get(bank_code[:length])
+                if shard is not None:
+                    return shard
+        return self._default
@@ -9,8 +9,9 @@ in the application configuration.
 Includes a helper method for retrieving all items matching a specific key-value pair.
 """
 
-from src.main.python.uc3m_money.account_management_config import TRANSACTIONS_STORE_FILE
-from src.main.python.uc3m_money.store.json_store import JsonStore
+from uc3m_money.account_management_config import TRANSACTIONS_STORE_FILE
+from uc3m_money.store.json_store import JsonStore
+from uc3m_money.metrics.metrics_registry import METRICS
 
 
 class TransactionJsonStore(JsonStore):
@@ -31,6 +32,7 @@ class TransactionJsonStore(JsonStore):
         """
         self.load_list_from_file()
         result_list = []
+        METRICS.increment("records_scanned", len(self._data_list))
         for item in self._data_list:
             if item[key] == value:
                 result_list.append(item)
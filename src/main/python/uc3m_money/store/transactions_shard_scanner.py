@@ -0,0 +1,241 @@
+"""
+transactions_shard_scanner.py
+
+This module defines the TransactionsShardScanner class, which reads the
+transactions file in parallel.
+
+The file (a JSON array of flat {"IBAN", "amount"} records) is split into
+byte ranges that end right after a record, at a "}" followed by a ",".
+Every range is parsed by a worker process. A "}," inside a string value
+leaves the range before it ending inside an unterminated string, so that
+range fails to parse; the file is then scanned again as a single range.
+
+Workers return, per IBAN, the partials of the exact sum of its amounts
+(non-overlapping floats, as kept by math.fsum), so only a few floats per
+IBAN and range cross the process boundary. The caller adds up those
+partials with math.fsum. A balance is therefore the correctly rounded
+exact sum of the amounts, whatever the number of ranges, and is identical
+to the math.fsum of the serial path.
+"""
+import json
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from uc3m_money.account_management_config import (TRANSACTIONS_STORE_FILE,
+                                                  BALANCE_WORKERS,
+                                                  BALANCE_MIN_SHARD_BYTES)
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.store.store_backend import FILE_BACKEND
+
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+TAIL_BYTES = 64
+RECORD_END = re.compile(rb"}\s*,")
+
+
+def _skip_whitespace(text, index):
+    """returns the index of the first non whitespace character from index"""
+    while index < len(text) and text[index] in _WHITESPACE:
+        index += 1
+    return index
+
+
+def iter_records(text, first, last):
+    """
+    Yields (record, end index) for every record of a piece of the
+    transactions array; first/last tell whether the piece holds the opening
+    and the closing bracket. Raises ValueError when it is not valid JSON.
+    """
+    index = _skip_whitespace(text, 0)
+    if first:
+        if not text.startswith("[", index):
+            raise ValueError("transactions must be a JSON array")
+        index = _skip_whitespace(text, index + 1)
+        expect_separator = False
+    else:
+        expect_separator = True
+    while index < len(text):
+        if text[index] == "]" and last and (expect_separator or first):
+            if _skip_whitespace(text, index + 1) != len(text):
+                raise ValueError("extra data after the transactions array")
+            return
+        if expect_separator:
+            if text[index] != ",":
+                raise ValueError("expected ',' between transactions")
+            index = _skip_whitespace(text, index + 1)
+        transaction, index = _DECODER.raw_decode(text, index)
+        yield transaction, index
+        index = _skip_whitespace(text, index)
+        expect_separator = True
+    if last:
+        raise ValueError("unterminated transactions array")
+
+
+def add_partial(partials, value):
+    """adds value to the non-overlapping partials of an exact float sum
+    (Shewchuk's algorithm, the one of math.fsum)"""
+    kept = 0
+    for partial in partials:
+        if abs(value) < abs(partial):
+            value, partial = partial, value
+        high = value + partial
+        low = partial - (high - value)
+        if low:
+            partials[kept] = low
+            kept += 1
+        value = high
+    partials[kept:] = [value]
+
+
+def scan_shard(file_name, shard_range, ibans, first, last):
+    """
+    Parses the records of the byte range (start, end) of the transactions
+    file and returns (records, {iban: partials of the sum of its amounts}).
+    Only the ibans given are kept (every iban when ibans is None).
+    Raises ValueError when the range is not valid JSON.
+    """
+    start, end = shard_range
+    with open(file_name, "rb") as file:
+        file.seek(start)
+        text = file.read(end - start).decode("utf-8")
+    partials = {}
+    records = 0
+    for transaction, _ in iter_records(text, first, last):
+        records += 1
+        if ibans is None or transaction["IBAN"] in ibans:
+            add_partial(partials.setdefault(transaction["IBAN"], []),
+                        float(transaction["amount"]))
+    return records, partials
+
+
+def read_appended_spans(file_name, offset=0, tail="", backend=FILE_BACKEND):
+    """
+    Returns (spans, offset, tail, rewound) for the records of a JSON array
+    file of backend written after a byte offset right after a record; spans
+    are (record, byte offset right after the record). tail holds the bytes
+    before that offset (hex) as last seen; when they differ the file was
+    rewritten and all its records are returned with rewound=True.
+    Raises FileNotFoundError or ValueError (not valid JSON).
+    """
+    start = max(0, offset - TAIL_BYTES)
+    with backend.open(file_name, "rb") as file:
+        file.seek(start)
+        content = file.read()
+        rewound = content[:offset - start].hex() != tail
+        if rewound:
+            offset = start = 0
+            file.seek(0)
+            content = file.read()
+    relative_offset = offset - start
+    text = content[relative_offset:].decode("utf-8")
+    spans = []
+    previous = 0
+    for record, end in iter_records(text, offset == 0, True):
+        relative_offset += len(text[previous:end].encode("utf-8"))
+        previous = end
+        spans.append((record, start + relative_offset))
+    if spans:
+        tail = content[max(0, relative_offset - TAIL_BYTES):relative_offset].hex()
+    elif rewound:
+        tail = ""
+    return spans, start + relative_offset, tail, rewound
+
+
+def read_appended_records(file_name, offset=0, tail="", backend=FILE_BACKEND):
+    """
+    Returns (records, offset, tail, rewound) like read_appended_spans,
+    without the byte offsets of the records.
+    """
+    spans, offset, tail, rewound = read_appended_spans(file_name, offset, tail, backend)
+    return [record for record, _ in spans], offset, tail, rewound
+
+
+class TransactionsShardScanner:
+    """Computes the transaction amounts of the IBANs with a process pool"""
+
+    def __init__(self, file_name=TRANSACTIONS_STORE_FILE, workers=BALANCE_WORKERS,
+                 min_shard_bytes=BALANCE_MIN_SHARD_BYTES):
+        self._file_name = file_name
+        self._workers = max(1, workers or 1)
+        self._min_shard_bytes = max(1, min_shard_bytes)
+
+    @staticmethod
+    def _next_boundary(file, position):
+        """returns the offset right after the first "}" followed by a ","
+        at or after position"""
+        file.seek(position)
+        offset = position
+        pending = b""
+        while True:
+            chunk = file.read(65536)
+            if not chunk:
+                return None
+            data = pending + chunk
+            found = RECORD_END.search(data)
+            if found:
+                return offset - len(pending) + found.start() + 1
+            last = data.rfind(b"}")
+            pending = data[last:] if last >= 0 and not data[last + 1:].strip() else b""
+            offset += len(chunk)
+
+    def shard_ranges(self):
+        """splits the file into (start, end) byte ranges aligned to record boundaries"""
+        try:
+            size = os.path.getsize(self._file_name)
+        except FileNotFoundError as ex:
+            raise AccountManagementException("Wrong file  or file path") from ex
+        shards = max(1, min(self._workers, size // self._min_shard_bytes))
+        boundaries = [0]
+        with open(self._file_name, "rb") as file:
+            for shard in range(1, shards):
+                boundary = self._next_boundary(file, max(boundaries[-1], size * shard // shards))
+                if boundary is None or boundary >= size:
+                    break
+                if boundary > boundaries[-1]:
+                    boundaries.append(boundary)
+        boundaries.append(size)
+        return list(zip(boundaries[:-1], boundaries[1:]))
+
+    def _scan(self, ranges, wanted):
+        """scans the ranges, in parallel when there are several;
+        returns the (records, partials) of every range"""
+        arguments = [(self._file_name, shard_range, wanted, index == 0, index == len(ranges) - 1)
+                     for index, shard_range in enumerate(ranges)]
+        if len(ranges) == 1:
+            return [scan_shard(*arguments[0])]
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            return list(executor.map(scan_shard, *zip(*arguments)))
+
+    def partials(self, ibans=None):
+        """
+        Returns (records, {iban: [partials of every range]}) for the given
+        ibans (every iban when None).
+        """
+        ranges = self.shard_ranges()
+        wanted = None if ibans is None else frozenset(ibans)
+        try:
+            try:
+                shards = self._scan(ranges, wanted)
+            except ValueError:
+                if len(ranges) == 1:
+                    raise
+                shards = self._scan([(ranges[0][0], ranges[-1][1])], wanted)
+        except FileNotFoundError as ex:
+            raise AccountManagementException("Wrong file  or file path") from ex
+        except ValueError as ex:
+            raise AccountManagementException("JSON Decode Error - Wrong JSON Format") from ex
+        records = 0
+        merged = {}
+        for shard_records, shard_partials in shards:
+            records += shard_records
+            for iban, iban_partials in shard_partials.items():
+                merged.setdefault(iban, []).extend(iban_partials)
+        return records, merged
+
+    def balances(self, ibans=None):
+        """returns (records, {iban: balance}), every balance the correctly
+        rounded exact sum of its amounts, as math.fsum"""
+        records, partials = self.partials(ibans)
+        return records, {iban: math.fsum(iban_partials)
+                         for iban, iban_partials in partials.items()}
@@ -0,0 +1,178 @@
+"""
+transfer_bloom_filter.py
+
+This module defines the TransferBloomFilter class, a persisted Bloom filter
+over the duplicate key of the transfers kept in a transfers store.
+
+A negative answer means the transfer is certainly not in the store, so the
+exact duplicate scan can be skipped. The filter remembers the (inode,
+size, mtime_ns) of the store file it describes; when the filter file is
+missing or the store was changed behind its back, it is rebuilt from the
+store contents. A store modified less than RACY_WINDOW_NS before that
+signature was taken could be rewritten with the same size and keep it, so
+the filter then also remembers a digest of the store content and checks
+it until the signature is older than the window.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+from uc3m_money.account_management_config import (TRANSFERS_BLOOM_BITS,
+                                                  TRANSFERS_BLOOM_HASHES)
+from uc3m_money.store.parsed_file_cache import RACY_WINDOW_NS, file_signature
+
+
+class TransferBloomFilter:
+    """Bloom filter over transfer duplicate keys, stored next to the transfers file"""
+
+    def __init__(self, store_file, num_bits=TRANSFERS_BLOOM_BITS,
+                 num_hashes=TRANSFERS_BLOOM_HASHES):
+        self._store_file = store_file
+        self._filter_file = os.path.splitext(store_file)[0] + ".bloom"
+        self._num_bits = num_bits
+        self._num_hashes = num_hashes
+        self._bits = bytearray((num_bits + 7) // 8)
+        self._count = 0
+        self._store_signature = None
+        self._store_digest = None
+        self._loaded = False
+
+    @property
+    def filter_file(self):
+        """File where the filter is persisted"""
+        return self._filter_file
+
+    @property
+    def count(self):
+        """Number of transfers added to the filter"""
+        return self._count
+
+    @property
+    def false_positive_rate(self):
+        """Expected probability of reporting a new transfer as a probable duplicate"""
+        if self._count == 0:
+            return 0.0
+        return (1 - math.exp(-self._num_hashes * self._count / self._num_bits)) \
+            ** self._num_hashes
+
+    @staticmethod
+    def key_string(duplicate_key):
+        """Return a string that is equal for transfers with equal duplicate keys"""
+        fields = []
+        for field in duplicate_key:
+            if isinstance(field, (int, float)) and not isinstance(field, bool):
+                fields.append("n:" + repr(float(field)))
+            else:
+                fields.append("s:" + str(field))
+        return "\x1f".join(fields)
+
+    def _positions(self, duplicate_key):
+        """Return the bit positions of a duplicate key (double hashing)"""
+        digest = hashlib.blake2b(self.key_string(duplicate_key).encode(),
+                                 digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "big")
+        second_hash = int.from_bytes(digest[8:], "big") | 1
+        return [(first_hash + i * second_hash) % self._num_bits
+                for i in range(self._num_hashes)]
+
+    def add(self, duplicate_key):
+        """Add a duplicate key to the filter"""
+        for position in self._positions(duplicate_key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self._count += 1
+
+    def might_contain(self, duplicate_key):
+        """False if the key is certainly not in the store, True if it may be"""
+        for position in self._positions(duplicate_key):
+            if not self._bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def store_signature(self):
+        """Return [inode, size, mtime_ns] of the store file or None if it does not exist"""
+        try:
+            file_stat = os.stat(self._store_file)
+        except FileNotFoundError:
+            return None
+        return list(file_signature(file_stat))
+
+    def store_digest(self):
+        """Return the digest of the store file content or None if it does not exist"""
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            with open(self._store_file, "rb") as file:
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            return None
+        return digest.hexdigest()
+
+    @staticmethod
+    def racy(signature):
+        """True when a store signature was modified within RACY_WINDOW_NS"""
+        return signature is not None and signature[2] >= time.time_ns() - RACY_WINDOW_NS
+
+    def _racy_digest(self, signature):
+        """digest to check a racy signature with, None when it is not racy"""
+        return self.store_digest() if self.racy(signature) else None
+
+    def rebuild(self, duplicate_keys):
+        """Empty the filter and add the given duplicate keys"""
+        self._bits = bytearray((self._num_bits + 7) // 8)
+        self._count = 0
+        for duplicate_key in duplicate_keys:
+            self.add(duplicate_key)
+
+    def sync(self, duplicate_keys):
+        """
+        Make sure the filter describes the current store file, rebuilding it
+        from the given keys (the store contents) when it is missing or stale.
+        Returns True when the filter had to be rebuilt.
+        """
+        if not self._loaded:
+            self.load()
+        current_signature = self.store_signature()
+        if self._store_signature == current_signature and (
+                self._store_digest is None or self._store_digest == self.store_digest()):
+            if not self.racy(current_signature):
+                self._store_digest = None
+            return False
+        self.rebuild(duplicate_keys)
+        self._store_signature = current_signature
+        self._store_digest = self._racy_digest(current_signature)
+        return True
+
+    def load(self):
+        """Load the filter from its file, if it exists and has the same size"""
+        self._loaded = True
+        try:
+            with open(self._filter_file, "rb") as file:
+                header = json.loads(file.readline())
+                bits = bytearray(file.read())
+        except (FileNotFoundError, ValueError):
+            return
+        if (header.get("num_bits") != self._num_bits or
+                header.get("num_hashes") != self._num_hashes or
+                len(bits) != len(self._bits)):
+            return
+        self._bits = bits
+        self._count = header["count"]
+        self._store_signature = header["store_signature"]
+        self._store_digest = header.get("store_digest")
+
+    def save(self):
+        """Persist the filter together with the signature of the current store file"""
+        self._store_signature = self.store_signature()
+        self._store_digest = self._racy_digest(self._store_signature)
+        header = {"num_bits": self._num_bits,
+                  "num_hashes": self._num_hashes,
+                  "count": self._count,
+                  "store_signature": self._store_signature,
+                  "store_digest": self._store_digest}
+        temp_file = self._filter_file + ".tmp"
+        with open(temp_file, "wb") as file:
+            file.write(json.dumps(header).encode() + b"\n")
+            file.write(self._bits)
+        os.replace(temp_file, self._filter_file)
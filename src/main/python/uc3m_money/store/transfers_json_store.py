@@ -7,27 +7,158 @@ store. Inherits from the generic JsonStore class and uses the transfers file
 as configured in the application.
 """
 
-from src.main.python.uc3m_money import AccountManagementException
-from src.main.python.uc3m_money.account_management_config import TRANSFERS_STORE_FILE
-from src.main.python.uc3m_money.store.json_store import JsonStore
+from datetime import datetime, timedelta, timezone
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.account_management_config import (TRANSFERS_STORE_FILE,
+                                                  TRANSFERS_BLOOM_BITS)
+from uc3m_money.store.json_store import JsonStore
+from uc3m_money.store.transfer_bloom_filter import TransferBloomFilter
+from uc3m_money.metrics.metrics_registry import METRICS
 
 
 class TransfersJsonStore(JsonStore):
     """
     A JSON store class specifically for transfer records.
 
-    Prevents adding duplicate transfers to the store.
+    Prevents adding duplicate transfers to the store, archived ones
+    included. A Bloom filter kept next to the file lets new transfers skip
+    the exact duplicate scan.
     """
 
     _data_list = []
     _FILE_NAME = TRANSFERS_STORE_FILE
+    _TIME_FIELD = "time_stamp"
+    _IBAN_FIELDS = ("from_iban", "to_iban")
+    _TYPE_FIELD = "transfer_type"
+    _FEED_NAME = "transfers"
+
+    def __init__(self, file_name=None, bloom_bits=TRANSFERS_BLOOM_BITS):
+        """Initializes the store; bloom_bits=0 disables the Bloom filter,
+        which is kept on disk and so is not used with an in-memory backend."""
+        super().__init__(file_name)
+        self._bloom_filter = TransferBloomFilter(self._FILE_NAME, bloom_bits) \
+            if bloom_bits and self._BACKEND.on_disk else None
+        self._archived_keys = None
+
+    @property
+    def bloom_filter(self):
+        """Bloom filter of the store (None when disabled)"""
+        return self._bloom_filter
+
+    @staticmethod
+    def duplicate_key(transfer):
+        """
+        Return the fields that identify a transfer when looking for duplicates.
+
+        Two transfers are duplicated when they only differ in their time_stamp
+        (and therefore in their transfer_code).
+        """
+        return (transfer["from_iban"], transfer["to_iban"], transfer["transfer_date"],
+                transfer["transfer_amount"], transfer["transfer_concept"],
+                transfer["transfer_type"])
 
     def add_item(self, item):
         """
         Add a new transfer to the store, checking for duplicates first.
+
+        Returns the stored transfer (as JSON).
+        """
+        new_transfer = self.add_items([item])[0]
+        if isinstance(new_transfer, AccountManagementException):
+            raise new_transfer
+        return new_transfer
+
+    def add_items(self, items):
+        """
+        Add several transfers to the store with a single write. Transfers
+        duplicated in the store or earlier in the batch are not added.
+
+        Returns, in order, the stored transfer (as JSON) or the
+        AccountManagementException of each item.
         """
+        with METRICS.span("transfers_store.md5"):
+            new_transfers = [item.to_json() for item in items]
+        with self.file_lock():
+            return self._commit_new_transfers(new_transfers)
+
+    def _commit_new_transfers(self, new_transfers):
+        """Check the new transfers against the store and save the accepted ones."""
         self.load_list_from_file()
-        for old_transfer in self._data_list:  # Prevent duplicates
-            if old_transfer == item.to_json():
-                raise AccountManagementException("Duplicated transfer in transfer list")
-        super().add_item(item)
+        if self._bloom_filter is not None:
+            self._bloom_filter.sync(self._known_keys())
+        stored_keys = None
+        accepted_keys = set()
+        results = []
+        for new_transfer in new_transfers:
+            new_key = self.duplicate_key(new_transfer)
+            duplicated = new_key in accepted_keys
+            if not duplicated:
+                if self._bloom_filter is None or self._bloom_filter.might_contain(new_key):
+                    if stored_keys is None:
+                        stored_keys = self._stored_keys()
+                    duplicated = new_key in stored_keys
+                else:
+                    METRICS.increment("bloom_fast_rejects")
+            if duplicated:
+                results.append(AccountManagementException("Duplicated transfer in transfer list"))
+            else:
+                accepted_keys.add(new_key)
+                results.append(new_transfer)
+
+        accepted = [result for result in results if isinstance(result, dict)]
+        if accepted:
+            self._data_list.extend(accepted)
+            self.save_list_to_file()
+            if self._bloom_filter is not None:
+                for new_transfer in accepted:
+                    self._bloom_filter.add(self.duplicate_key(new_transfer))
+                self._bloom_filter.save()
+            self.publish_changes(accepted)
+        return results
+
+    def _stored_keys(self):
+        """Return the duplicate keys of every transfer loaded from the file
+        or rotated into its archive."""
+        with METRICS.span("transfers_store.duplicate_scan"):
+            METRICS.increment("records_scanned", len(self._data_list))
+            return {self.duplicate_key(old_transfer)
+                    for old_transfer in self._data_list} | self.archived_keys()
+
+    def _known_keys(self):
+        """Yield the duplicate keys of the archived and loaded transfers."""
+        yield from self.archived_keys()
+        for old_transfer in self._data_list:
+            yield self.duplicate_key(old_transfer)
+
+    def archived_keys(self):
+        """Return the duplicate keys of the transfers rotated into the
+        archive, read again only when its segments change."""
+        archive = self.archive()
+        if archive is None:
+            return set()
+        segments = [(segment["file"], segment["sealed"]) for segment in archive.load_index()]
+        if self._archived_keys is None or self._archived_keys[0] != segments:
+            self._archived_keys = (segments, {self.duplicate_key(old_transfer) for old_transfer
+                                              in archive.segment_records()})
+        return self._archived_keys[1]
+
+    def find_range(self, start_date, end_date):
+        """
+        Return the transfers whose transfer_date (DD/MM/YYYY) lies between
+        start_date and end_date, both included, archived ones included.
+        A transfer is never requested after its transfer_date, so only the
+        segments requested up to the end of end_date are read.
+        """
+        last_moment = (datetime.strptime(end_date, "%d/%m/%Y").replace(tzinfo=timezone.utc)
+                       + timedelta(days=1)).timestamp()
+        return self.filter_range(self.iter_records(end=last_moment),
+                                 start_date, end_date)
+
+    @staticmethod
+    def filter_range(transfers, start_date, end_date):
+        """Return the transfers of a list dated between start_date and end_date."""
+        first_day = datetime.strptime(start_date, "%d/%m/%Y").date()
+        last_day = datetime.strptime(end_date, "%d/%m/%Y").date()
+        return [transfer for transfer in transfers
+                if first_day <= datetime.strptime(transfer["transfer_date"],
+                                                  "%d/%m/%Y").date() <= last_day]
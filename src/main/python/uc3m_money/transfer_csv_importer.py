@@ -0,0 +1,116 @@
+"""
+transfer_csv_importer.py
+
+This module defines the TransferCsvImporter class, which stores the
+transfer requests of a CSV file.
+
+The rows are read lazily and handled in chunks of chunk_rows: each chunk
+is validated column by column and its valid transfers are committed with
+a single write of the transfers store, which also rejects the rows
+duplicated in the store or earlier in the file. Only one chunk is held in
+memory at a time. Rejected rows are written to a rejects CSV file with
+their line number and the reason, and a progress callback receives the
+running totals after every chunk.
+"""
+import csv
+from itertools import islice
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.account_management_config import TRANSFER_IMPORT_CHUNK_ROWS
+from uc3m_money.account_manager import AccountManager
+from uc3m_money.data.transfer_batch_validator import COLUMNS
+from uc3m_money.metrics.metrics_registry import METRICS
+
+COLUMN_ALIASES = {"type": "transfer_type"}
+
+
+class TransferCsvImporter:
+    """Imports the transfer requests of a CSV file chunk by chunk"""
+
+    def __init__(self, manager=None, chunk_rows=TRANSFER_IMPORT_CHUNK_ROWS, delimiter=";"):
+        self._manager = manager or AccountManager()
+        self._chunk_rows = chunk_rows
+        self._delimiter = delimiter
+
+    @staticmethod
+    def header_columns(fieldnames):
+        """maps the transfer_request argument names to the CSV header names"""
+        header = {}
+        for name in fieldnames or []:
+            column = name.strip().lower()
+            header[COLUMN_ALIASES.get(column, column)] = name
+        if not all(column in header for column in COLUMNS):
+            raise AccountManagementException("Invalid CSV header")
+        return header
+
+    @staticmethod
+    def to_request(row, header):
+        """returns the transfer_request arguments of a CSV row"""
+        request = {column: row[header[column]] for column in COLUMNS}
+        if any(value is None for value in request.values()) or None in row:
+            raise AccountManagementException("Invalid CSV row")
+        try:
+            request["amount"] = float(request["amount"])
+        except ValueError:
+            pass
+        return request
+
+    def _import_chunk(self, chunk, header, rejects):
+        """stores a chunk of (line, row); returns how many rows were accepted"""
+        lines, requests, errors = [], [], []
+        for line, row in chunk:
+            try:
+                requests.append(self.to_request(row, header))
+                lines.append((line, row))
+            except AccountManagementException as ex:
+                errors.append((line, row, ex.message))
+        with METRICS.span("transfer_import.chunk"):
+            results = self._manager.transfer_requests(requests) if requests else []
+        for (line, row), result in zip(lines, results):
+            if isinstance(result, AccountManagementException):
+                errors.append((line, row, result.message))
+        if rejects is not None:
+            for line, row, reason in sorted(errors, key=lambda error: error[0]):
+                rejects.writerow(dict(row, line=line, reason=reason))
+        METRICS.increment("rows_imported", len(chunk))
+        return len(chunk) - len(errors)
+
+    @staticmethod
+    def _numbered_rows(reader):
+        """yields (line number, row) for every row of the CSV reader"""
+        for row in reader:
+            yield reader.line_num, row
+
+    def import_file(self, csv_file, rejects_file=None, progress=None):
+        """
+        Stores the transfers of csv_file and writes the rejected rows to
+        rejects_file (if given). Returns {"rows", "accepted", "rejected"}.
+        """
+        try:
+            with open(csv_file, "r", encoding="utf-8", newline="") as file:
+                reader = csv.DictReader(file, delimiter=self._delimiter)
+                header = self.header_columns(reader.fieldnames)
+                if rejects_file is None:
+                    return self._import_rows(reader, header, None, progress)
+                with open(rejects_file, "w", encoding="utf-8", newline="") as rejects:
+                    writer = csv.DictWriter(rejects, delimiter=self._delimiter,
+                                            fieldnames=reader.fieldnames + ["line", "reason"],
+                                            extrasaction="ignore")
+                    writer.writeheader()
+                    return self._import_rows(reader, header, writer, progress)
+        except FileNotFoundError as ex:
+            raise AccountManagementException("Wrong file  or file path") from ex
+
+    def _import_rows(self, reader, header, rejects, progress):
+        """imports the rows of the reader chunk by chunk"""
+        totals = {"rows": 0, "accepted": 0, "rejected": 0}
+        rows = self._numbered_rows(reader)
+        while True:
+            chunk = list(islice(rows, self._chunk_rows))
+            if not chunk:
+                return totals
+            accepted = self._import_chunk(chunk, header, rejects)
+            totals["rows"] += len(chunk)
+            totals["accepted"] += accepted
+            totals["rejected"] += len(chunk) - accepted
+            if progress is not None:
+                progress(dict(totals))
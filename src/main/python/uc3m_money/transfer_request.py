@@ -2,7 +2,7 @@
 import hashlib
 import json
 from datetime import datetime, timezone
-from src.main.python.uc3m_money.data.attr.iban_code import IbanCode
+from uc3m_money.data.attr.iban_code import IbanCode
 from uc3m_money.data.attr.concept import Concept
 from uc3m_money.data.attr.transfer_type import TransferType
 
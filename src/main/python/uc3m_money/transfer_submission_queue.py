@@ -0,0 +1,150 @@
+"""
+transfer_submission_queue.py
+
+This module defines the TransferSubmissionQueue class, an in-process
+queue in front of AccountManager that serves transfers by priority.
+
+Every submission goes to the lane of its transfer type: URGENT before
+INMEDIATE before ORDINARY (unknown types wait in the ORDINARY lane and are
+rejected by the validation). Each lane holds at most capacity transfers;
+submit blocks while its lane is full, which slows producers down instead
+of letting the backlog grow without limit. A pool of worker threads takes
+up to batch_size transfers from the highest non-empty lane and stores
+them with a single transfer_requests commit. The time from submission to
+commit is kept in a latency histogram per lane.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from uc3m_money.account_management_exception import AccountManagementException
+from uc3m_money.account_management_config import (TRANSFER_QUEUE_CAPACITY,
+                                                  TRANSFER_QUEUE_WORKERS,
+                                                  TRANSFER_QUEUE_BATCH_SIZE)
+from uc3m_money.account_manager import AccountManager
+from uc3m_money.data.transfer_batch_validator import COLUMNS
+from uc3m_money.metrics.metrics_registry import METRICS, LatencyHistogram
+
+LANES = ("URGENT", "INMEDIATE", "ORDINARY")
+
+
+class TransferSubmissionQueue:  # pylint: disable=too-many-instance-attributes
+    """Priority lanes of transfer submissions, group-committed by workers"""
+
+    def __init__(self, manager=None, capacity=TRANSFER_QUEUE_CAPACITY,
+                 workers=TRANSFER_QUEUE_WORKERS, batch_size=TRANSFER_QUEUE_BATCH_SIZE):
+        self._manager = manager or AccountManager()
+        self._capacity = capacity
+        self._worker_count = workers
+        self._batch_size = batch_size
+        self._lanes = {lane: deque() for lane in LANES}
+        self._latencies = {lane: LatencyHistogram() for lane in LANES}
+        self._condition = threading.Condition()
+        self._workers = []
+        self._closed = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @staticmethod
+    def lane_of(transfer_type):
+        """lane serving a transfer type"""
+        return transfer_type if transfer_type in LANES else "ORDINARY"
+
+    def start(self):
+        """starts the worker threads"""
+        for _ in range(self._worker_count - len(self._workers)):
+            worker = threading.Thread(target=self._work, name="transfer-queue-worker",
+                                      daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def close(self):
+        """stops accepting transfers and waits until the queued ones are
+        stored; without workers they fail as the queue is closed"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        with self._condition:
+            pending = [entry for lane in LANES for entry in self._lanes[lane]]
+            for lane in LANES:
+                self._lanes[lane].clear()
+        for _, future, _ in pending:
+            future.set_exception(AccountManagementException("Transfer queue is closed"))
+
+    def submit(self, request, timeout=None):
+        """
+        Queues a transfer (a dict with the transfer_request arguments) and
+        returns a Future with its transfer code or its exception. Waits up
+        to timeout seconds (forever when None) while the lane is full.
+        """
+        try:
+            request = {column: request[column] for column in COLUMNS}
+        except (KeyError, TypeError) as ex:
+            raise AccountManagementException("Error - Invalid Key in JSON") from ex
+        lane = self._lanes[self.lane_of(request["transfer_type"])]
+        future = Future()
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._closed or len(lane) < self._capacity, timeout):
+                raise AccountManagementException("Transfer queue is full")
+            if self._closed:
+                raise AccountManagementException("Transfer queue is closed")
+            lane.append((request, future, time.perf_counter()))
+            self._condition.notify_all()
+        return future
+
+    def _next_batch(self):
+        """waits for submissions; returns (lane, batch) or None once closed and empty"""
+        with self._condition:
+            while True:
+                for name in LANES:
+                    lane = self._lanes[name]
+                    if lane:
+                        batch = [lane.popleft()
+                                 for _ in range(min(self._batch_size, len(lane)))]
+                        self._condition.notify_all()
+                        return name, batch
+                if self._closed:
+                    return None
+                self._condition.wait()
+
+    def _work(self):
+        """stores batches until the queue is closed and drained"""
+        while True:
+            next_batch = self._next_batch()
+            if next_batch is None:
+                return
+            lane, batch = next_batch
+            try:
+                results = self._manager.transfer_requests([request for request, _, _ in batch])
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                results = [ex] * len(batch)
+            committed = time.perf_counter()
+            for (_, future, submitted), result in zip(batch, results):
+                self._observe(lane, committed - submitted)
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _observe(self, lane, seconds):
+        """adds the latency of a stored transfer to its lane"""
+        with self._condition:
+            self._latencies[lane].observe(seconds)
+        METRICS.observe("transfer_queue." + lane.lower(), seconds)
+
+    def lane_metrics(self):
+        """queued transfers and submission-to-commit latency histogram of every lane"""
+        with self._condition:
+            return {lane: {"queued": len(self._lanes[lane]),
+                           "latency": self._latencies[lane].to_json()}
+                    for lane in LANES}
@@ -0,0 +1,93 @@
+"""Tests for the sufficient-funds check of transfer requests"""
+from unittest import TestCase
+from unittest.mock import patch
+from uc3m_money import (AccountManager,
+                        TRANSFERS_STORE_FILE,
+                        AccountManagementException)
+from uc3m_money.store.available_balance_cache import AvailableBalanceCache
+from uc3m_money.store.store_backend import MemoryBackend
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+# ledger balances in transactions.json: 9268.29 and -9981.0
+RICH_IBAN = "ES3559005439021242088295"
+POOR_IBAN = "ES8658342044541216872704"
+
+
+def new_request(from_iban, to_iban, concept, amount):
+    """transfer_request arguments of a valid transfer"""
+    return {"from_iban": from_iban, "to_iban": to_iban, "concept": concept,
+            "transfer_type": "ORDINARY", "date": "27/03/2030", "amount": amount}
+
+
+class TestAvailableBalanceCache(TestCase):
+    """Available balance cache tests class"""
+
+    def setUp(self):
+        """starts from empty in-memory stores and a fresh cache"""
+        self.backend = MemoryBackend()
+        AccountManager().use_store_backend(self.backend)
+        self.cache = AvailableBalanceCache()
+        AccountManager().use_available_balance_cache(self.cache)
+
+    def tearDown(self):
+        """disables the check and restores the files on disk"""
+        AccountManager().use_available_balance_cache(None)
+        AccountManager().use_store_backend(None)
+
+    def test_transfer_debits_and_credits(self):
+        """a stored transfer moves its amount from sender to receiver"""
+        AccountManager().transfer_request(**new_request(RICH_IBAN, POOR_IBAN,
+                                                        "Rent of January", 5000.10))
+        self.assertEqual(4268.19, self.cache.available(RICH_IBAN))
+        self.assertEqual(-4980.9, self.cache.available(POOR_IBAN))
+
+    def test_insufficient_funds_rejected(self):
+        """a transfer over the available balance is not stored"""
+        with self.assertRaises(AccountManagementException) as cm:
+            AccountManager().transfer_request(**new_request(POOR_IBAN, RICH_IBAN,
+                                                            "Rent of January", 10.0))
+        self.assertEqual("Insufficient funds", cm.exception.message)
+        self.assertFalse(self.backend.exists(TRANSFERS_STORE_FILE))
+        self.assertEqual(-9981.0, self.cache.available(POOR_IBAN))
+
+    def test_batch_checks_running_balance(self):
+        """each transfer of a batch sees the reservations of the previous ones"""
+        results = AccountManager().transfer_requests([
+            new_request(RICH_IBAN, POOR_IBAN, "Rent of January", 5000.0),
+            new_request(RICH_IBAN, POOR_IBAN, "Rent of February", 5000.0),
+            new_request(RICH_IBAN, POOR_IBAN, "Rent of March", 4000.0)])
+        self.assertIsInstance(results[0], str)
+        self.assertEqual("Insufficient funds", results[1].message)
+        self.assertIsInstance(results[2], str)
+        self.assertEqual(268.29, self.cache.available(RICH_IBAN))
+
+    def test_rejected_by_store_released(self):
+        """the reservation of a duplicated transfer is given back"""
+        request = new_request(RICH_IBAN, POOR_IBAN, "Rent of January", 1000.0)
+        AccountManager().transfer_request(**request)
+        with self.assertRaises(AccountManagementException) as cm:
+            AccountManager().transfer_request(**request)
+        self.assertEqual("Duplicated transfer in transfer list", cm.exception.message)
+        self.assertEqual(8268.29, self.cache.available(RICH_IBAN))
+
+    def test_credit_and_release(self):
+        """deposits add to the balance and released reservations are available again"""
+        self.cache.credit(POOR_IBAN, 10000.0)
+        self.cache.reserve(POOR_IBAN, 19.0)
+        self.assertEqual(0.0, self.cache.available(POOR_IBAN))
+        with self.assertRaises(AccountManagementException):
+            self.cache.reserve(POOR_IBAN, 0.01)
+        self.cache.release(POOR_IBAN, 19.0)
+        self.assertEqual(19.0, self.cache.available(POOR_IBAN))
+
+    def test_store_failure_releases(self):
+        """a store that fails gives back every reservation of the transfers"""
+        with patch.object(TransfersJsonStore, "add_items", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                AccountManager().transfer_request(**new_request(RICH_IBAN, POOR_IBAN,
+                                                                "Rent of January", 5000.0))
+            with self.assertRaises(OSError):
+                AccountManager().transfer_requests([
+                    new_request(RICH_IBAN, POOR_IBAN, "Rent of February", 5000.0),
+                    new_request(RICH_IBAN, POOR_IBAN, "Rent of March", 4000.0)])
+        self.assertEqual(9268.29, self.cache.available(RICH_IBAN))
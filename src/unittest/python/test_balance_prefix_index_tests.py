@@ -0,0 +1,134 @@
+"""Tests for the point-in-time balances of the per-IBAN prefix sums index"""
+import json
+import math
+import os.path
+import shutil
+from datetime import datetime, timezone
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TRANSACTIONS_STORE_FILE,
+                        BALANCES_STORE_FILE,
+                        AccountManager,
+                        AccountManagementException)
+from uc3m_money.account_management_config import BALANCE_INDEX_FILE
+from uc3m_money.iban_balance import IbanBalance
+from uc3m_money.store.balance_prefix_index import BalancePrefixIndex
+
+LEDGER_FILE = JSON_FILES_PATH + "transactions_index_test.json"
+SAVED_LEDGER_FILE = JSON_FILES_PATH + "transactions_index_saved.json"
+INDEX_FILE = JSON_FILES_PATH + "balance_index_test.json"
+IBAN = "ES3559005439021242088295"
+
+
+def serial_balance(transactions, iban):
+    """reference balance computed with the serial loop"""
+    return math.fsum(float(transaction["amount"]) for transaction in transactions
+                     if transaction["IBAN"] == iban)
+
+
+class TestBalancePrefixIndex(TestCase):
+    """Balance prefix index tests class"""
+
+    def setUp(self):
+        """copies the ledger so it can be appended to"""
+        shutil.copyfile(TRANSACTIONS_STORE_FILE, LEDGER_FILE)
+        with open(LEDGER_FILE, "r", encoding="utf-8", newline="") as file:
+            self.transactions = json.load(file)
+
+    def tearDown(self):
+        """removes the generated files and restores the default index"""
+        AccountManager().use_balance_index(None)
+        for file_name in (LEDGER_FILE, INDEX_FILE, BALANCE_INDEX_FILE, BALANCES_STORE_FILE):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def append(self, transactions):
+        """appends transactions rewriting the ledger as the stores do"""
+        self.transactions.extend(transactions)
+        with open(LEDGER_FILE, "w", encoding="utf-8", newline="") as file:
+            json.dump(self.transactions, file, indent=4)
+
+    def test_incremental_point_in_time(self):
+        """only appended records are parsed and old balances stay queryable"""
+        index = BalancePrefixIndex(LEDGER_FILE, INDEX_FILE)
+        self.assertEqual(20, index.refresh())
+        index.save()
+        first_balance = serial_balance(self.transactions, IBAN)
+        posted_at = datetime(2025, 3, 28, 10, tzinfo=timezone.utc).timestamp()
+        self.append([{"IBAN": IBAN, "amount": "+100.50", "time": posted_at},
+                     {"IBAN": IBAN, "amount": "-20.25", "time": posted_at}])
+        index = BalancePrefixIndex(LEDGER_FILE, INDEX_FILE)
+        self.assertEqual(2, index.refresh())
+        self.assertEqual(0, index.refresh())
+        self.assertEqual(22, index.records)
+        self.assertEqual(first_balance, index.balance_as_of(IBAN, "26/03/2025"))
+        self.assertEqual(first_balance, index.balance_as_of(IBAN, "27/03/2025"))
+        self.assertEqual(serial_balance(self.transactions, IBAN),
+                         index.balance_as_of(IBAN, "28/03/2025"))
+        self.assertEqual(serial_balance(self.transactions, IBAN), index.balance_at(IBAN))
+        self.assertEqual(first_balance, index.balance_at_position(IBAN, 20))
+
+    def test_untimed_rows_from_start(self):
+        """rows without time apply from the start, whenever they are indexed"""
+        first_balance = serial_balance(self.transactions, IBAN)
+        for now in ("2025/03/26 10:00:00", "2030/01/01 10:00:00"):
+            with self.subTest(now=now), freeze_time(now):
+                index = BalancePrefixIndex(LEDGER_FILE, INDEX_FILE)
+                index.refresh()
+                self.assertEqual(first_balance, index.balance_as_of(IBAN, "01/01/2000"))
+
+    def test_rewritten_ledger_rebuilds(self):
+        """a ledger changed before the indexed offset is indexed again"""
+        index = BalancePrefixIndex(LEDGER_FILE, INDEX_FILE)
+        index.refresh()
+        self.transactions = self.transactions[:5]
+        self.append([{"IBAN": IBAN, "amount": "+1.00", "time": 1.0}])
+        self.assertEqual(6, index.refresh())
+        self.assertEqual(serial_balance(self.transactions, IBAN), index.balance_at(IBAN))
+
+    def test_errors(self):
+        """unknown ibans, bad dates and bad ledgers raise the usual errors"""
+        index = BalancePrefixIndex(LEDGER_FILE, INDEX_FILE)
+        index.refresh()
+        for as_of, message in ((lambda: index.balance_at("ES2914650000000000000000"),
+                                "IBAN not found"),
+                               (lambda: index.balance_as_of(IBAN, "2025-03-26"),
+                                "Invalid date format")):
+            with self.assertRaises(AccountManagementException) as c_m:
+                as_of()
+            self.assertEqual(message, c_m.exception.message)
+        with open(LEDGER_FILE, "w", encoding="utf-8", newline="") as file:
+            file.write("Hello World!")
+        with self.assertRaises(AccountManagementException) as c_m:
+            index.refresh()
+        self.assertEqual("JSON Decode Error - Wrong JSON Format", c_m.exception.message)
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_manager_and_iban_balance(self):
+        """AccountManager and IbanBalance answer from the index"""
+        expected = serial_balance(self.transactions, IBAN)
+        manager = AccountManager()
+        manager.use_balance_index(BalancePrefixIndex(LEDGER_FILE, INDEX_FILE))
+        self.assertEqual(expected, manager.balance_as_of(IBAN, "26/03/2025"))
+        self.assertTrue(os.path.exists(INDEX_FILE))
+        balance = IbanBalance(IBAN, as_of="26/03/2025").to_json()
+        self.assertEqual(expected, balance["BALANCE"])
+        self.assertEqual("26/03/2025", balance["AS_OF"])
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_same_balance_everywhere(self):
+        """the current balance, IbanBalance and the balance as of now are the
+        same exact sum, not the one of a naive running total"""
+        os.replace(TRANSACTIONS_STORE_FILE, SAVED_LEDGER_FILE)
+        self.addCleanup(os.replace, SAVED_LEDGER_FILE, TRANSACTIONS_STORE_FILE)
+        with open(TRANSACTIONS_STORE_FILE, "w", encoding="utf-8", newline="") as file:
+            json.dump([{"IBAN": IBAN, "amount": "+0.10"}] * 10, file)
+        manager = AccountManager()
+        manager.calculate_balance(IBAN)
+        now = datetime.now(timezone.utc).timestamp()
+        self.assertEqual([1.0, 1.0, 1.0],
+                         [manager.balance_history(IBAN, start=now)[-1]["BALANCE"],
+                          IbanBalance(IBAN).to_json()["BALANCE"],
+                          manager.balance_as_of(IBAN, now)])
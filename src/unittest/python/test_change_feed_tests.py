@@ -0,0 +1,122 @@
+"""Tests for the change feed of the records appended to the stores"""
+import os.path
+import shutil
+import time
+from unittest import TestCase
+from unittest.mock import patch
+from uc3m_money import (AccountManager,
+                        JSON_FILES_PATH,
+                        AccountManagementException)
+from uc3m_money.store.change_feed import ChangeFeed
+from uc3m_money.store.store_backend import FILE_BACKEND, MemoryBackend
+
+FEED_PATH = JSON_FILES_PATH + "change_feed_test/"
+FROM_IBAN = "ES8658342044541216872704"
+TO_IBAN = "ES3559005439021242088295"
+
+
+def new_request(concept):
+    """transfer_request arguments of a valid transfer"""
+    return {"from_iban": FROM_IBAN, "to_iban": TO_IBAN, "concept": concept,
+            "transfer_type": "ORDINARY", "date": "27/03/2030", "amount": 100.0}
+
+
+class TestChangeFeed(TestCase):
+    """Change feed tests class"""
+
+    def setUp(self):
+        """records the appends of in-memory stores in a feed of 2-change segments,
+        kept in memory with them"""
+        shutil.rmtree(FEED_PATH, ignore_errors=True)
+        self.feed = ChangeFeed(FEED_PATH, segment_records=2, retention_seconds=3600)
+        AccountManager().use_store_backend(MemoryBackend())
+        AccountManager().use_change_feed(self.feed)
+
+    def tearDown(self):
+        """stops recording, restores the files on disk and removes the feed"""
+        AccountManager().use_change_feed(None)
+        AccountManager().use_store_backend(None)
+        shutil.rmtree(FEED_PATH, ignore_errors=True)
+
+    def test_appends_recorded_in_order(self):
+        """stored transfers, deposits and balances get consecutive sequence numbers"""
+        manager = AccountManager()
+        codes = manager.transfer_requests([new_request("Rent of January"),
+                                           new_request("Rent of January"),
+                                           new_request("Rent of February")])
+        manager.deposits_into_account([{"IBAN": TO_IBAN, "AMOUNT": "EUR 1000.00"}])
+        manager.calculate_balance(TO_IBAN)
+        page = self.feed.read(0, limit=10)
+        self.assertEqual([1, 2, 3, 4], [change["seq"] for change in page["changes"]])
+        self.assertEqual(["transfers", "transfers", "deposits", "balances"],
+                         [change["store"] for change in page["changes"]])
+        self.assertEqual([codes[0], codes[2]], [change["record"]["transfer_code"]
+                                                for change in page["changes"][:2]])
+        self.assertEqual(4, page["next_offset"])
+        self.assertEqual(4, self.feed.last_offset())
+        self.assertEqual([1, 3], self.feed.segments())
+        self.assertFalse(os.path.exists(FEED_PATH))
+
+    def test_consumer_resumes_from_offset(self):
+        """a consumer tails the feed in batches from its saved offset"""
+        self.feed.append("deposits", [{"n": number} for number in range(5)])
+        page = self.feed.tail("fraud", limit=3)
+        self.assertEqual([0, 1, 2], [change["record"]["n"] for change in page["changes"]])
+        self.feed.commit_offset("fraud", page["next_offset"])
+        page = self.feed.tail("fraud", limit=3)
+        self.assertEqual([3, 4], [change["record"]["n"] for change in page["changes"]])
+        self.feed.commit_offset("fraud", page["next_offset"])
+        self.assertEqual({"changes": [], "next_offset": 5}, self.feed.tail("fraud"))
+        self.assertEqual(0, self.feed.offset("reporting"))
+
+    def test_retention_drops_old_segments(self):
+        """old full segments are deleted and reading them is an error"""
+        self.feed.append("balances", [{"n": number} for number in range(5)])
+        self.assertEqual(0, self.feed.apply_retention())
+        self.assertEqual(2, self.feed.apply_retention(time.time() + 3601))
+        self.assertEqual(5, self.feed.first_offset())
+        with self.assertRaises(AccountManagementException) as cm:
+            self.feed.read(0)
+        self.assertEqual("Change feed offset expired", cm.exception.message)
+        self.assertEqual([5], [change["seq"] for change in self.feed.read(4)["changes"]])
+        self.assertEqual(6, self.feed.append("balances", [{"n": 5}]))
+        self.assertTrue(self.feed.backend.exists(self.feed.segment_file(5)))
+
+    def test_invalid_offset_and_limit(self):
+        """offsets and limits are validated"""
+        for offset, limit, message in ((-1, 10, "Invalid offset"), ("2", 10, "Invalid offset"),
+                                       (0, 0, "Invalid limit")):
+            with self.subTest(offset=offset, limit=limit):
+                with self.assertRaises(AccountManagementException) as cm:
+                    self.feed.read(offset, limit)
+                self.assertEqual(message, cm.exception.message)
+
+    def test_torn_line_not_read(self):
+        """a line without its newline is not read yet and is dropped by the next append"""
+        self.feed.append("deposits", [{"n": 0}])
+        self.feed.backend.append(self.feed.segment_file(1), '{"seq": 2, "time": 0, "sto')
+        self.assertEqual({"changes": [], "next_offset": 1}, self.feed.read(1))
+        self.assertEqual(1, self.feed.last_offset())
+        self.assertEqual(2, self.feed.append("deposits", [{"n": 1}]))
+        self.assertEqual([0, 1], [change["record"]["n"] for change in self.feed.read()["changes"]])
+
+    def test_feed_error_keeps_store_operation(self):
+        """a feed that cannot be written does not fail the stored transfer"""
+        with patch.object(ChangeFeed, "append", side_effect=OSError("disk full")), \
+                self.assertLogs("uc3m_money.change_feed", "ERROR"):
+            code = AccountManager().transfer_request(**new_request("Rent of January"))
+        self.assertEqual([code], [transfer["transfer_code"] for transfer in
+                                  AccountManager().transfers_store().data_list])
+        self.assertEqual([], self.feed.read()["changes"])
+
+    def test_feed_on_disk(self):
+        """a feed given the file backend keeps its segments on disk, torn lines included"""
+        feed = ChangeFeed(FEED_PATH, segment_records=2, backend=FILE_BACKEND)
+        feed.append("deposits", [{"n": 0}])
+        with open(feed.segment_file(1), "a", encoding="utf-8", newline="") as file:
+            file.write('{"seq": 2, "time": 0, "sto')
+        self.assertEqual(1, feed.last_offset())
+        self.assertEqual(3, feed.append("deposits", [{"n": 1}, {"n": 2}]))
+        self.assertEqual([0, 1, 2], [change["record"]["n"] for change in feed.read()["changes"]])
+        self.assertEqual([1, 3], feed.segments())
+        self.assertTrue(os.path.exists(feed.segment_file(3)))
@@ -0,0 +1,86 @@
+"""Tests for the NDJSON command line interface"""
+import io
+import json
+import os.path
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import AccountManager, TRANSFERS_STORE_FILE, BALANCES_STORE_FILE
+from uc3m_money.cli import run
+from uc3m_money.store.store_backend import MemoryBackend
+
+
+class TestCli(TestCase):
+    """Command line interface tests class"""
+    def setUp(self):
+        """ inicializo el entorno de prueba """
+        for file_name in (TRANSFERS_STORE_FILE, BALANCES_STORE_FILE):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    @staticmethod
+    def run_command(command, requests, batch_size=2):
+        """runs a command over the given NDJSON lines; returns the result lines"""
+        output_stream = io.StringIO()
+        error_stream = io.StringIO()
+        run(command, batch_size, io.StringIO("\n".join(requests) + "\n"),
+            output_stream, error_stream)
+        return ([json.loads(line) for line in output_stream.getvalue().splitlines()],
+                error_stream.getvalue())
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_transfer_stream(self):
+        """results keep the input order; duplicates and bad lines fail alone"""
+        transfer = {"from_iban": "ES6211110783482828975098",
+                    "to_iban": "ES8658342044541216872704",
+                    "concept": "Testing command line",
+                    "transfer_type": "ORDINARY",
+                    "date": "22/03/2025",
+                    "amount": 10.0}
+        results, summary = self.run_command("transfer", [json.dumps(transfer),
+                                                         json.dumps(transfer),
+                                                         "{not json",
+                                                         json.dumps(dict(transfer, amount=5))])
+        self.assertEqual([True, False, False, False], [result["ok"] for result in results])
+        self.assertEqual(32, len(results[0]["transfer_code"]))
+        self.assertEqual(["Duplicated transfer in transfer list",
+                          "JSON Decode Error - Wrong JSON Format",
+                          "Invalid transfer amount"],
+                         [result["error"] for result in results[1:]])
+        self.assertIn("transfer: 4 requests (1 ok, 3 failed)", summary)
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_balance_stream(self):
+        """balances are returned for every known iban"""
+        results, _ = self.run_command("balance", ['{"IBAN": "ES3559005439021242088295"}',
+                                                  '{"IBAN": "ES9420805801101234567891"}'])
+        self.assertEqual(9268.29, results[0]["BALANCE"])
+        self.assertEqual("IBAN not found", results[1]["error"])
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_deposit_with_numeric_amount(self):
+        """a deposit line with a numeric AMOUNT fails alone"""
+        AccountManager().use_store_backend(MemoryBackend())
+        self.addCleanup(AccountManager().use_store_backend, None)
+        results, summary = self.run_command("deposit", [
+            '{"IBAN": "ES3559005439021242088295", "AMOUNT": 100}',
+            '{"IBAN": "ES3559005439021242088295", "AMOUNT": "EUR 1000.00"}'])
+        self.assertEqual({"ok": False, "error": "Error - Invalid deposit amount"}, results[0])
+        self.assertEqual(64, len(results[1]["deposit_signature"]))
+        self.assertIn("deposit: 2 requests (1 ok, 1 failed)", summary)
+
+    def test_store_error_fails_its_requests(self):
+        """an unreadable store fails the requests stored in it, one by one"""
+        with open(TRANSFERS_STORE_FILE, "w", encoding="utf-8", newline="") as file:
+            file.write("[{")
+        self.addCleanup(remove, TRANSFERS_STORE_FILE)
+        transfer = {"from_iban": "ES6211110783482828975098",
+                    "to_iban": "ES8658342044541216872704",
+                    "concept": "Testing command line",
+                    "transfer_type": "ORDINARY",
+                    "date": "22/03/2030",
+                    "amount": 10.0}
+        results, _ = self.run_command("transfer", [json.dumps(transfer),
+                                                   json.dumps(dict(transfer, amount=5))])
+        self.assertEqual([{"ok": False, "error": "JSON Decode Error - Wrong JSON Format"},
+                          {"ok": False, "error": "Invalid transfer amount"}], results)
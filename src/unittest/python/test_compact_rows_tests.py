@@ -0,0 +1,102 @@
+"""Tests for the compact in-memory form of the loaded stores"""
+import json
+import os.path
+import tracemalloc
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TRANSACTIONS_STORE_FILE,
+                        TransferRequest,
+                        AccountManagementException)
+from uc3m_money.store.compact_rows import CompactRows
+from uc3m_money.store.json_store import JsonStore
+from uc3m_money.store.transaction_json_store import TransactionJsonStore
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+TRANSFERS_FILE = JSON_FILES_PATH + "transfers_compact_test.json"
+IBANS = ["ES8658342044541216872704", "ES3559005439021242088295", "ES6211110783482828975098"]
+
+
+def transfers_text(count):
+    """JSON text of a transfers store with repeated accounts and concepts"""
+    return json.dumps([{"from_iban": IBANS[number % 3],
+                        "to_iban": IBANS[(number + 1) % 3],
+                        "transfer_type": "ORDINARY",
+                        "transfer_amount": 10.0 + number % 500 / 100,
+                        "transfer_concept": "Rent of March",
+                        "transfer_date": "27/03/2025",
+                        "time_stamp": 1742997600.0 + number,
+                        "transfer_code": f"{number:032x}"} for number in range(count)],
+                      indent=2)
+
+
+def traced_memory(load):
+    """bytes still allocated by the result of load()"""
+    tracemalloc.start()
+    try:
+        result = load()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+class TestCompactRows(TestCase):
+    """Compact rows tests class"""
+
+    def tearDown(self):
+        """restores the default representation and removes the test store"""
+        JsonStore.use_compact_rows(False)
+        for file_name in (TRANSFERS_FILE, os.path.splitext(TRANSFERS_FILE)[0] + ".bloom"):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def test_same_records_and_bytes(self):
+        """compact rows read back the same records and save the same file"""
+        with open(TRANSACTIONS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
+            original = file.read()
+        rows = CompactRows.from_json(original)
+        self.assertEqual(json.loads(original), rows)
+        self.assertEqual(json.loads(original)[3:7], rows[3:7])
+        self.assertEqual(json.dumps(json.loads(original), indent=2),
+                         json.dumps(list(rows), indent=2))
+        text = transfers_text(50)
+        self.assertEqual(json.loads(text), list(CompactRows.from_json(text)))
+
+    def test_amounts_as_cents_and_shared_strings(self):
+        """exact cent amounts become ints and repeated strings are shared"""
+        rows = CompactRows([{"IBAN": IBANS[0], "BALANCE": 10.01},
+                            {"IBAN": IBANS[0][:12] + IBANS[0][12:], "BALANCE": 20.5},
+                            {"IBAN": IBANS[1], "BALANCE": 1e-9}])
+        # pylint: disable=protected-access
+        self.assertEqual(1001, rows._rows[0][2])
+        self.assertIs(rows._rows[0][1], rows._rows[1][1])
+        self.assertIs(rows._rows[0][0], rows._rows[1][0])
+        self.assertEqual(1e-9, rows._rows[2][2])
+        self.assertEqual([{"IBAN": IBANS[0], "BALANCE": 10.01},
+                          {"IBAN": IBANS[0], "BALANCE": 20.5},
+                          {"IBAN": IBANS[1], "BALANCE": 1e-9}], list(rows))
+
+    def test_memory_reduction(self):
+        """the compact form takes well under half of the list of dicts"""
+        text = transfers_text(5000)
+        dicts_size = traced_memory(lambda: json.loads(text))
+        compact_size = traced_memory(lambda: CompactRows.from_json(text))
+        self.assertLess(compact_size, dicts_size * 0.5)
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_stores_work_on_compact_rows(self):
+        """stores load, check duplicates and save with compact rows enabled"""
+        JsonStore.use_compact_rows()
+        self.assertIsInstance(TransactionJsonStore().data_list, CompactRows)
+        store = TransfersJsonStore(TRANSFERS_FILE)
+        transfer = TransferRequest(from_iban=IBANS[0], to_iban=IBANS[1],
+                                   transfer_concept="Rent of March", transfer_type="URGENT",
+                                   transfer_date="27/03/2025", transfer_amount=100.25)
+        store.add_item(transfer)
+        with self.assertRaises(AccountManagementException) as c_m:
+            TransfersJsonStore(TRANSFERS_FILE, bloom_bits=0).add_item(transfer)
+        self.assertEqual("Duplicated transfer in transfer list", c_m.exception.message)
+        self.assertEqual([transfer.to_json()], list(TransfersJsonStore(TRANSFERS_FILE).data_list))
@@ -0,0 +1,108 @@
+"""Stress tests for the thread safety of AccountManager"""
+import json
+import os.path
+from concurrent.futures import ThreadPoolExecutor
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (TRANSFERS_STORE_FILE,
+                        DEPOSITS_STORE_FILE,
+                        BALANCES_STORE_FILE,
+                        AccountManager,
+                        AccountManagementException)
+from uc3m_money.store.store_locks import StoreLocks
+
+THREADS = 8
+FROM_IBAN = "ES8658342044541216872704"
+TO_IBAN = "ES3559005439021242088295"
+
+
+def read_list(file_name):
+    """returns the list saved in a store file"""
+    with open(file_name, "r", encoding="utf-8", newline="") as file:
+        return json.load(file)
+
+
+class TestConcurrency(TestCase):
+    """AccountManager thread safety tests class"""
+
+    def setUp(self):
+        """starts from empty transfer and balance stores"""
+        for file_name in (TRANSFERS_STORE_FILE, BALANCES_STORE_FILE):
+            if os.path.exists(file_name):
+                remove(file_name)
+        with open(DEPOSITS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
+            self.original_deposits = file.read()
+
+    def tearDown(self):
+        """restores the deposits store and drops the transfers and balances"""
+        with open(DEPOSITS_STORE_FILE, "w", encoding="utf-8", newline="") as file:
+            file.write(self.original_deposits)
+        for file_name in (TRANSFERS_STORE_FILE, BALANCES_STORE_FILE):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_no_lost_transfers(self):
+        """every transfer sent from the thread pool is stored exactly once"""
+        manager = AccountManager()
+
+        def send(number):
+            return manager.transfer_request(FROM_IBAN, TO_IBAN, "Stress test transfer",
+                                            "ORDINARY", "26/03/2025", 10.0 + number)
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            codes = list(executor.map(send, range(200)))
+        stored = read_list(TRANSFERS_STORE_FILE)
+        self.assertEqual(200, len(stored))
+        self.assertEqual(sorted(codes), sorted(transfer["transfer_code"] for transfer in stored))
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_duplicates_detected_across_threads(self):
+        """only one of several concurrent identical transfers is accepted"""
+        manager = AccountManager()
+
+        def send(_):
+            try:
+                return manager.transfer_request(FROM_IBAN, TO_IBAN, "Same transfer twice",
+                                                "URGENT", "27/03/2025", 50.0)
+            except AccountManagementException as ex:
+                return ex.message
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            outcomes = list(executor.map(send, range(32)))
+        self.assertEqual(31, outcomes.count("Duplicated transfer in transfer list"))
+        self.assertEqual(1, len(read_list(TRANSFERS_STORE_FILE)))
+
+    def test_no_lost_deposits_and_balances(self):
+        """concurrent deposit batches and balances are all appended"""
+        manager = AccountManager()
+        before = len(read_list(DEPOSITS_STORE_FILE))
+
+        def deposit(number):
+            return manager.deposits_into_account([{"IBAN": TO_IBAN,
+                                                   "AMOUNT": f"EUR {1000 + number}.00"}] * 3)
+
+        def balance(_):
+            return manager.calculate_balance(TO_IBAN)
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            deposits = list(executor.map(deposit, range(40)))
+            balances = list(executor.map(balance, range(40)))
+        self.assertEqual(before + 120, len(read_list(DEPOSITS_STORE_FILE)))
+        self.assertTrue(all(isinstance(signature, str)
+                            for batch in deposits for signature in batch))
+        self.assertTrue(all(balances))
+        self.assertEqual(40, len(read_list(BALANCES_STORE_FILE)))
+
+    def test_iban_locks_in_stripe_order(self):
+        """the locks of several ibans are unique and ordered by stripe"""
+        locks = StoreLocks(iban_stripes=4)
+        ibans = [FROM_IBAN, TO_IBAN, FROM_IBAN]
+        stripes = sorted({locks.iban_stripe(iban) for iban in ibans})
+        self.assertEqual([locks.iban_lock(FROM_IBAN if locks.iban_stripe(FROM_IBAN) == stripe
+                                          else TO_IBAN) for stripe in stripes],
+                         locks.iban_locks(ibans))
+        self.assertIs(locks.file_lock("a.json"), locks.file_lock("./a.json"))
+        with locks.ibans_locked(ibans):
+            self.assertIs(locks.iban_lock(FROM_IBAN), locks.iban_lock(FROM_IBAN))
@@ -0,0 +1,113 @@
+"""Tests for the deposit directory watcher"""
+import json
+import os.path
+import shutil
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import AccountManager, JSON_FILES_PATH, DEPOSITS_STORE_FILE
+from uc3m_money.deposit_directory_watcher import DepositDirectoryWatcher
+from uc3m_money.store.available_balance_cache import AvailableBalanceCache
+from uc3m_money.store.deposit_file_cache import DepositFileCache
+from uc3m_money.store.store_backend import MemoryBackend
+
+WATCHED_PATH = JSON_FILES_PATH + "watched_deposits_test/"
+CHECKPOINT_FILE = JSON_FILES_PATH + "deposit_watcher_checkpoint_test.json"
+
+
+class TestDepositDirectoryWatcher(TestCase):
+    """Deposit directory watcher tests class"""
+    def setUp(self):
+        """ inicializo el entorno de prueba """
+        self.tearDown()
+        os.makedirs(WATCHED_PATH)
+        if os.path.exists(DEPOSITS_STORE_FILE):
+            remove(DEPOSITS_STORE_FILE)
+
+    def tearDown(self):
+        """ removes the watched directory and the checkpoint """
+        if os.path.exists(WATCHED_PATH):
+            shutil.rmtree(WATCHED_PATH)
+        if os.path.exists(CHECKPOINT_FILE):
+            remove(CHECKPOINT_FILE)
+
+    @staticmethod
+    def write_deposit(name, amount):
+        """drops a deposit file in the watched directory"""
+        with open(WATCHED_PATH + name, "w", encoding="utf-8", newline="") as file:
+            json.dump({"IBAN": "ES6211110783482828975098", "AMOUNT": amount}, file)
+
+    @staticmethod
+    def stored_deposits():
+        """returns the deposits in the store"""
+        with open(DEPOSITS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
+            return json.load(file)
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_incremental_batches(self):
+        """only new files are processed, at most max_files_per_cycle per cycle"""
+        self.write_deposit("first.json", "EUR 1000.00")
+        self.write_deposit("second.json", "EUR 2000.00")
+        self.write_deposit("wrong.json", "EUR 20.0")
+        watcher = DepositDirectoryWatcher(WATCHED_PATH, CHECKPOINT_FILE, max_files_per_cycle=2)
+        first_cycle = watcher.run_once()
+        self.assertEqual(2, first_cycle["processed"] + first_cycle["rejected"])
+        self.assertEqual(1, first_cycle["deferred"])
+        watcher.run_once()
+        self.assertEqual(2, len(self.stored_deposits()))
+
+        restarted = DepositDirectoryWatcher(WATCHED_PATH, CHECKPOINT_FILE)
+        self.assertEqual({"processed": 0, "rejected": 0, "deferred": 0}, restarted.run_once())
+        self.write_deposit("third.json", "EUR 3000.00")
+        self.assertEqual({"processed": 1, "rejected": 0, "deferred": 0}, restarted.run_once())
+        self.assertEqual([1000.0, 2000.0, 3000.0],
+                         sorted(deposit["deposit_amount"] for deposit in self.stored_deposits()))
+        checkpoint = restarted.load_checkpoint()
+        self.assertEqual("Error - Invalid deposit amount",
+                         checkpoint["files"]["wrong.json"]["error"])
+
+    def test_deposits_credited_and_cached(self):
+        """watched deposits are credited and a re-delivered file is not stored again"""
+        manager = AccountManager()
+        manager.use_store_backend(MemoryBackend())
+        available_balances = AvailableBalanceCache()
+        manager.use_available_balance_cache(available_balances)
+        manager.use_deposit_file_cache(DepositFileCache())
+        try:
+            self.write_deposit("first.json", "EUR 1000.00")
+            watcher = DepositDirectoryWatcher(WATCHED_PATH, CHECKPOINT_FILE)
+            self.assertEqual({"processed": 1, "rejected": 0, "deferred": 0}, watcher.run_once())
+            balance = available_balances.available("ES6211110783482828975098")
+            self.assertAlmostEqual(
+                AvailableBalanceCache().available("ES6211110783482828975098") + 1000, balance)
+            shutil.copy(WATCHED_PATH + "first.json", WATCHED_PATH + "again.json")
+            self.assertEqual({"processed": 1, "rejected": 0, "deferred": 0}, watcher.run_once())
+            files = watcher.load_checkpoint()["files"]
+            self.assertEqual(files["first.json"]["deposit_signature"],
+                             files["again.json"]["deposit_signature"])
+            self.assertEqual(1, len(manager.deposits_store().data_list))
+            self.assertEqual(balance, available_balances.available("ES6211110783482828975098"))
+        finally:
+            manager.use_deposit_file_cache(None)
+            manager.use_available_balance_cache(None)
+            manager.use_store_backend(None)
+
+    def test_same_content_in_one_batch(self):
+        """two files with the same content in one cycle are stored once"""
+        manager = AccountManager()
+        manager.use_store_backend(MemoryBackend())
+        manager.use_deposit_file_cache(DepositFileCache())
+        try:
+            self.write_deposit("first.json", "EUR 1000.00")
+            shutil.copy(WATCHED_PATH + "first.json", WATCHED_PATH + "again.json")
+            watcher = DepositDirectoryWatcher(WATCHED_PATH, CHECKPOINT_FILE)
+            self.assertEqual({"processed": 2, "rejected": 0, "deferred": 0}, watcher.run_once())
+            files = watcher.load_checkpoint()["files"]
+            self.assertEqual(files["first.json"]["deposit_signature"],
+                             files["again.json"]["deposit_signature"])
+            self.assertEqual([files["first.json"]["deposit_signature"]],
+                             [deposit["deposit_signature"]
+                              for deposit in manager.deposits_store().data_list])
+        finally:
+            manager.use_deposit_file_cache(None)
+            manager.use_store_backend(None)
@@ -0,0 +1,74 @@
+"""Tests for the processed deposit files cache"""
+import json
+import os.path
+from os import remove
+from unittest import TestCase
+from unittest.mock import patch
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        JSON_FILES_DEPOSITS,
+                        DEPOSITS_STORE_FILE,
+                        AccountManager)
+from uc3m_money.store.deposit_file_cache import DepositFileCache
+from uc3m_money.store.json_store import JsonStore
+from uc3m_money.store.store_backend import MemoryBackend
+
+CACHE_FILE = JSON_FILES_PATH + "deposit_files_cache_test.json"
+DEPOSIT_FILE = JSON_FILES_DEPOSITS + "case_ok.json"
+
+
+class TestDepositFileCache(TestCase):
+    """Deposit file cache tests class"""
+    def setUp(self):
+        """ inicializo el entorno de prueba """
+        for file_name in (CACHE_FILE, DEPOSITS_STORE_FILE):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def tearDown(self):
+        """ disables the cache for the other tests """
+        AccountManager().use_deposit_file_cache(None)
+        if os.path.exists(CACHE_FILE):
+            remove(CACHE_FILE)
+
+    @staticmethod
+    def stored_deposits():
+        """returns the deposits in the store"""
+        with open(DEPOSITS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
+            return json.load(file)
+
+    def test_redelivered_file_not_processed(self):
+        """the same file returns the first signature and is not stored twice"""
+        mngr = AccountManager()
+        mngr.use_deposit_file_cache(DepositFileCache(CACHE_FILE))
+        with freeze_time("2025/03/26 14:00:00"):
+            first = mngr.deposit_into_account(DEPOSIT_FILE)
+        with freeze_time("2025/03/27 14:00:00"):
+            second = mngr.deposit_into_account(DEPOSIT_FILE)
+        self.assertEqual(first, second)
+        self.assertEqual(1, len(self.stored_deposits()))
+
+    def test_retention_window(self):
+        """files processed before the retention window are processed again"""
+        mngr = AccountManager()
+        mngr.use_deposit_file_cache(DepositFileCache(CACHE_FILE, retention_seconds=3600))
+        with freeze_time("2025/03/26 14:00:00"):
+            first = mngr.deposit_into_account(DEPOSIT_FILE)
+        with freeze_time("2025/03/26 16:00:00"):
+            second = mngr.deposit_into_account(DEPOSIT_FILE)
+        self.assertNotEqual(first, second)
+        self.assertEqual(2, len(self.stored_deposits()))
+
+    def test_lookup_without_reload(self):
+        """lookups read the index by content hash and load the file only once it changed"""
+        backend = MemoryBackend()
+        AccountManager().use_store_backend(backend)
+        self.addCleanup(AccountManager().use_store_backend, None)
+        cache = DepositFileCache(CACHE_FILE)
+        cache.add_signatures([("first", "signature 1"), ("second", "signature 2")])
+        with patch.object(JsonStore, "load_list_from_file") as load_list_from_file:
+            self.assertEqual("signature 2", cache.find_signature("second"))
+            self.assertIsNone(cache.find_signature("third"))
+        load_list_from_file.assert_not_called()
+        DepositFileCache(CACHE_FILE).add_signature("third", "signature 3")
+        self.assertEqual("signature 3", cache.find_signature("third"))
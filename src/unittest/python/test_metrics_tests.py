@@ -0,0 +1,79 @@
+"""Tests for the hot-path instrumentation"""
+import os.path
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TRANSFERS_STORE_FILE,
+                        AccountManager)
+from uc3m_money.metrics.metrics_registry import METRICS
+from uc3m_money.metrics.metrics_sinks import MemorySink, PrometheusFileSink
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+PROMETHEUS_FILE = JSON_FILES_PATH + "metrics_test.prom"
+
+
+class TestMetrics(TestCase):
+    """Metrics registry tests class"""
+    def setUp(self):
+        """ inicializo el entorno de prueba """
+        if os.path.exists(TRANSFERS_STORE_FILE):
+            remove(TRANSFERS_STORE_FILE)
+        AccountManager().use_transfers_store(TransfersJsonStore())
+        METRICS.reset()
+
+    def tearDown(self):
+        """ leaves the registry disabled for the other tests """
+        METRICS.disable()
+        METRICS.reset()
+        if os.path.exists(PROMETHEUS_FILE):
+            remove(PROMETHEUS_FILE)
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_transfer_request_traced(self):
+        """every phase of transfer_request is reported as a span"""
+        sink = MemorySink()
+        METRICS.enable([sink], tracing=True)
+        mngr = AccountManager()
+        mngr.transfer_request(from_iban="ES6211110783482828975098",
+                              to_iban="ES8658342044541216872704",
+                              transfer_type="ORDINARY",
+                              amount=10.0,
+                              date="22/03/2025",
+                              concept="Testing traced transfers")
+        self.assertEqual(1, len(sink.traces))
+        span_names = [span["name"] for span in sink.traces[0]["spans"]]
+        self.assertEqual(["transfer_request.validation",
+                          "transfers_store.md5",
+                          "json_store.load",
+                          "json_store.save"], span_names)
+        # a new transfer is rejected by the bloom filter without scanning the store
+        self.assertEqual(1, METRICS.counter("bloom_fast_rejects"))
+        self.assertGreater(METRICS.counter("bytes_written"), 0)
+        snapshot = METRICS.flush()
+        self.assertEqual(1, snapshot["histograms"]["json_store.save"]["count"])
+        self.assertEqual([snapshot], sink.snapshots)
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_disabled_registry_collects_nothing(self):
+        """nothing is collected while the registry is disabled"""
+        mngr = AccountManager()
+        mngr.transfer_request(from_iban="ES6211110783482828975098",
+                              to_iban="ES8658342044541216872704",
+                              transfer_type="ORDINARY",
+                              amount=10.0,
+                              date="22/03/2025",
+                              concept="Testing untraced transfers")
+        self.assertEqual({"counters": {}, "histograms": {}}, METRICS.snapshot())
+
+    def test_prometheus_file_sink(self):
+        """the prometheus sink writes counters and cumulative buckets"""
+        METRICS.enable([PrometheusFileSink(PROMETHEUS_FILE)])
+        METRICS.increment("records_scanned", 3)
+        METRICS.observe("json_store.load", 0.002)
+        METRICS.flush()
+        with open(PROMETHEUS_FILE, "r", encoding="utf-8", newline="") as file:
+            content = file.read()
+        self.assertIn("uc3m_money_records_scanned_total 3", content)
+        self.assertIn('uc3m_money_json_store_load_seconds_bucket{le="+Inf"} 1', content)
+        self.assertIn("uc3m_money_json_store_load_seconds_count 1", content)
@@ -0,0 +1,65 @@
+"""Tests for the lazy, single-load imports of the uc3m_money package"""
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+SOURCE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                           "..", "..", "main", "python"))
+# modules of the submodules that make a cold import slow
+HEAVY_MODULES = ("json", "datetime", "hashlib", "gzip", "threading", "concurrent.futures",
+                 "multiprocessing", "uc3m_money.account_manager", "uc3m_money.store.json_store")
+
+
+def run_cold(code):
+    """runs code in a fresh interpreter and returns the JSON it prints"""
+    env = dict(os.environ, PYTHONPATH=SOURCE_PATH)
+    output = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+class TestPackageImport(TestCase):
+    """Package import tests class"""
+
+    def test_cold_import_loads_no_submodule(self):
+        """importing the package loads none of its submodules nor their heavy imports"""
+        result = run_cold(
+            "import sys\n"
+            "import uc3m_money\n"
+            "loaded = sorted(sys.modules)\n"
+            "import json\n"
+            "print(json.dumps({'loaded': loaded}))\n")
+        self.assertEqual(["uc3m_money"], [name for name in result["loaded"]
+                                          if "uc3m_money" in name])
+        self.assertEqual([], [name for name in HEAVY_MODULES if name in result["loaded"]])
+
+    def test_single_load(self):
+        """every module is loaded once, so there is one exception class"""
+        result = run_cold(
+            "import json, sys\n"
+            "from uc3m_money import AccountManager, AccountManagementException\n"
+            "from uc3m_money.account_management_exception import "
+            "AccountManagementException as Canonical\n"
+            "try:\n"
+            "    AccountManager().validate_iban('ES00')\n"
+            "    caught = False\n"
+            "except Canonical:\n"
+            "    caught = True\n"
+            "print(json.dumps({'caught': caught,"
+            "'same': AccountManagementException is Canonical,"
+            "'duplicated': sorted(name for name in sys.modules"
+            " if name.startswith('src.'))}))\n")
+        self.assertTrue(result["caught"])
+        self.assertTrue(result["same"])
+        self.assertEqual([], result["duplicated"])
+
+    def test_lazy_attributes(self):
+        """public names resolve on access and unknown names still fail"""
+        import uc3m_money  # pylint: disable=import-outside-toplevel
+        self.assertIn("AccountManager", dir(uc3m_money))
+        self.assertEqual("transfers_store.json",
+                         os.path.basename(uc3m_money.TRANSFERS_STORE_FILE))
+        with self.assertRaises(AttributeError):
+            getattr(uc3m_money, "NotAName")
@@ -0,0 +1,110 @@
+"""Tests for the parallel sharded balance computation"""
+import json
+import math
+import os.path
+import random
+from os import remove
+from unittest import TestCase
+from uc3m_money import (JSON_FILES_PATH,
+                        BALANCES_STORE_FILE,
+                        AccountManager,
+                        AccountManagementException)
+from uc3m_money.store.transactions_shard_scanner import TransactionsShardScanner
+
+LEDGER_FILE = JSON_FILES_PATH + "transactions_parallel_test.json"
+IBANS = ["ES8658342044541216872704", "ES3559005439021242088295",
+         "ES6211110783482828975098", "ES7156958200176924034556"]
+
+
+def serial_balances(file_name):
+    """reference balances: the math.fsum of the amounts of every iban"""
+    with open(file_name, "r", encoding="utf-8", newline="") as file:
+        transactions = json.load(file)
+    amounts = {}
+    for transaction in transactions:
+        amounts.setdefault(transaction["IBAN"], []).append(float(transaction["amount"]))
+    return {iban: math.fsum(iban_amounts) for iban, iban_amounts in amounts.items()}
+
+
+class TestParallelBalance(TestCase):
+    """Parallel balance tests class"""
+
+    def setUp(self):
+        """writes a ledger large enough to be split into several shards"""
+        generator = random.Random(34)
+        transactions = [{"IBAN": generator.choice(IBANS),
+                         "amount": f"{generator.choice('+-')}{generator.uniform(0, 5000):.2f}"}
+                        for _ in range(3000)]
+        with open(LEDGER_FILE, "w", encoding="utf-8", newline="") as file:
+            json.dump(transactions, file, indent=4)
+
+    def tearDown(self):
+        """removes the generated files and restores the serial mode"""
+        AccountManager().use_balance_workers(None)
+        for file_name in (LEDGER_FILE, BALANCES_STORE_FILE):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def test_shards_aligned_to_records(self):
+        """every shard but the last ends right after a record"""
+        scanner = TransactionsShardScanner(LEDGER_FILE, workers=4, min_shard_bytes=1024)
+        ranges = scanner.shard_ranges()
+        self.assertEqual(4, len(ranges))
+        self.assertEqual(0, ranges[0][0])
+        self.assertEqual(os.path.getsize(LEDGER_FILE), ranges[-1][1])
+        with open(LEDGER_FILE, "rb") as file:
+            content = file.read()
+        for start, end in ranges[:-1]:
+            self.assertEqual(b"}", content[end - 1:end])
+            self.assertLess(start, end)
+
+    def test_matches_serial_exactly(self):
+        """all-iban and single-iban balances are identical to the serial ones"""
+        expected = serial_balances(LEDGER_FILE)
+        scanner = TransactionsShardScanner(LEDGER_FILE, workers=3, min_shard_bytes=1024)
+        records, balances = scanner.balances()
+        self.assertEqual(3000, records)
+        self.assertEqual(expected, balances)
+        _, single = scanner.balances({IBANS[1]})
+        self.assertEqual({IBANS[1]: expected[IBANS[1]]}, single)
+        self.assertEqual(expected, AccountManager().transaction_balances(None, LEDGER_FILE))
+
+    def test_record_end_inside_strings(self):
+        """a "}," inside a string value does not split a record"""
+        transactions = [{"IBAN": IBANS[number % 2], "amount": f"+{number}.10",
+                         "concept": "a}, {\"IBAN\": \"ES0\"}, b" * 20}
+                        for number in range(200)]
+        with open(LEDGER_FILE, "w", encoding="utf-8", newline="") as file:
+            json.dump(transactions, file)
+        scanner = TransactionsShardScanner(LEDGER_FILE, workers=4, min_shard_bytes=1024)
+        self.assertEqual((200, serial_balances(LEDGER_FILE)), scanner.balances())
+
+    def test_manager_parallel_mode(self):
+        """the manager writes the same balance in parallel mode"""
+        manager = AccountManager()
+        serial = manager.calculate_balances(["ES3559005439021242088295"])
+        manager.use_balance_workers(2)
+        parallel = manager.calculate_balances(["ES3559005439021242088295",
+                                               "ES1559005439021242088295",
+                                               "ES2914650000000000000000"])
+        self.assertEqual(serial[0]["BALANCE"], parallel[0]["BALANCE"])
+        self.assertEqual("Invalid IBAN control digit", parallel[1].message)
+        self.assertTrue(manager.calculate_balance("ES3559005439021242088295"))
+
+    def test_wrong_json(self):
+        """malformed ledgers raise the same errors as the serial path"""
+        for content in ("Hello World!", "[{\"IBAN\": \"ES1\", \"amount\": \"+1\"}",
+                        "[{\"IBAN\": \"ES1\", \"amount\": \"+1\"} {}]"):
+            with open(LEDGER_FILE, "w", encoding="utf-8", newline="") as file:
+                file.write(content)
+            with self.assertRaises(AccountManagementException) as c_m:
+                TransactionsShardScanner(LEDGER_FILE, workers=2, min_shard_bytes=1).balances()
+            self.assertEqual("JSON Decode Error - Wrong JSON Format", c_m.exception.message)
+        with open(LEDGER_FILE, "w", encoding="utf-8", newline="") as file:
+            file.write("[]\n")
+        self.assertEqual((0, {}), TransactionsShardScanner(LEDGER_FILE, workers=2,
+                                                           min_shard_bytes=1).balances())
+        remove(LEDGER_FILE)
+        with self.assertRaises(AccountManagementException) as c_m:
+            TransactionsShardScanner(LEDGER_FILE, workers=2).balances()
+        self.assertEqual("Wrong file  or file path", c_m.exception.message)
@@ -0,0 +1,87 @@
+"""Tests for the process-wide cache of parsed store files"""
+import json
+import os
+import time
+from unittest import TestCase
+from uc3m_money import JSON_FILES_PATH
+from uc3m_money.store.parsed_file_cache import ParsedFileCache, PARSED_FILES
+from uc3m_money.store.transaction_json_store import TransactionJsonStore
+
+TEST_FILES = [JSON_FILES_PATH + f"parsed_cache_test_{number}.json" for number in range(3)]
+
+
+def write_file(file_name, content, age_seconds=60):
+    """writes a JSON file last modified age_seconds ago"""
+    with open(file_name, "w", encoding="utf-8", newline="") as file:
+        json.dump(content, file)
+    past = time.time_ns() - age_seconds * 1_000_000_000
+    os.utime(file_name, ns=(past, past))
+
+
+class TestParsedFileCache(TestCase):
+    """Parsed file cache tests class"""
+
+    def setUp(self):
+        """writes three files of the same size"""
+        for number, file_name in enumerate(TEST_FILES):
+            write_file(file_name, [{"IBAN": f"ES{number}", "amount": 1}])
+
+    def tearDown(self):
+        """removes the test files"""
+        for file_name in TEST_FILES:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+    def test_unchanged_file_parsed_once(self):
+        """a file is parsed again only when its signature changes"""
+        cache = ParsedFileCache()
+        first = cache.load(TEST_FILES[0])
+        first.append({"IBAN": "added by the caller"})
+        with self.assertRaises(TypeError):
+            first[0]["amount"] = 5
+        record = dict(first[0])
+        record["amount"] = 5
+        self.assertEqual([{"IBAN": "ES0", "amount": 1}], cache.load(TEST_FILES[0]))
+        write_file(TEST_FILES[0], [{"IBAN": "ES9", "amount": 2}], age_seconds=30)
+        self.assertEqual([{"IBAN": "ES9", "amount": 2}], cache.load(TEST_FILES[0]))
+        stats = cache.stats()
+        self.assertEqual((1, 2), (stats["hits"], stats["misses"]))
+        self.assertAlmostEqual(1 / 3, stats["hit_rate"])
+
+    def test_least_recently_used_evicted(self):
+        """the estimated memory of the contents cached is bounded"""
+        cache = ParsedFileCache()
+        cache.load(TEST_FILES[0])
+        size = cache.stats()["bytes"]
+        self.assertGreater(size, os.path.getsize(TEST_FILES[0]))
+        cache = ParsedFileCache(max_bytes=2 * size)
+        cache.load(TEST_FILES[0])
+        cache.load(TEST_FILES[1])
+        cache.load(TEST_FILES[0])
+        cache.load(TEST_FILES[2])
+        stats = cache.stats()
+        self.assertEqual((1, 2, 2 * size), (stats["evictions"], stats["entries"],
+                                            stats["bytes"]))
+        cache.load(TEST_FILES[0])
+        cache.load(TEST_FILES[1])
+        self.assertEqual((2, 4), (cache.stats()["hits"], cache.stats()["misses"]))
+
+    def test_recently_modified_not_cached(self):
+        """a file written within the mtime granularity is read every time"""
+        cache = ParsedFileCache()
+        write_file(TEST_FILES[0], [], age_seconds=0)
+        cache.load(TEST_FILES[0])
+        cache.load(TEST_FILES[0])
+        self.assertEqual((0, 2, 0), (cache.stats()["hits"], cache.stats()["misses"],
+                                     cache.stats()["entries"]))
+        with self.assertRaises(FileNotFoundError):
+            cache.load(JSON_FILES_PATH + "parsed_cache_test_missing.json")
+
+    def test_readers_share_the_cache(self):
+        """the transactions file is parsed once for every store reader"""
+        PARSED_FILES.clear()
+        store = TransactionJsonStore()
+        matches = store.find_all("IBAN", "ES3559005439021242088295")
+        self.assertEqual(matches, store.find_all("IBAN", "ES3559005439021242088295"))
+        stats = PARSED_FILES.stats()
+        self.assertEqual((2, 1), (stats["hits"], stats["misses"]))
@@ -0,0 +1,139 @@
+"""Tests for the transfers store partitioned by month"""
+import json
+import os.path
+import shutil
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TRANSFERS_STORE_FILE,
+                        TRANSACTIONS_STORE_FILE,
+                        AccountManager,
+                        AccountManagementException)
+from uc3m_money.account_management_config import POSTING_CHECKPOINT_FILE
+from uc3m_money.store.partitioned_transfers_json_store import (PartitionedTransfersJsonStore,
+                                                                PARTITION_BY_BANK)
+from uc3m_money.store.store_backend import MemoryBackend
+
+PARTITIONS_PATH = JSON_FILES_PATH + "transfers_partitions_test/"
+SAVED_LEDGER_FILE = JSON_FILES_PATH + "transactions_partitions_saved.json"
+
+
+class TestPartitionedTransfersStore(TestCase):
+    """Partitioned transfers store tests class"""
+    def setUp(self):
+        """ inicializo el entorno de prueba """
+        if os.path.exists(PARTITIONS_PATH):
+            shutil.rmtree(PARTITIONS_PATH)
+        if os.path.exists(TRANSFERS_STORE_FILE):
+            remove(TRANSFERS_STORE_FILE)
+
+    def tearDown(self):
+        """ restores the default transfers store """
+        AccountManager().use_transfers_store(None)
+        if os.path.exists(PARTITIONS_PATH):
+            shutil.rmtree(PARTITIONS_PATH)
+
+    @staticmethod
+    def request(mngr, date, amount=10.0):
+        """sends a valid transfer for the given date"""
+        return mngr.transfer_request(from_iban="ES6211110783482828975098",
+                                     to_iban="ES8658342044541216872704",
+                                     transfer_type="ORDINARY",
+                                     amount=amount,
+                                     date=date,
+                                     concept="Testing partitioned transfers")
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_transfers_stored_by_month(self):
+        """each transfer is written to the partition of its month"""
+        store = PartitionedTransfersJsonStore(PARTITIONS_PATH)
+        mngr = AccountManager()
+        mngr.use_transfers_store(store)
+        self.request(mngr, "22/03/2025")
+        self.request(mngr, "01/04/2025")
+        self.request(mngr, "02/04/2025")
+        self.assertEqual(["2025_03", "2025_04"], store.partition_keys())
+        self.assertFalse(os.path.exists(TRANSFERS_STORE_FILE))
+        with self.assertRaises(AccountManagementException) as c_m:
+            self.request(mngr, "01/04/2025")
+        self.assertEqual("Duplicated transfer in transfer list", c_m.exception.message)
+        in_april = store.find_range("01/04/2025", "01/04/2025")
+        self.assertEqual(["01/04/2025"], [item["transfer_date"] for item in in_april])
+        store.load_list_from_file()
+        self.assertEqual(3, len(store.data_list))
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_split_store(self):
+        """an existing transfers file is split into bank partitions"""
+        mngr = AccountManager()
+        self.request(mngr, "22/03/2025")
+        self.request(mngr, "22/04/2025")
+        store = PartitionedTransfersJsonStore(PARTITIONS_PATH, PARTITION_BY_BANK)
+        self.assertEqual({"1111": 2}, store.split_store(TRANSFERS_STORE_FILE))
+        with open(store.partition_file("1111"), "r", encoding="utf-8", newline="") as file:
+            self.assertEqual(2, len(json.load(file)))
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_split_merges_partitions(self):
+        """a split keeps the transfers of the partition and is not applied twice"""
+        store = PartitionedTransfersJsonStore(PARTITIONS_PATH)
+        mngr = AccountManager()
+        mngr.use_transfers_store(store)
+        self.request(mngr, "22/03/2025", 20.0)
+        mngr.use_transfers_store(None)
+        self.request(mngr, "22/03/2025")
+        self.request(mngr, "22/04/2025")
+        self.assertEqual({"2025_03": 1, "2025_04": 1}, store.split_store(TRANSFERS_STORE_FILE))
+        self.assertEqual({"2025_03": 0, "2025_04": 0}, store.split_store(TRANSFERS_STORE_FILE))
+        self.assertIs(store.partition_store("2025_03"), store.partition_store("2025_03"))
+        self.assertEqual([20.0, 10.0], [transfer["transfer_amount"] for transfer in
+                                        store.find_range("01/03/2025", "31/03/2025")])
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_split_in_memory(self):
+        """a split on a memory backend leaves the disk untouched"""
+        mngr = AccountManager()
+        mngr.use_store_backend(MemoryBackend())
+        try:
+            self.request(mngr, "22/03/2025")
+            store = PartitionedTransfersJsonStore(PARTITIONS_PATH)
+            self.assertEqual({"2025_03": 1}, store.split_store(TRANSFERS_STORE_FILE))
+            self.assertEqual(["2025_03"], store.partition_keys())
+            self.assertFalse(os.path.exists(PARTITIONS_PATH))
+        finally:
+            mngr.use_store_backend(None)
+
+    def keep_default_ledger(self):
+        """restores the default ledger and drops the default checkpoint after the test"""
+        shutil.copyfile(TRANSACTIONS_STORE_FILE, SAVED_LEDGER_FILE)
+        self.addCleanup(os.replace, SAVED_LEDGER_FILE, TRANSACTIONS_STORE_FILE)
+        for file_name in (POSTING_CHECKPOINT_FILE,
+                          os.path.splitext(POSTING_CHECKPOINT_FILE)[0] + "_scheduled.json"):
+            self.addCleanup(lambda name=file_name: os.path.exists(name) and remove(name))
+
+    def test_partitioned_transfers_posted_and_queried(self):
+        """transfers kept in partitions are posted once and queried in time order"""
+        self.keep_default_ledger()
+        store = PartitionedTransfersJsonStore(PARTITIONS_PATH)
+        mngr = AccountManager()
+        mngr.use_transfers_store(store)
+        with freeze_time("2025/03/22 13:00:00"):
+            for date, amount in (("22/03/2025", 10.0), ("01/04/2025", 20.0),
+                                 ("02/04/2025", 30.0)):
+                self.request(mngr, date, amount)
+        with open(TRANSACTIONS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
+            rows_before = len(json.load(file))
+        with freeze_time("2025/04/05 10:00:00"):
+            self.assertEqual(3, mngr.post_transactions()["transfers"])
+            self.assertEqual(0, mngr.post_transactions()["transfers"])
+        with open(TRANSACTIONS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
+            rows = json.load(file)[rows_before:]
+        self.assertEqual(["-10.00", "+10.00", "-20.00", "+20.00", "-30.00", "+30.00"],
+                         [row["amount"] for row in rows[:6]])
+        first_page = store.query(iban="ES8658342044541216872704", limit=2)
+        self.assertEqual([10.0, 20.0], [item["transfer_amount"] for item in first_page["items"]])
+        last_page = store.query(iban="ES8658342044541216872704",
+                                cursor=first_page["next_cursor"], limit=2)
+        self.assertEqual([30.0], [item["transfer_amount"] for item in last_page["items"]])
+        self.assertIsNone(last_page["next_cursor"])
@@ -0,0 +1,143 @@
+"""Tests for the incremental posting of transfers and deposits"""
+import json
+import os.path
+import shutil
+from datetime import datetime, timezone
+from os import remove
+from unittest import TestCase
+from unittest.mock import patch
+from freezegun import freeze_time
+from uc3m_money import (AccountManager,
+                        JSON_FILES_PATH,
+                        TRANSACTIONS_STORE_FILE,
+                        TransferRequest,
+                        AccountDeposit)
+from uc3m_money.posting_engine import PostingEngine
+from uc3m_money.store.deposit_json_store import DepositJsonStore
+from uc3m_money.store.transaction_json_store import TransactionJsonStore
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+LEDGER_FILE = JSON_FILES_PATH + "transactions_posting_test.json"
+TRANSFERS_FILE = JSON_FILES_PATH + "transfers_posting_test.json"
+DEPOSITS_FILE = JSON_FILES_PATH + "deposits_posting_test.json"
+CHECKPOINT_FILE = JSON_FILES_PATH + "posting_checkpoint_test.json"
+SCHEDULED_FILE = JSON_FILES_PATH + "posting_checkpoint_test_scheduled.json"
+FROM_IBAN = "ES8658342044541216872704"
+TO_IBAN = "ES3559005439021242088295"
+
+
+def read_list(file_name):
+    """returns the list saved in a store file"""
+    with open(file_name, "r", encoding="utf-8", newline="") as file:
+        return json.load(file)
+
+
+def new_transfer(concept, amount):
+    """a valid transfer request"""
+    return TransferRequest(from_iban=FROM_IBAN, to_iban=TO_IBAN, transfer_concept=concept,
+                           transfer_type="ORDINARY", transfer_date="26/03/2025",
+                           transfer_amount=amount)
+
+
+@freeze_time("2025/03/26 14:00:00")
+class TestPostingEngine(TestCase):
+    """Posting engine tests class"""
+
+    def setUp(self):
+        """copies the ledger and starts with empty sources"""
+        shutil.copyfile(TRANSACTIONS_STORE_FILE, LEDGER_FILE)
+        self.remove_sources()
+        self.ledger_rows = len(read_list(LEDGER_FILE))
+
+    def tearDown(self):
+        """removes the generated files"""
+        self.remove_sources()
+        if os.path.exists(LEDGER_FILE):
+            remove(LEDGER_FILE)
+
+    @staticmethod
+    def remove_sources():
+        """removes the sources, their Bloom filter, the checkpoint and the
+        scheduled transfers"""
+        for file_name in (TRANSFERS_FILE, DEPOSITS_FILE, CHECKPOINT_FILE, SCHEDULED_FILE,
+                          os.path.splitext(TRANSFERS_FILE)[0] + ".bloom"):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def engine(self):
+        """a posting engine over the test files"""
+        return PostingEngine(TRANSFERS_FILE, DEPOSITS_FILE, LEDGER_FILE, CHECKPOINT_FILE)
+
+    def test_posts_only_new_records(self):
+        """each record is posted once, debit and credit for transfers"""
+        TransfersJsonStore(TRANSFERS_FILE).add_items([new_transfer("Rent of March", 500.5),
+                                                      new_transfer("Rent of April", 20.0)])
+        DepositJsonStore(DEPOSITS_FILE).add_item(AccountDeposit(TO_IBAN, 1234.56))
+        self.assertEqual({"transfers": 2, "deposits": 1, "scheduled": 0, "rows": 5}, self.engine().run_once())
+        rows = read_list(LEDGER_FILE)[self.ledger_rows:]
+        posted_at = datetime(2025, 3, 26, 14, tzinfo=timezone.utc).timestamp()
+        self.assertEqual([{"IBAN": FROM_IBAN, "amount": "-500.50", "time": posted_at},
+                          {"IBAN": TO_IBAN, "amount": "+500.50", "time": posted_at},
+                          {"IBAN": FROM_IBAN, "amount": "-20.00", "time": posted_at},
+                          {"IBAN": TO_IBAN, "amount": "+20.00", "time": posted_at},
+                          {"IBAN": TO_IBAN, "amount": "+1234.56", "time": posted_at}], rows)
+
+        self.assertEqual({"transfers": 0, "deposits": 0, "scheduled": 0, "rows": 0},
+                         self.engine().run_once())
+        TransfersJsonStore(TRANSFERS_FILE).add_item(new_transfer("Rent of May", 30.0))
+        self.assertEqual({"transfers": 1, "deposits": 0, "scheduled": 0, "rows": 2},
+                         self.engine().run_once())
+        self.assertEqual(self.ledger_rows + 7, len(read_list(LEDGER_FILE)))
+
+    def test_rewritten_source_not_posted_twice(self):
+        """a source rewritten with another layout resumes from the record count"""
+        TransfersJsonStore(TRANSFERS_FILE).add_item(new_transfer("Rent of March", 500.5))
+        self.engine().run_once()
+        transfers = read_list(TRANSFERS_FILE)
+        with open(TRANSFERS_FILE, "w", encoding="utf-8", newline="") as file:
+            json.dump(transfers, file, indent=4)
+        self.assertEqual(0, self.engine().run_once()["rows"])
+
+    def test_restart_after_ledger_write(self):
+        """a run stopped after writing the ledger is not posted again"""
+        DepositJsonStore(DEPOSITS_FILE).add_item(AccountDeposit(TO_IBAN, 1234.56))
+        original_save = PostingEngine.save_checkpoint
+        calls = []
+
+        def crash_after_pending(engine):
+            calls.append(engine)
+            if len(calls) == 2:
+                raise RuntimeError("stopped")
+            original_save(engine)
+
+        with patch.object(PostingEngine, "save_checkpoint", crash_after_pending):
+            with self.assertRaises(RuntimeError):
+                self.engine().run_once()
+        self.assertEqual(self.ledger_rows + 1, len(read_list(LEDGER_FILE)))
+        self.assertEqual(0, self.engine().run_once()["rows"])
+        self.assertEqual(self.ledger_rows + 1, len(read_list(LEDGER_FILE)))
+
+    def test_restart_before_ledger_write(self):
+        """a run stopped before writing the ledger posts its rows on restart"""
+        DepositJsonStore(DEPOSITS_FILE).add_item(AccountDeposit(TO_IBAN, 1234.56))
+        with patch.object(TransactionJsonStore, "save_list_to_file",
+                          side_effect=RuntimeError("stopped")):
+            with self.assertRaises(RuntimeError):
+                self.engine().run_once()
+        self.assertEqual(self.ledger_rows, len(read_list(LEDGER_FILE)))
+        self.assertEqual(1, self.engine().run_once()["rows"])
+        self.assertEqual(self.ledger_rows + 1, len(read_list(LEDGER_FILE)))
+
+    def test_string_amount_posted(self):
+        """a transfer requested with a string amount is posted and later runs go on"""
+        AccountManager().use_transfers_store(TransfersJsonStore(TRANSFERS_FILE))
+        try:
+            AccountManager().transfer_request(FROM_IBAN, TO_IBAN, "Rent of March",
+                                              "ORDINARY", "26/03/2025", "250.75")
+        finally:
+            AccountManager().use_transfers_store(None)
+        self.assertEqual(2, self.engine().run_once()["rows"])
+        self.assertEqual(["-250.75", "+250.75"],
+                         [row["amount"] for row in read_list(LEDGER_FILE)[self.ledger_rows:]])
+        DepositJsonStore(DEPOSITS_FILE).add_item(AccountDeposit(TO_IBAN, 10.0))
+        self.assertEqual(1, self.engine().run_once()["rows"])
@@ -0,0 +1,108 @@
+"""Tests for the posting of future-dated transfers when they come due"""
+import json
+import os.path
+import shutil
+from os import remove
+from unittest import TestCase
+from unittest.mock import patch
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TRANSACTIONS_STORE_FILE,
+                        TransferRequest)
+from uc3m_money.posting_engine import PostingEngine
+from uc3m_money.store.scheduled_transfers_index import ScheduledTransfersIndex
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+LEDGER_FILE = JSON_FILES_PATH + "transactions_scheduled_test.json"
+TRANSFERS_FILE = JSON_FILES_PATH + "transfers_scheduled_test.json"
+CHECKPOINT_FILE = JSON_FILES_PATH + "posting_checkpoint_scheduled_test.json"
+SCHEDULED_FILE = JSON_FILES_PATH + "posting_checkpoint_scheduled_test_scheduled.json"
+FROM_IBAN = "ES8658342044541216872704"
+TO_IBAN = "ES3559005439021242088295"
+
+
+def read_list(file_name):
+    """returns the list saved in a store file"""
+    with open(file_name, "r", encoding="utf-8", newline="") as file:
+        return json.load(file)
+
+
+def new_transfer(transfer_date, amount):
+    """a valid transfer request"""
+    return TransferRequest(from_iban=FROM_IBAN, to_iban=TO_IBAN, transfer_concept="Rent payment",
+                           transfer_type="ORDINARY", transfer_date=transfer_date,
+                           transfer_amount=amount)
+
+
+class TestScheduledTransfers(TestCase):
+    """Scheduled transfers tests class"""
+
+    def setUp(self):
+        """copies the ledger and stores transfers due today and later"""
+        self.remove_files()
+        shutil.copyfile(TRANSACTIONS_STORE_FILE, LEDGER_FILE)
+        self.ledger_rows = len(read_list(LEDGER_FILE))
+        with freeze_time("2025/03/26 14:00:00"):
+            TransfersJsonStore(TRANSFERS_FILE).add_items([new_transfer("30/03/2025", 30.0),
+                                                          new_transfer("26/03/2025", 26.0),
+                                                          new_transfer("28/03/2025", 28.0)])
+
+    def tearDown(self):
+        """removes the generated files"""
+        self.remove_files()
+
+    @staticmethod
+    def remove_files():
+        """removes the ledger copy, the transfers, the checkpoint and the index"""
+        for file_name in (LEDGER_FILE, TRANSFERS_FILE, CHECKPOINT_FILE, SCHEDULED_FILE,
+                          os.path.splitext(TRANSFERS_FILE)[0] + ".bloom"):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    @staticmethod
+    def engine():
+        """a posting engine over the test files"""
+        return PostingEngine(TRANSFERS_FILE, JSON_FILES_PATH + "missing_deposits.json",
+                             LEDGER_FILE, CHECKPOINT_FILE)
+
+    def posted_amounts(self):
+        """credited amounts posted to the ledger copy"""
+        return [row["amount"] for row in read_list(LEDGER_FILE)[self.ledger_rows:]
+                if row["IBAN"] == TO_IBAN]
+
+    def test_future_transfers_wait_for_their_date(self):
+        """only the transfers due today are posted, the rest are bucketed"""
+        with freeze_time("2025/03/26 14:00:00"):
+            self.assertEqual({"transfers": 1, "deposits": 0, "scheduled": 2, "rows": 2},
+                             self.engine().run_once())
+        self.assertEqual(["+26.00"], self.posted_amounts())
+        index = ScheduledTransfersIndex(SCHEDULED_FILE).load()
+        self.assertEqual(2, index.pending)
+        self.assertEqual(["2025-03-28"], index.due_days("2025-03-29"))
+        self.assertEqual([28.0], [transfer["transfer_amount"]
+                                  for transfer in index.bucket("2025-03-28")])
+
+    def test_catch_up_after_downtime(self):
+        """every bucket due while no run happened is posted in one batch"""
+        with freeze_time("2025/03/26 14:00:00"):
+            self.engine().run_once()
+        with freeze_time("2025/03/28 09:00:00"):
+            self.assertEqual(2, self.engine().run_once()["rows"])
+        with freeze_time("2025/04/02 09:00:00"):
+            self.assertEqual(2, self.engine().run_once()["rows"])
+            self.assertEqual(0, self.engine().run_once()["rows"])
+        self.assertEqual(["+26.00", "+28.00", "+30.00"], self.posted_amounts())
+        self.assertEqual(0, ScheduledTransfersIndex(SCHEDULED_FILE).load().pending)
+
+    def test_restart_after_ledger_write(self):
+        """a run stopped before updating the index does not post twice"""
+        with freeze_time("2025/03/26 14:00:00"):
+            self.engine().run_once()
+        with freeze_time("2025/04/02 09:00:00"):
+            with patch.object(ScheduledTransfersIndex, "save",
+                              side_effect=RuntimeError("stopped")):
+                with self.assertRaises(RuntimeError):
+                    self.engine().run_once()
+            self.assertEqual(0, self.engine().run_once()["rows"])
+        self.assertEqual(["+26.00", "+28.00", "+30.00"], self.posted_amounts())
+        self.assertEqual(0, ScheduledTransfersIndex(SCHEDULED_FILE).load().pending)
@@ -0,0 +1,98 @@
+"""Tests for the end of day settlement of transfers"""
+import json
+import os.path
+import shutil
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TransferRequest,
+                        AccountManagementException)
+from uc3m_money.settlement_engine import SettlementEngine
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+from uc3m_money.store.partitioned_transfers_json_store import PartitionedTransfersJsonStore
+
+TRANSFERS_FILE = JSON_FILES_PATH + "transfers_settlement_test.json"
+REPORTS_PATH = JSON_FILES_PATH + "settlements_test/"
+PARTITIONS_PATH = JSON_FILES_PATH + "settlement_partitions_test/"
+# banks 5834 and 5900 (IBAN digits 5 to 8)
+IBAN_A = "ES8658342044541216872704"
+IBAN_B = "ES3559005439021242088295"
+IBAN_C = "ES6211110783482828975098"
+
+
+def new_transfer(from_iban, to_iban, amount, transfer_date="27/03/2025"):
+    """a valid transfer request with a concept unique for its amount"""
+    concept = "Settlement test " + "".join(chr(ord("a") + int(digit))
+                                           for digit in f"{amount:.2f}" if digit.isdigit())
+    return TransferRequest(from_iban=from_iban, to_iban=to_iban, transfer_concept=concept,
+                           transfer_type="ORDINARY", transfer_date=transfer_date,
+                           transfer_amount=amount)
+
+
+@freeze_time("2025/03/26 14:00:00")
+class TestSettlementEngine(TestCase):
+    """Settlement engine tests class"""
+
+    def setUp(self):
+        """stores the transfers of two days"""
+        self.remove_files()
+        TransfersJsonStore(TRANSFERS_FILE).add_items([
+            new_transfer(IBAN_A, IBAN_B, 100.10),
+            new_transfer(IBAN_B, IBAN_A, 40.20),
+            new_transfer(IBAN_A, IBAN_B, 10.30),
+            new_transfer(IBAN_C, IBAN_A, 25.00),
+            new_transfer(IBAN_A, IBAN_C, 999.99, "28/03/2025")])
+
+    def tearDown(self):
+        """removes the transfers and the reports"""
+        self.remove_files()
+
+    @staticmethod
+    def remove_files():
+        """removes the test store, its Bloom filter and the reports"""
+        shutil.rmtree(REPORTS_PATH, ignore_errors=True)
+        shutil.rmtree(PARTITIONS_PATH, ignore_errors=True)
+        for file_name in (TRANSFERS_FILE, os.path.splitext(TRANSFERS_FILE)[0] + ".bloom"):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def test_pairs_and_banks_netted(self):
+        """gross and net flows by iban pair and bank, in exact cents"""
+        report = SettlementEngine(TRANSFERS_FILE, REPORTS_PATH).run("27/03/2025")
+        self.assertEqual(4, report["transfers"])
+        self.assertEqual(175.6, report["gross"])
+        self.assertEqual([{"a": IBAN_B, "b": IBAN_A, "a_to_b": 40.2, "b_to_a": 110.4,
+                           "net": -70.2},
+                          {"a": IBAN_C, "b": IBAN_A, "a_to_b": 25.0, "b_to_a": 0.0, "net": 25.0}],
+                         report["iban_pairs"])
+        self.assertEqual({"1111": -25.0, "5834": -45.2, "5900": 70.2},
+                         {bank["party"]: bank["net"] for bank in report["banks"]})
+        self.assertEqual([{"a": "1111", "b": "5834", "a_to_b": 25.0, "b_to_a": 0.0,
+                           "net": 25.0},
+                          {"a": "5834", "b": "5900", "a_to_b": 110.4, "b_to_a": 40.2,
+                           "net": 70.2}], report["bank_pairs"])
+        self.assertEqual(0.0, round(sum(iban["net"] for iban in report["ibans"]), 2))
+        with open(REPORTS_PATH + "settlement_20250327.json", "r", encoding="utf-8",
+                  newline="") as file:
+            self.assertEqual(report, json.load(file))
+
+    def test_day_without_transfers_and_bad_date(self):
+        """a day without transfers settles to zero; a bad date is an error"""
+        report = SettlementEngine(TRANSFERS_FILE, REPORTS_PATH).run("29/03/2025")
+        self.assertEqual((0, 0.0, []), (report["transfers"], report["gross"], report["banks"]))
+        with self.assertRaises(AccountManagementException) as c_m:
+            SettlementEngine(TRANSFERS_FILE, REPORTS_PATH).run("2025-03-27")
+        self.assertEqual("Invalid date format", c_m.exception.message)
+
+    def test_partitioned_store_settled(self):
+        """a partitioned store settles the transfers of its month partition"""
+        partitioned = PartitionedTransfersJsonStore(PARTITIONS_PATH)
+        partitioned.add_items([new_transfer(IBAN_A, IBAN_B, 100.10),
+                               new_transfer(IBAN_B, IBAN_A, 40.20),
+                               new_transfer(IBAN_A, IBAN_C, 999.99, "27/04/2025")])
+        report = SettlementEngine(reports_path=REPORTS_PATH,
+                                  transfers_store=partitioned).run("27/03/2025")
+        self.assertEqual((2, 140.3), (report["transfers"], report["gross"]))
+        self.assertEqual([{"a": IBAN_B, "b": IBAN_A, "a_to_b": 40.2, "b_to_a": 100.1,
+                           "net": -59.9}], report["iban_pairs"])
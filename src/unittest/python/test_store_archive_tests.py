@@ -0,0 +1,151 @@
+"""Tests for the rotation and archival of the store files"""
+import gzip
+import json
+import os.path
+import shutil
+from functools import partial
+from os import remove
+from unittest import TestCase
+from unittest.mock import patch
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TRANSACTIONS_STORE_FILE,
+                        TransferRequest,
+                        AccountManagementException)
+from uc3m_money.posting_engine import PostingEngine
+from uc3m_money.store.store_archive import StoreArchive
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+ARCHIVE_PATH = JSON_FILES_PATH + "archive_test/"
+STORE_FILE = JSON_FILES_PATH + "archive_store_test.json"
+TRANSFERS_FILE = JSON_FILES_PATH + "transfers_archive_test.json"
+LEDGER_FILE = JSON_FILES_PATH + "transactions_archive_test.json"
+CHECKPOINT_FILE = JSON_FILES_PATH + "posting_checkpoint_archive_test.json"
+FROM_IBAN = "ES8658342044541216872704"
+TO_IBAN = "ES3559005439021242088295"
+
+
+def write_list(file_name, records):
+    """saves a list of records as a store file"""
+    with open(file_name, "w", encoding="utf-8", newline="") as file:
+        json.dump(records, file, indent=2)
+
+
+def read_list(file_name):
+    """returns the list saved in a store file"""
+    with open(file_name, "r", encoding="utf-8", newline="") as file:
+        return json.load(file)
+
+
+def new_transfer(concept, transfer_date):
+    """a valid transfer request"""
+    return TransferRequest(from_iban=FROM_IBAN, to_iban=TO_IBAN, transfer_concept=concept,
+                           transfer_type="ORDINARY", transfer_date=transfer_date,
+                           transfer_amount=100.0)
+
+
+class TestStoreArchive(TestCase):
+    """Store archive tests class"""
+
+    def setUp(self):
+        """starts without archive nor test stores"""
+        self.tearDown()
+
+    def tearDown(self):
+        """removes the archive and the test stores"""
+        shutil.rmtree(ARCHIVE_PATH, ignore_errors=True)
+        for file_name in (STORE_FILE, TRANSFERS_FILE, LEDGER_FILE, CHECKPOINT_FILE,
+                          os.path.splitext(CHECKPOINT_FILE)[0] + "_scheduled.json",
+                          os.path.splitext(TRANSFERS_FILE)[0] + ".bloom"):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def test_rotation_by_size(self):
+        """a file over max_bytes is sealed into a gzip segment with its time range"""
+        records = [{"IBAN": FROM_IBAN, "time": 100.0 + number} for number in range(50)]
+        write_list(STORE_FILE, records)
+        archive = StoreArchive(STORE_FILE, archive_path=ARCHIVE_PATH, max_bytes=10 ** 6)
+        self.assertIsNone(archive.rotate_if_due())
+        archive = StoreArchive(STORE_FILE, archive_path=ARCHIVE_PATH, max_bytes=100)
+        segment = archive.rotate_if_due()
+        self.assertEqual({"file": "archive_store_test.000000.ndjson.gz", "start": 100.0,
+                          "end": 149.0, "records": 50, "sealed": True}, segment)
+        self.assertEqual([], read_list(STORE_FILE))
+        with gzip.open(ARCHIVE_PATH + segment["file"], "rt", encoding="utf-8") as file:
+            self.assertEqual(records, [json.loads(line) for line in file])
+        self.assertEqual([segment], archive.load_index())
+        self.assertEqual(50, archive.archived_records())
+
+    def test_rotation_by_period(self):
+        """a file whose oldest record is older than period_seconds is rotated"""
+        write_list(STORE_FILE, [{"time": 1742997600.0}])
+        archive = StoreArchive(STORE_FILE, archive_path=ARCHIVE_PATH, period_seconds=3600)
+        with freeze_time("2025/03/26 14:30:00"):
+            self.assertFalse(archive.rotation_due())
+        with freeze_time("2025/03/26 15:00:00"):
+            self.assertTrue(archive.rotation_due())
+
+    def test_iter_records_reads_overlapping_segments(self):
+        """a range query opens only the segments overlapping it, then the active file"""
+        archive = StoreArchive(STORE_FILE, archive_path=ARCHIVE_PATH)
+        for first in (0, 10, 20):
+            write_list(STORE_FILE, [{"time": float(first + number)} for number in range(10)])
+            archive.rotate()
+        write_list(STORE_FILE, [{"time": 30.0}])
+        self.assertEqual(31, len(list(archive.iter_records())))
+        with patch("gzip.open", wraps=gzip.open) as opened:
+            found = [record["time"] for record in archive.iter_records(12.0, 30.0)]
+        self.assertEqual([float(moment) for moment in range(12, 31)], found)
+        self.assertEqual(2, opened.call_count)
+
+    def test_interrupted_rotation_completed(self):
+        """a segment written before the active file was emptied is not duplicated"""
+        write_list(STORE_FILE, [{"time": 1.0}, {"time": 2.0}])
+        archive = StoreArchive(STORE_FILE, archive_path=ARCHIVE_PATH)
+        with patch.object(StoreArchive, "_save_active", side_effect=RuntimeError("stopped")):
+            with self.assertRaises(RuntimeError):
+                archive.rotate()
+        self.assertEqual(0, archive.archived_records())
+        self.assertIsNone(archive.rotate())
+        self.assertEqual([], read_list(STORE_FILE))
+        self.assertEqual([{"time": 1.0}, {"time": 2.0}], list(archive.iter_records()))
+
+    def test_find_range_and_posting_after_rotation(self):
+        """archived transfers are still found and never posted twice"""
+        store = TransfersJsonStore(TRANSFERS_FILE)
+        shutil.copyfile(TRANSACTIONS_STORE_FILE, LEDGER_FILE)
+        rows_before = len(read_list(LEDGER_FILE))
+        engine = PostingEngine(TRANSFERS_FILE, JSON_FILES_PATH + "missing_deposits.json",
+                               LEDGER_FILE, CHECKPOINT_FILE)
+        with freeze_time("2025/03/28 14:00:00"):
+            store.add_item(new_transfer("Rent of March", "27/03/2025"))
+            self.assertEqual(2, engine.run_once()["rows"])
+            store.add_item(new_transfer("Rent of April", "28/03/2025"))
+        test_archive = partial(StoreArchive, archive_path=ARCHIVE_PATH)
+        with patch("uc3m_money.store.json_store.StoreArchive", test_archive), \
+                patch("uc3m_money.posting_engine.StoreArchive", test_archive):
+            store.archive().rotate()
+            self.assertEqual([], read_list(TRANSFERS_FILE))
+            found = store.find_range("27/03/2025", "28/03/2025")
+            self.assertEqual(["Rent of March", "Rent of April"],
+                             [transfer["transfer_concept"] for transfer in found])
+            self.assertEqual(2, engine.run_once()["rows"])
+            self.assertEqual(0, engine.run_once()["rows"])
+        self.assertEqual(rows_before + 4, len(read_list(LEDGER_FILE)))
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_archived_transfer_duplicated(self):
+        """a transfer equal to an archived one is rejected, with or without Bloom filter"""
+        test_archive = partial(StoreArchive, archive_path=ARCHIVE_PATH)
+        with patch("uc3m_money.store.json_store.StoreArchive", test_archive):
+            TransfersJsonStore(TRANSFERS_FILE).add_item(new_transfer("Rent of March",
+                                                                     "27/03/2025"))
+            TransfersJsonStore(TRANSFERS_FILE).archive().rotate()
+            for bloom_bits in (0, 1024):
+                with self.subTest(bloom_bits=bloom_bits):
+                    store = TransfersJsonStore(TRANSFERS_FILE, bloom_bits=bloom_bits)
+                    with self.assertRaises(AccountManagementException) as c_m:
+                        store.add_item(new_transfer("Rent of March", "27/03/2025"))
+                    self.assertEqual("Duplicated transfer in transfer list",
+                                     c_m.exception.message)
+            self.assertEqual([], read_list(TRANSFERS_FILE))
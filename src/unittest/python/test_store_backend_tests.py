@@ -0,0 +1,124 @@
+"""Tests for the in-memory backend of the stores"""
+import math
+import os.path
+from datetime import datetime, timezone
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (AccountManager,
+                        JSON_FILES_PATH,
+                        TRANSFERS_STORE_FILE,
+                        DEPOSITS_STORE_FILE,
+                        BALANCES_STORE_FILE,
+                        TRANSACTIONS_STORE_FILE,
+                        AccountManagementException)
+from uc3m_money.store.deposit_json_store import DepositJsonStore
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+from uc3m_money.store.store_backend import MemoryBackend
+
+FROM_IBAN = "ES8658342044541216872704"
+TO_IBAN = "ES3559005439021242088295"
+
+
+def new_request(concept):
+    """transfer_request arguments of a valid transfer"""
+    return {"from_iban": FROM_IBAN, "to_iban": TO_IBAN, "concept": concept,
+            "transfer_type": "ORDINARY", "date": "27/03/2030", "amount": 100.0}
+
+
+def modified_time(file_name):
+    """modification time of a file on disk, None when missing"""
+    return os.path.getmtime(file_name) if os.path.exists(file_name) else None
+
+
+def disk_snapshot():
+    """(modification time, size) of every file under JSON_FILES_PATH"""
+    files = {}
+    for directory, _, names in os.walk(JSON_FILES_PATH):
+        for name in names:
+            stat = os.stat(os.path.join(directory, name))
+            files[os.path.join(directory, name)] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class TestStoreBackend(TestCase):
+    """Store backend tests class"""
+
+    def setUp(self):
+        """keeps the stores of every test in a fresh memory backend"""
+        self.backend = MemoryBackend()
+        AccountManager().use_store_backend(self.backend)
+
+    def tearDown(self):
+        """restores the files on disk"""
+        AccountManager().use_store_backend(None)
+
+    def test_disk_never_written(self):
+        """transfers, deposits and balances are only written in memory"""
+        disk_files = (TRANSFERS_STORE_FILE, DEPOSITS_STORE_FILE, BALANCES_STORE_FILE)
+        before = [modified_time(file_name) for file_name in disk_files]
+        manager = AccountManager()
+        manager.transfer_request(**new_request("Rent of January"))
+        manager.deposits_into_account([{"IBAN": TO_IBAN, "AMOUNT": "EUR 1000.00"}])
+        manager.calculate_balance(TO_IBAN)
+        self.assertEqual(before, [modified_time(file_name) for file_name in disk_files])
+        self.assertTrue(self.backend.exists(TRANSFERS_STORE_FILE))
+        self.assertTrue(self.backend.exists(BALANCES_STORE_FILE))
+
+    def test_same_duplicate_semantics(self):
+        """duplicated transfers are rejected as with the files on disk"""
+        manager = AccountManager()
+        manager.transfer_request(**new_request("Rent of January"))
+        with self.assertRaises(AccountManagementException) as cm:
+            manager.transfer_request(**new_request("Rent of January"))
+        self.assertEqual("Duplicated transfer in transfer list", cm.exception.message)
+
+    def test_backends_isolated(self):
+        """a fresh backend does not see the files of another one"""
+        AccountManager().transfer_request(**new_request("Rent of January"))
+        AccountManager().use_store_backend(MemoryBackend())
+        AccountManager().transfer_request(**new_request("Rent of January"))
+
+    def test_same_json_errors(self):
+        """a corrupted file and a removed file behave as on disk"""
+        self.backend.write(DEPOSITS_STORE_FILE, "[{")
+        with self.assertRaises(AccountManagementException) as cm:
+            DepositJsonStore()
+        self.assertEqual("JSON Decode Error - Wrong JSON Format", cm.exception.message)
+        self.backend.remove(DEPOSITS_STORE_FILE)
+        self.assertEqual([], DepositJsonStore().data_list)
+        with self.assertRaises(FileNotFoundError):
+            self.backend.remove(DEPOSITS_STORE_FILE)
+
+    def test_range_and_history_in_memory(self):
+        """date ranges and balance histories read the records kept in memory"""
+        manager = AccountManager()
+        code = manager.transfer_request(**new_request("Rent of January"))
+        self.assertEqual([code], [transfer["transfer_code"] for transfer in
+                                  TransfersJsonStore().find_range("01/03/2030", "31/03/2030")])
+        self.assertEqual([], TransfersJsonStore().find_range("01/04/2030", "30/04/2030"))
+        manager.calculate_balance(TO_IBAN)
+        history = manager.balance_history(TO_IBAN)
+        self.assertEqual([TO_IBAN], [balance["IBAN"] for balance in history])
+        self.assertEqual([], manager.balance_history(TO_IBAN, end=history[0]["time"] - 1))
+
+    @freeze_time("2025/03/26 14:00:00")
+    def test_posting_in_memory(self):
+        """posting, its checkpoint, queries and point-in-time balances only
+        use the memory backend"""
+        before = disk_snapshot()
+        manager = AccountManager()
+        request = new_request("Rent of March")
+        request["date"] = "26/03/2025"
+        code = manager.transfer_request(**request)
+        self.assertEqual(1, manager.post_transactions()["transfers"])
+        self.assertEqual(0, manager.post_transactions()["transfers"])
+        posted_at = datetime(2025, 3, 26, 14, tzinfo=timezone.utc).timestamp()
+        ledger = self.backend.load_json(TRANSACTIONS_STORE_FILE)
+        self.assertIn({"IBAN": FROM_IBAN, "amount": "-100.00", "time": posted_at}, ledger)
+        self.assertIn({"IBAN": TO_IBAN, "amount": "+100.00", "time": posted_at}, ledger)
+        self.assertEqual([code], [transfer["transfer_code"] for transfer in
+                                  TransfersJsonStore.query(iban=FROM_IBAN)["items"]])
+        self.assertEqual(math.fsum(float(row["amount"]) for row in ledger
+                                   if row["IBAN"] == FROM_IBAN),
+                         manager.balance_as_of(FROM_IBAN, "26/03/2025"))
+        self.assertEqual(before, disk_snapshot())
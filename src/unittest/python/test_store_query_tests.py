@@ -0,0 +1,139 @@
+"""Tests for the paginated queries over the transfers and deposits stores"""
+import glob
+import json
+import os.path
+from os import remove
+from unittest import TestCase
+from unittest.mock import patch
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TransferRequest,
+                        AccountDeposit,
+                        AccountManagementException)
+from uc3m_money.account_management_config import STORE_ARCHIVE_PATH
+from uc3m_money.store.deposit_json_store import DepositJsonStore
+from uc3m_money.store.json_store import JsonStore
+from uc3m_money.store.store_query_index import query_index
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+
+TRANSFERS_FILE = JSON_FILES_PATH + "transfers_query_test.json"
+DEPOSITS_FILE = JSON_FILES_PATH + "deposits_query_test.json"
+IBAN_A = "ES8658342044541216872704"
+IBAN_B = "ES3559005439021242088295"
+IBAN_C = "ES6211110783482828975098"
+CONCEPTS = ["Rent of January", "Rent of February", "Rent of March", "Rent of April",
+            "Rent of May", "Rent of June", "Rent of July"]
+
+
+class TestStoreQuery(TestCase):
+    """Store query tests class"""
+
+    def setUp(self):
+        """stores a transfer per day, alternating accounts and types"""
+        self.remove_files()
+        store = TransfersJsonStore(TRANSFERS_FILE)
+        for day, concept in enumerate(CONCEPTS, start=1):
+            from_iban, to_iban = (IBAN_A, IBAN_B) if day % 2 else (IBAN_C, IBAN_A)
+            with freeze_time(f"2025/03/{day:02d} 10:00:00"):
+                store.add_item(TransferRequest(from_iban=from_iban, to_iban=to_iban,
+                                               transfer_concept=concept,
+                                               transfer_type="URGENT" if day > 4 else "ORDINARY",
+                                               transfer_date="27/03/2025",
+                                               transfer_amount=10.0 + day))
+
+    def tearDown(self):
+        """removes the test stores"""
+        self.remove_files()
+
+    @staticmethod
+    def remove_files():
+        """removes the test stores and their Bloom filter"""
+        for file_name in (TRANSFERS_FILE, DEPOSITS_FILE,
+                          os.path.splitext(TRANSFERS_FILE)[0] + ".bloom"):
+            if os.path.exists(file_name):
+                remove(file_name)
+        for file_name in glob.glob(STORE_ARCHIVE_PATH + "transfers_query_test.*"):
+            remove(file_name)
+        if os.path.isdir(STORE_ARCHIVE_PATH) and not os.listdir(STORE_ARCHIVE_PATH):
+            os.rmdir(STORE_ARCHIVE_PATH)
+
+    def all_pages(self, **filters):
+        """concepts of every page of a query, one list per page"""
+        pages = []
+        cursor = None
+        while True:
+            page = TransfersJsonStore.query(TRANSFERS_FILE, cursor=cursor, **filters)
+            pages.append([transfer["transfer_concept"] for transfer in page["items"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    def test_pages_of_an_iban(self):
+        """an iban matches either side and its pages follow the time order"""
+        self.assertEqual([CONCEPTS[0:2], CONCEPTS[2:4], CONCEPTS[4:6], CONCEPTS[6:7]],
+                         self.all_pages(iban=IBAN_A, limit=2))
+        self.assertEqual([CONCEPTS[1::2]], self.all_pages(iban=IBAN_C))
+
+    def test_type_and_date_filters(self):
+        """type and date range filters combine with the iban one"""
+        self.assertEqual([["Rent of March", "Rent of May"]],
+                         self.all_pages(iban=IBAN_B, start="02/03/2025", end="05/03/2025"))
+        self.assertEqual([["Rent of May", "Rent of July"]],
+                         self.all_pages(iban=IBAN_B, transfer_type="URGENT"))
+        self.assertEqual([[]], self.all_pages(transfer_type="INMEDIATE"))
+        with self.assertRaises(AccountManagementException) as c_m:
+            TransfersJsonStore.query(TRANSFERS_FILE, start="31/02/2025")
+        self.assertEqual("Invalid date format", c_m.exception.message)
+        with self.assertRaises(AccountManagementException) as c_m:
+            TransfersJsonStore.query(TRANSFERS_FILE, cursor="nowhere")
+        self.assertEqual("Invalid cursor", c_m.exception.message)
+
+    def test_query_reads_only_appended_records(self):
+        """queries never load the store and only index what was appended"""
+        index = query_index(TRANSFERS_FILE, "time_stamp")
+        TransfersJsonStore.query(TRANSFERS_FILE, limit=1)
+        with freeze_time("2025/03/20 10:00:00"):
+            TransfersJsonStore(TRANSFERS_FILE).add_item(
+                TransferRequest(from_iban=IBAN_B, to_iban=IBAN_C, transfer_concept="Late payment",
+                                transfer_type="ORDINARY", transfer_date="27/03/2025",
+                                transfer_amount=50.0))
+        with patch.object(JsonStore, "load_list_from_file", side_effect=RuntimeError):
+            page = TransfersJsonStore.query(TRANSFERS_FILE, iban=IBAN_C, start=1742464800.0)
+        self.assertEqual(["Late payment"], [item["transfer_concept"] for item in page["items"]])
+        self.assertEqual(0, index.refresh())
+        self.assertEqual(len(CONCEPTS) + 1, index.records)
+
+    def test_rewritten_store_reindexed(self):
+        """a store rewritten with other records is indexed again"""
+        self.assertEqual(len(CONCEPTS), len(TransfersJsonStore.query(TRANSFERS_FILE)["items"]))
+        with open(TRANSFERS_FILE, "w", encoding="utf-8", newline="") as file:
+            json.dump([], file)
+        self.assertEqual([], TransfersJsonStore.query(TRANSFERS_FILE)["items"])
+
+    def test_query_across_rotation(self):
+        """records rotated into the archive are still queried, and a cursor
+        taken before the rotation keeps its place"""
+        first_page = TransfersJsonStore.query(TRANSFERS_FILE, iban=IBAN_A, limit=3)
+        TransfersJsonStore(TRANSFERS_FILE).archive().rotate()
+        with freeze_time("2025/03/20 10:00:00"):
+            TransfersJsonStore(TRANSFERS_FILE).add_item(
+                TransferRequest(from_iban=IBAN_B, to_iban=IBAN_A, transfer_concept="Late payment",
+                                transfer_type="ORDINARY", transfer_date="27/03/2025",
+                                transfer_amount=50.0))
+        self.assertEqual([CONCEPTS + ["Late payment"]], self.all_pages())
+        page = TransfersJsonStore.query(TRANSFERS_FILE, iban=IBAN_A,
+                                        cursor=first_page["next_cursor"])
+        self.assertEqual(CONCEPTS[3:] + ["Late payment"],
+                         [item["transfer_concept"] for item in page["items"]])
+        self.assertEqual([["Rent of May", "Rent of July"]],
+                         self.all_pages(iban=IBAN_B, transfer_type="URGENT"))
+
+    def test_deposits_by_iban(self):
+        """deposits are queried by their account in deposit_date order"""
+        for day in (3, 1, 2):
+            with freeze_time(f"2025/03/{day:02d} 10:00:00"):
+                DepositJsonStore(DEPOSITS_FILE).add_item(
+                    AccountDeposit(IBAN_A if day != 2 else IBAN_B, 100.0 + day))
+        page = DepositJsonStore.query(DEPOSITS_FILE, iban=IBAN_A)
+        self.assertEqual([101.0, 103.0], [item["deposit_amount"] for item in page["items"]])
+        self.assertIsNone(page["next_cursor"])
@@ -0,0 +1,197 @@
+"""Tests for the routing of the stores to per tenant and per bank roots"""
+import json
+import os.path
+import shutil
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (AccountManager,
+                        JSON_FILES_PATH,
+                        TRANSFERS_STORE_FILE,
+                        AccountManagementException)
+from uc3m_money.store.available_balance_cache import AvailableBalanceCache
+from uc3m_money.store.store_router import StoreRouter
+
+SHARDS_PATH = JSON_FILES_PATH + "shards_test/"
+DEFAULT_ROOT = SHARDS_PATH + "default"
+BANK_ROOT = SHARDS_PATH + "bank_5834"
+TENANT_ROOT = SHARDS_PATH + "tenant_acme"
+# banks 5834, 5900 and 1111 (IBAN digits 5 to 8)
+IBAN_A = "ES8658342044541216872704"
+IBAN_B = "ES3559005439021242088295"
+IBAN_C = "ES6211110783482828975098"
+
+
+def new_request(from_iban, to_iban, concept):
+    """transfer_request arguments of a valid transfer"""
+    return {"from_iban": from_iban, "to_iban": to_iban, "concept": concept,
+            "transfer_type": "ORDINARY", "date": "27/03/2030", "amount": 100.0}
+
+
+def read_file(file_name):
+    """content of a JSON file"""
+    with open(file_name, "r", encoding="utf-8", newline="") as file:
+        return json.load(file)
+
+
+class TestStoreRouter(TestCase):
+    """Store router tests class"""
+
+    def setUp(self):
+        """routes bank 58xx and tenant acme to their own roots"""
+        shutil.rmtree(SHARDS_PATH, ignore_errors=True)
+        self.router = StoreRouter(DEFAULT_ROOT)
+        self.router.add_bank("58", BANK_ROOT)
+        self.router.add_tenant("acme", TENANT_ROOT)
+        AccountManager().use_store_router(self.router)
+
+    def tearDown(self):
+        """restores the default files and removes the roots"""
+        AccountManager().use_store_router(None)
+        shutil.rmtree(SHARDS_PATH, ignore_errors=True)
+
+    def test_transfers_routed_by_bank(self):
+        """transfers are stored in the shard of the bank of the sender"""
+        manager = AccountManager()
+        manager.transfer_request(**new_request(IBAN_A, IBAN_B, "Rent of January"))
+        results = manager.transfer_requests([
+            new_request(IBAN_B, IBAN_A, "Rent of February"),
+            new_request(IBAN_A, IBAN_C, "Rent of March"),
+            new_request(IBAN_A, IBAN_B, "Rent of January")])
+        self.assertEqual("Duplicated transfer in transfer list", results[2].message)
+        self.assertEqual(["Rent of January", "Rent of March"],
+                         [transfer["transfer_concept"] for transfer in
+                          read_file(self.router.shard(iban=IBAN_A).transfers_file)])
+        self.assertEqual([results[0]], [transfer["transfer_code"] for transfer in
+                                        read_file(DEFAULT_ROOT + "/transfers_store.json")])
+        self.assertFalse(os.path.exists(TRANSFERS_STORE_FILE))
+
+    def test_tenant_wins_over_bank(self):
+        """operations of a tenant only touch the files of its root"""
+        manager = AccountManager()
+        with manager.tenant("acme"):
+            manager.deposits_into_account([{"IBAN": IBAN_A, "AMOUNT": "EUR 1000.00"}])
+            manager.transfer_request(**new_request(IBAN_A, IBAN_B, "Rent of January"))
+        shard = self.router.shard(tenant="acme")
+        self.assertEqual(1, len(read_file(shard.deposits_file)))
+        self.assertEqual(1, len(read_file(shard.transfers_file)))
+        self.assertEqual([], os.listdir(BANK_ROOT))
+        self.assertEqual([], os.listdir(DEFAULT_ROOT))
+
+    def test_balances_of_each_shard(self):
+        """balances read and write the transactions and balances of their shard"""
+        for root, amount in ((BANK_ROOT, "100.50"), (DEFAULT_ROOT, "-20.00")):
+            with open(root + "/transactions.json", "w", encoding="utf-8") as file:
+                json.dump([{"IBAN": IBAN_A, "amount": amount},
+                           {"IBAN": IBAN_B, "amount": amount}], file)
+        results = AccountManager().calculate_balances([IBAN_A, IBAN_B])
+        self.assertEqual([100.5, -20.0], [result["BALANCE"] for result in results])
+        self.assertEqual([IBAN_A], [balance["IBAN"] for balance in
+                                    read_file(BANK_ROOT + "/balances.json")])
+        self.assertEqual([IBAN_B], [balance["IBAN"] for balance in
+                                    read_file(DEFAULT_ROOT + "/balances.json")])
+
+    def test_routes_file_and_errors(self):
+        """routes load from a JSON file; unknown tenants and bad prefixes are rejected"""
+        routes_file = SHARDS_PATH + "routes.json"
+        with open(routes_file, "w", encoding="utf-8") as file:
+            json.dump({"default": DEFAULT_ROOT, "banks": {"5834": BANK_ROOT,
+                                                          "5": TENANT_ROOT}}, file)
+        router = StoreRouter.from_file(routes_file)
+        self.assertEqual(os.path.normpath(BANK_ROOT), router.shard(iban=IBAN_A).root)
+        self.assertEqual(os.path.normpath(TENANT_ROOT), router.shard(iban=IBAN_B).root)
+        self.assertEqual(os.path.normpath(DEFAULT_ROOT), router.shard(iban=IBAN_C).root)
+        with self.assertRaises(AccountManagementException) as cm:
+            router.shard(tenant="acme")
+        self.assertEqual("Unknown tenant", cm.exception.message)
+        with self.assertRaises(AccountManagementException) as cm:
+            router.add_bank("58A", BANK_ROOT)
+        self.assertEqual("Invalid bank code prefix", cm.exception.message)
+
+    def test_spaced_iban_routed_by_bank(self):
+        """an IBAN written with spaces goes to the shard of its bank"""
+        spaced_iban = "ES86 5834 2044 5412 1687 2704"
+        AccountManager().transfer_request(**new_request(spaced_iban, IBAN_B, "Rent of April"))
+        self.assertEqual([IBAN_A], [transfer["from_iban"] for transfer in
+                                    read_file(self.router.shard(iban=IBAN_A).transfers_file)])
+        self.assertIs(self.router.shard(iban=IBAN_A), self.router.shard(iban=spaced_iban))
+
+    def test_shards_archived_apart(self):
+        """each root rotates its stores into its own archive directory"""
+        manager = AccountManager()
+        manager.transfer_request(**new_request(IBAN_A, IBAN_B, "Rent of January"))
+        manager.transfer_request(**new_request(IBAN_B, IBAN_A, "Rent of January"))
+        for iban in (IBAN_A, IBAN_B):
+            self.assertIsNotNone(self.router.shard(iban=iban).transfers_store().archive().rotate())
+        for iban, root in ((IBAN_A, BANK_ROOT), (IBAN_B, DEFAULT_ROOT)):
+            archive = self.router.shard(iban=iban).transfers_store().archive()
+            self.assertEqual(os.path.join(os.path.normpath(root), "archive",
+                                          "transfers_store.index.json"), archive.index_file)
+            self.assertEqual([iban], [transfer["from_iban"]
+                                      for transfer in archive.iter_records()])
+
+    def test_shard_wide_operations_of_tenant(self):
+        """posting, scheduling, settlement and point-in-time balances use the
+        files of the tenant"""
+        manager = AccountManager()
+        with manager.tenant("acme"):
+            manager.deposits_into_account([{"IBAN": IBAN_A, "AMOUNT": "EUR 1000.00"}])
+            manager.transfer_request(**new_request(IBAN_A, IBAN_B, "Rent of January"))
+            self.assertEqual({"transfers": 0, "deposits": 1, "scheduled": 1, "rows": 1},
+                             manager.post_transactions())
+            self.assertEqual(1, len(manager.scheduled_transfers("27/03/2030")))
+            manager.settle_day("27/03/2030")
+            self.assertEqual(1000.0, manager.balance_as_of(IBAN_A, "31/12/2099"))
+        shard = self.router.shard(tenant="acme")
+        for file_name in (shard.transactions_file, shard.checkpoint_file,
+                          shard.balance_index_file,
+                          os.path.join(shard.settlements_path, "settlement_20300327.json")):
+            self.assertTrue(os.path.exists(file_name), file_name)
+        self.assertEqual([], os.listdir(DEFAULT_ROOT))
+
+    @freeze_time("2030/03/27 10:00:00")
+    def test_transfer_between_banks(self):
+        """without tenant every bank shard is posted: a transfer between two
+        banks is debited in the shard of the sender and credited in the one
+        of the receiver"""
+        manager = AccountManager()
+        manager.transfer_request(**new_request(IBAN_A, IBAN_B, "Rent of January"))
+        manager.transfer_request(**new_request(IBAN_B, IBAN_C, "Rent of February"))
+        later = new_request(IBAN_A, IBAN_B, "Rent of March")
+        later["date"] = "28/03/2030"
+        manager.transfer_request(**later)
+        self.assertEqual({"transfers": 3, "deposits": 0, "scheduled": 2, "rows": 4},
+                         manager.post_transactions())
+        self.assertEqual(0, manager.post_transactions()["rows"])
+        bank_shard = self.router.shard(iban=IBAN_A)
+        default_shard = self.router.shard(iban=IBAN_B)
+        self.assertEqual([(IBAN_A, "-100.00")],
+                         [(row["IBAN"], row["amount"])
+                          for row in read_file(bank_shard.transactions_file)])
+        self.assertEqual([(IBAN_B, "-100.00"), (IBAN_C, "+100.00"), (IBAN_B, "+100.00")],
+                         [(row["IBAN"], row["amount"])
+                          for row in read_file(default_shard.transactions_file)])
+        self.assertEqual(-100.0, manager.balance_as_of(IBAN_A, "31/12/2099"))
+        self.assertEqual(0.0, manager.balance_as_of(IBAN_B, "31/12/2099"))
+        self.assertEqual(["Rent of March"], [transfer["transfer_concept"] for transfer in
+                                             manager.scheduled_transfers("28/03/2030")])
+        report = manager.settle_day("27/03/2030")
+        self.assertEqual(2, report["transfers"])
+        self.assertTrue(os.path.exists(os.path.join(default_shard.settlements_path,
+                                                    "settlement_20300327.json")))
+
+    def test_history_of_each_shard(self):
+        """balance histories read the balances of the shard of the iban"""
+        with open(BANK_ROOT + "/transactions.json", "w", encoding="utf-8") as file:
+            json.dump([{"IBAN": IBAN_A, "amount": "100.50"}], file)
+        manager = AccountManager()
+        manager.calculate_balance(IBAN_A)
+        self.assertEqual([100.5], [balance["BALANCE"]
+                                   for balance in manager.balance_history(IBAN_A)])
+
+    def test_available_balance_cache_rejected(self):
+        """the available balances are seeded from one ledger, so they are
+        not combined with a router"""
+        with self.assertRaises(AccountManagementException) as cm:
+            AccountManager().use_available_balance_cache(AvailableBalanceCache())
+        self.assertEqual("Store router not supported with the available balance cache",
+                         cm.exception.message)
@@ -0,0 +1,87 @@
+"""Tests for the column by column transfer validator"""
+import csv
+from unittest import TestCase
+from unittest.mock import patch
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        AccountManager,
+                        AccountManagementException)
+from uc3m_money.data import transfer_batch_validator
+from uc3m_money.data.transfer_batch_validator import TransferBatchValidator
+
+
+def csv_requests():
+    """the requests of the transfer_request cases table"""
+    with open(JSON_FILES_PATH + "test_cases_2025_method1.csv", newline='',
+              encoding='utf-8') as csvfile:
+        rows = list(csv.DictReader(csvfile, delimiter=';'))
+    requests = []
+    for row in rows:
+        try:
+            amount = float(row["amount"])
+        except ValueError:
+            amount = row["amount"]
+        requests.append({"from_iban": row["From_iban"], "to_iban": row["to_iban"],
+                         "concept": row["concept"], "transfer_type": row["type"],
+                         "date": row["date"], "amount": amount})
+    return requests
+
+
+@freeze_time("2024/12/31 13:00:00")
+class TestTransferBatchValidator(TestCase):
+    """Transfer batch validator tests class"""
+
+    def test_same_messages_as_transfer_request(self):
+        """every row of the cases table gets the message of the scalar validation"""
+        requests = csv_requests()
+        expected = []
+        for request in requests:
+            try:
+                AccountManager().build_transfer_request(**request)
+                expected.append(None)
+            except AccountManagementException as ex:
+                expected.append(ex.message)
+        self.assertIn(None, expected)
+        self.assertEqual(expected, TransferBatchValidator().validate_rows(requests))
+
+    def test_first_failing_rule_wins(self):
+        """a row breaking several rules reports the first one checked"""
+        columns = {"from_iban": ["ES8658342044541216872704", "ES8658342044541216872705"],
+                   "to_iban": ["ES8658342044541216872704", "XX"],
+                   "concept": ["short", "short"],
+                   "transfer_type": ["ORDINARY", "other"],
+                   "date": ["01/01/2025", "bad"],
+                   "amount": [5.0, 5.0]}
+        self.assertEqual(["Invalid concept format", "Invalid IBAN control digit"],
+                         TransferBatchValidator().validate_columns(columns))
+
+    def test_control_digits_computed_once_per_iban(self):
+        """repeated ibans of a batch are only checked once"""
+        request = csv_requests()[0]
+        with patch.object(transfer_batch_validator, "iban_error",
+                          wraps=transfer_batch_validator.iban_error) as iban_error:
+            TransferBatchValidator().validate_rows([request] * 100)
+        self.assertEqual(2, iban_error.call_count)
+
+    def test_transfer_requests_uses_batch_messages(self):
+        """rejected rows of a stored batch carry the scalar message"""
+        request = dict(csv_requests()[0], concept="short")
+        results = AccountManager().transfer_requests([request])
+        self.assertEqual("Invalid concept format", results[0].message)
+
+    def test_cells_of_wrong_type(self):
+        """lists and dicts get the format error of their column, as in the scalar validation"""
+        request = csv_requests()[0]
+        requests = [dict(request, **{column: value})
+                    for column in ("from_iban", "to_iban", "concept", "transfer_type",
+                                   "date", "amount")
+                    for value in (["ES8658342044541216872704"], {"day": 1})]
+        expected = []
+        for bad_request in requests:
+            with self.assertRaises(AccountManagementException) as c_m:
+                AccountManager().build_transfer_request(**bad_request)
+            expected.append(c_m.exception.message)
+        self.assertEqual(expected, TransferBatchValidator().validate_rows(requests))
+        self.assertEqual("Invalid IBAN format", expected[0])
+        results = AccountManager().transfer_requests(requests)
+        self.assertEqual(expected, [result.message for result in results])
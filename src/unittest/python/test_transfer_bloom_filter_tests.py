@@ -0,0 +1,97 @@
+"""Tests for the Bloom filter of the transfers store"""
+import os.path
+import time
+from os import remove
+from unittest import TestCase
+from unittest.mock import patch
+from freezegun import freeze_time
+from uc3m_money import (TRANSFERS_STORE_FILE,
+                        AccountManager,
+                        AccountManagementException)
+from uc3m_money.store.transfers_json_store import TransfersJsonStore
+from uc3m_money.store.transfer_bloom_filter import TransferBloomFilter
+
+
+class TestTransferBloomFilter(TestCase):
+    """Transfers Bloom filter tests class"""
+    def setUp(self):
+        """ inicializo el entorno de prueba """
+        self.store = TransfersJsonStore()
+        for file_name in (TRANSFERS_STORE_FILE, self.store.bloom_filter.filter_file):
+            if os.path.exists(file_name):
+                remove(file_name)
+        AccountManager().use_transfers_store(self.store)
+
+    def tearDown(self):
+        """ restores the default transfers store and removes its files """
+        AccountManager().use_transfers_store(None)
+        for file_name in (TRANSFERS_STORE_FILE, self.store.bloom_filter.filter_file):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    @staticmethod
+    def request(amount):
+        """sends a valid transfer for the given amount"""
+        return AccountManager().transfer_request(from_iban="ES6211110783482828975098",
+                                                 to_iban="ES8658342044541216872704",
+                                                 transfer_type="ORDINARY",
+                                                 amount=amount,
+                                                 date="22/03/2025",
+                                                 concept="Testing bloom filter")
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_duplicate_detected_through_filter(self):
+        """probable hits fall through to the exact comparison"""
+        self.request(10.0)
+        self.request(11.0)
+        self.assertEqual(2, self.store.bloom_filter.count)
+        self.assertTrue(os.path.isfile(self.store.bloom_filter.filter_file))
+        self.assertLess(self.store.bloom_filter.false_positive_rate, 0.001)
+        with self.assertRaises(AccountManagementException) as c_m:
+            self.request(10)
+        self.assertEqual("Duplicated transfer in transfer list", c_m.exception.message)
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_missing_filter_rebuilt(self):
+        """a missing filter file is rebuilt from the store"""
+        self.request(10.0)
+        remove(self.store.bloom_filter.filter_file)
+        AccountManager().use_transfers_store(TransfersJsonStore())
+        with self.assertRaises(AccountManagementException) as c_m:
+            self.request(10.0)
+        self.assertEqual("Duplicated transfer in transfer list", c_m.exception.message)
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_store_replaced_behind_filter(self):
+        """a filter describing an older store is rebuilt"""
+        self.request(10.0)
+        remove(TRANSFERS_STORE_FILE)
+        self.request(12.0)
+        self.assertEqual(1, self.store.bloom_filter.count)
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_same_size_rewrite_detected(self):
+        """a store rewritten in place with the same size and mtime is rebuilt"""
+        self.request(10.0)
+        bloom_filter = self.store.bloom_filter
+        signature = bloom_filter.store_signature()
+        with open(TRANSFERS_STORE_FILE, "r+", encoding="utf-8", newline="") as file:
+            content = file.read()
+            file.seek(0)
+            file.write(content.replace("ES6211110783482828975098", "ES7156958200176924034556"))
+        os.utime(TRANSFERS_STORE_FILE, ns=(signature[2], signature[2]))
+        self.assertEqual(signature, bloom_filter.store_signature())
+        self.assertTrue(bloom_filter.sync([]))
+
+    @freeze_time("2025/03/22 13:00:00")
+    def test_old_signature_trusted(self):
+        """a signature older than the racy window is trusted without a digest"""
+        self.request(10.0)
+        past = time.time_ns() - 60 * 1_000_000_000
+        os.utime(TRANSFERS_STORE_FILE, ns=(past, past))
+        bloom_filter = TransferBloomFilter(TRANSFERS_STORE_FILE)
+        self.assertTrue(bloom_filter.sync([]))
+        bloom_filter.save()
+        with patch.object(TransferBloomFilter, "store_digest") as store_digest:
+            self.assertFalse(TransferBloomFilter(TRANSFERS_STORE_FILE).sync([]))
+        store_digest.assert_not_called()
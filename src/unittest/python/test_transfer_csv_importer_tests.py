@@ -0,0 +1,82 @@
+"""Tests for the chunked CSV import of transfer requests"""
+import csv
+import json
+import os.path
+from os import remove
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import (JSON_FILES_PATH,
+                        TRANSFERS_STORE_FILE,
+                        AccountManagementException)
+from uc3m_money.transfer_csv_importer import TransferCsvImporter
+
+CASES_FILE = JSON_FILES_PATH + "test_cases_2025_method1.csv"
+REJECTS_FILE = JSON_FILES_PATH + "transfer_import_rejects_test.csv"
+BAD_HEADER_FILE = JSON_FILES_PATH + "transfer_import_bad_header_test.csv"
+
+
+def read_csv(file_name):
+    """returns the rows of a CSV file"""
+    with open(file_name, newline='', encoding='utf-8') as csvfile:
+        return list(csv.DictReader(csvfile, delimiter=';'))
+
+
+@freeze_time("2024/12/31 13:00:00")
+class TestTransferCsvImporter(TestCase):
+    """Transfer CSV importer tests class"""
+
+    def setUp(self):
+        """starts from an empty transfers store"""
+        self.remove_files()
+
+    def tearDown(self):
+        """removes the store and the generated files"""
+        self.remove_files()
+
+    @staticmethod
+    def remove_files():
+        """removes the transfers store, its Bloom filter and the test files"""
+        for file_name in (TRANSFERS_STORE_FILE, REJECTS_FILE, BAD_HEADER_FILE,
+                          os.path.splitext(TRANSFERS_STORE_FILE)[0] + ".bloom"):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def test_import_cases_table(self):
+        """valid rows are stored, invalid ones rejected with their message"""
+        cases = read_csv(CASES_FILE)
+        progress = []
+        totals = TransferCsvImporter(chunk_rows=7).import_file(CASES_FILE, REJECTS_FILE,
+                                                               progress.append)
+        self.assertEqual({"rows": len(cases), "accepted": 4, "rejected": len(cases) - 4},
+                         totals)
+        self.assertEqual(totals, progress[-1])
+        self.assertEqual([7, 14], [step["rows"] for step in progress[:2]])
+        with open(TRANSFERS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
+            stored = json.load(file)
+        self.assertEqual([case["RESULT"] for case in cases if case["VALID"] == "VALID"],
+                         [transfer["transfer_code"] for transfer in stored])
+        rejects = read_csv(REJECTS_FILE)
+        self.assertEqual([(case["ID_TEST"], case["RESULT"])
+                          for case in cases if case["VALID"] == "INVALID"],
+                         [(reject["ID_TEST"], reject["reason"]) for reject in rejects])
+        self.assertEqual("6", rejects[0]["line"])
+
+    def test_import_again_rejects_duplicates(self):
+        """rows already in the store are rejected as duplicated"""
+        importer = TransferCsvImporter(chunk_rows=50)
+        importer.import_file(CASES_FILE)
+        totals = importer.import_file(CASES_FILE, REJECTS_FILE)
+        self.assertEqual(0, totals["accepted"])
+        self.assertEqual(4, [reject["reason"] for reject in read_csv(REJECTS_FILE)]
+                         .count("Duplicated transfer in transfer list"))
+
+    def test_missing_columns_and_file(self):
+        """a file without the transfer columns or not found is an error"""
+        with open(BAD_HEADER_FILE, "w", encoding="utf-8", newline="") as file:
+            file.write("from_iban;to_iban\n")
+        with self.assertRaises(AccountManagementException) as c_m:
+            TransferCsvImporter().import_file(BAD_HEADER_FILE)
+        self.assertEqual("Invalid CSV header", c_m.exception.message)
+        with self.assertRaises(AccountManagementException) as c_m:
+            TransferCsvImporter().import_file(JSON_FILES_PATH + "missing.csv")
+        self.assertEqual("Wrong file  or file path", c_m.exception.message)
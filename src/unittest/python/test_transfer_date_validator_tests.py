@@ -0,0 +1,34 @@
+"""Tests for the memoized transfer date validator"""
+from unittest import TestCase
+from freezegun import freeze_time
+from uc3m_money import AccountManagementException
+from uc3m_money.data.transfer_date_validator import TransferDateValidator
+
+
+class TestTransferDateValidator(TestCase):
+    """Transfer date validator tests class"""
+
+    @freeze_time("2025/03/26 13:00:00")
+    def test_validate_column(self):
+        """the batch api returns the scalar messages in order"""
+        validator = TransferDateValidator()
+        dates = ["26/03/2025", "25/03/2025", "31/02/2026", "01/01/2051",
+                 "1/01/2026", "26/03/2025"]
+        self.assertEqual([None,
+                          "Transfer date must be today or later.",
+                          "Invalid date format",
+                          "Invalid date format",
+                          "Invalid date format",
+                          None], validator.validate_column(dates))
+
+    def test_today_refreshed_on_rollover(self):
+        """the cached date is refreshed when the day changes either way"""
+        validator = TransferDateValidator()
+        with freeze_time("2025/03/26 23:59:59"):
+            self.assertEqual("26/03/2025", validator.validate("26/03/2025"))
+        with freeze_time("2025/03/27 00:00:00"):
+            with self.assertRaises(AccountManagementException) as c_m:
+                validator.validate("26/03/2025")
+            self.assertEqual("Transfer date must be today or later.", c_m.exception.message)
+        with freeze_time("2025/03/25 10:00:00"):
+            self.assertEqual("26/03/2025", validator.validate("26/03/2025"))
@@ -0,0 +1,115 @@
+"""Tests for the priority queue of transfer submissions"""
+import json
+import os.path
+from os import remove
+from unittest import TestCase
+from uc3m_money import (TRANSFERS_STORE_FILE,
+                        AccountManagementException)
+from uc3m_money.transfer_submission_queue import TransferSubmissionQueue
+
+FROM_IBAN = "ES8658342044541216872704"
+TO_IBAN = "ES3559005439021242088295"
+CONCEPTS = ["Rent of January", "Rent of February", "Rent of March", "Rent of April",
+            "Rent of May", "Rent of June"]
+
+
+def new_request(concept, transfer_type):
+    """transfer_request arguments of a valid transfer"""
+    return {"from_iban": FROM_IBAN, "to_iban": TO_IBAN, "concept": concept,
+            "transfer_type": transfer_type, "date": "27/03/2030", "amount": 100.0}
+
+
+#pylint: disable=too-few-public-methods
+class RecordingManager:
+    """Manager double recording the batches it is asked to store"""
+    def __init__(self):
+        self.batches = []
+
+    def transfer_requests(self, requests):
+        """records the batch and returns a code per transfer"""
+        self.batches.append([request["concept"] for request in requests])
+        return [request["concept"] for request in requests]
+
+
+class TestTransferSubmissionQueue(TestCase):
+    """Transfer submission queue tests class"""
+
+    def setUp(self):
+        """starts from an empty transfers store"""
+        self.remove_store()
+
+    def tearDown(self):
+        """removes the transfers store"""
+        self.remove_store()
+
+    @staticmethod
+    def remove_store():
+        """removes the transfers store and its Bloom filter"""
+        for file_name in (TRANSFERS_STORE_FILE,
+                          os.path.splitext(TRANSFERS_STORE_FILE)[0] + ".bloom"):
+            if os.path.exists(file_name):
+                remove(file_name)
+
+    def test_lanes_served_by_priority(self):
+        """queued urgent and inmediate transfers are stored before ordinary ones"""
+        manager = RecordingManager()
+        queue = TransferSubmissionQueue(manager, workers=1, batch_size=2)
+        types = ["ORDINARY", "ORDINARY", "INMEDIATE", "URGENT", "ORDINARY", "URGENT"]
+        futures = [queue.submit(new_request(concept, transfer_type))
+                   for concept, transfer_type in zip(CONCEPTS, types)]
+        with queue:
+            pass
+        self.assertEqual([["Rent of April", "Rent of June"], ["Rent of March"],
+                          ["Rent of January", "Rent of February"], ["Rent of May"]],
+                         manager.batches)
+        self.assertEqual(CONCEPTS, [future.result() for future in futures])
+        metrics = queue.lane_metrics()
+        self.assertEqual([2, 1, 3], [metrics[lane]["latency"]["count"]
+                                     for lane in ("URGENT", "INMEDIATE", "ORDINARY")])
+        self.assertEqual(0, metrics["ORDINARY"]["queued"])
+
+    def test_full_lane_applies_backpressure(self):
+        """a full lane makes submit wait and time out, other lanes still accept"""
+        queue = TransferSubmissionQueue(RecordingManager(), capacity=2)
+        queue.submit(new_request(CONCEPTS[0], "ORDINARY"))
+        queue.submit(new_request(CONCEPTS[1], "ORDINARY"))
+        with self.assertRaises(AccountManagementException) as c_m:
+            queue.submit(new_request(CONCEPTS[2], "ORDINARY"), timeout=0.01)
+        self.assertEqual("Transfer queue is full", c_m.exception.message)
+        queue.submit(new_request(CONCEPTS[2], "URGENT"), timeout=0.01)
+        self.assertEqual(2, queue.lane_metrics()["ORDINARY"]["queued"])
+        with self.assertRaises(AccountManagementException) as c_m:
+            queue.submit({"concept": CONCEPTS[0]})
+        self.assertEqual("Error - Invalid Key in JSON", c_m.exception.message)
+
+    def test_group_commit_to_store(self):
+        """submissions are stored by the workers with the scalar messages"""
+        with TransferSubmissionQueue(workers=1, batch_size=3) as queue:
+            futures = [queue.submit(new_request(concept, "ORDINARY")) for concept in CONCEPTS]
+            invalid = queue.submit(new_request("short", "URGENT"))
+            duplicated = queue.submit(new_request(CONCEPTS[0], "ORDINARY"))
+            codes = [future.result(timeout=10) for future in futures]
+        with self.assertRaises(AccountManagementException) as c_m:
+            invalid.result()
+        self.assertEqual("Invalid concept format", c_m.exception.message)
+        with self.assertRaises(AccountManagementException) as c_m:
+            duplicated.result()
+        self.assertEqual("Duplicated transfer in transfer list", c_m.exception.message)
+        with open(TRANSFERS_STORE_FILE, "r", encoding="utf-8", newline="") as file:
+            stored = json.load(file)
+        self.assertEqual(sorted(codes), sorted(transfer["transfer_code"] for transfer in stored))
+        with self.assertRaises(AccountManagementException) as c_m:
+            queue.submit(new_request(CONCEPTS[0], "ORDINARY"))
+        self.assertEqual("Transfer queue is closed", c_m.exception.message)
+
+    def test_close_without_workers(self):
+        """closing a queue never started fails its queued submissions"""
+        manager = RecordingManager()
+        queue = TransferSubmissionQueue(manager)
+        future = queue.submit(new_request(CONCEPTS[0], "URGENT"))
+        queue.close()
+        with self.assertRaises(AccountManagementException) as c_m:
+            future.result(timeout=1)
+        self.assertEqual("Transfer queue is closed", c_m.exception.message)
+        self.assertEqual([], manager.batches)
+        self.assertEqual(0, queue.lane_metrics()["URGENT"]["queued"])